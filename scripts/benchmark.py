@@ -0,0 +1,254 @@
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from queue import Empty
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.config_loader import ConfigLoader
+from utils.logger import setup_logging, get_logger
+
+# Initialiser le logger
+logger = get_logger(__name__)
+
+
+# ====================================================================
+# Étapes mesurées : chaque fabrique prépare l'étape (imports, config) hors chronométrage
+# et retourne une fonction traitant un fichier d'entrée vers un fichier de sortie. Le
+# catalogue (et ses tableaux) est celui du dossier de travail, jamais data/catalog.sqlite
+# ====================================================================
+def _etape_extraction_pymupdf(catalog_path):
+    from scripts.pdf_text_extractor_PymuPDF import PDFTextExtractor
+    from utils.catalog import EXTRACTION_TEXTE
+    return PDFTextExtractor(mode=EXTRACTION_TEXTE, catalog_path=catalog_path).extract_text_from_pdf
+
+
+def _etape_extraction_layout(catalog_path):
+    from scripts.pdf_text_extractor_PymuPDF import PDFTextExtractor
+    from utils.catalog import EXTRACTION_LAYOUT
+    return PDFTextExtractor(mode=EXTRACTION_LAYOUT, catalog_path=catalog_path).extract_text_from_pdf
+
+
+def _etape_extraction_pdfplumber(catalog_path):
+    from scripts.extract_text_pdfplumber import TextExtractor
+    return TextExtractor(catalog_path=catalog_path, table_store_path=catalog_path).extract_pdf
+
+
+def _etape_nettoyage(catalog_path):
+    from scripts.text_cleaning import BSVCleaner
+    return BSVCleaner(catalog_path=catalog_path).nettoyer_fichier
+
+
+def _etape_nettoyage_layout(catalog_path):
+    from scripts.text_cleaning import BSVCleaner
+    return functools.partial(BSVCleaner(catalog_path=catalog_path).nettoyer_fichier, mise_en_page=True)
+
+
+# (nom, fabrique, étape dont les sorties servent d'entrée ; None = PDF générés)
+STAGES = [
+    ("extraction_pymupdf", _etape_extraction_pymupdf, None),
+    ("extraction_pymupdf_layout", _etape_extraction_layout, None),
+    ("extraction_pdfplumber", _etape_extraction_pdfplumber, None),
+    ("nettoyage", _etape_nettoyage, "extraction_pymupdf"),
+    ("nettoyage_layout", _etape_nettoyage_layout, "extraction_pymupdf_layout"),
+]
+
+
+def _mesurer(stage_factory, catalog_path, input_paths, output_dir, queue):
+    """
+    Exécuté dans un processus neuf : le pic de RSS mesuré est celui de l'étape seule.
+    Une exception est renvoyée au parent ({'error'}) plutôt que de le laisser attendre.
+    """
+    try:
+        process_file = stage_factory(catalog_path)
+        outputs = [os.path.join(output_dir, os.path.splitext(os.path.basename(p))[0] + ".txt") for p in input_paths]
+        echecs = 0
+        start = time.perf_counter()
+        for input_path, output_path in zip(input_paths, outputs):
+            # Les étapes qui journalisent leurs erreurs signalent un échec en retournant False
+            if process_file(input_path, output_path) is False:
+                echecs += 1
+        seconds = time.perf_counter() - start
+        # ru_maxrss est en kilo-octets sous Linux
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        queue.put({"seconds": seconds, "peak_rss_mb": peak_rss_mb, "outputs": outputs, "echecs": echecs})
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()})
+
+
+class BenchmarkSuite:
+    """
+    Mesure chaque étape du pipeline sur des corpus synthétiques de plusieurs tailles
+    (documents/s, pages/s, Mo/s, pic de RSS) et compare à une référence enregistrée.
+    """
+
+    def __init__(self):
+        self.config_loader = ConfigLoader("config.yaml")
+        bench_cfg = self.config_loader.config["benchmark"]
+        self.scales = bench_cfg["echelles"]
+        self.pages_per_doc = bench_cfg["pages_par_doc"]
+        self.seed = bench_cfg["graine"]
+        self.tolerance = bench_cfg["tolerance"]
+        self.reference_path = self.config_loader.get_path(bench_cfg["fichier_reference"])
+        self.stage_timeout = bench_cfg["delai_max_etape"]
+        self.context = multiprocessing.get_context("spawn")
+
+    def _run_stage(self, stage_factory, catalog_path, input_paths, output_dir) -> dict:
+        """
+        Mesure une étape dans un processus fils, sur le catalogue catalog_path. Retourne
+        {'error'} si l'étape lève une exception, si le processus meurt sans résultat ou
+        dépasse delai_max_etape.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        queue = self.context.Queue()
+        process = self.context.Process(target=_mesurer,
+                                       args=(stage_factory, catalog_path, input_paths, output_dir, queue))
+        process.start()
+
+        # Le résultat est lu avant join() : un fils bloqué sur une file pleine ne se termine pas
+        deadline = time.monotonic() + self.stage_timeout
+        result = None
+        while result is None:
+            try:
+                result = queue.get(timeout=1.0)
+            except Empty:
+                if not process.is_alive():
+                    break
+                if time.monotonic() > deadline:
+                    process.terminate()
+                    result = {"error": f"délai de {self.stage_timeout}s dépassé"}
+        process.join()
+
+        if result is None:
+            result = {"error": f"processus terminé sans résultat (code {process.exitcode})"}
+        elif "error" not in result and process.exitcode != 0:
+            result = {"error": f"processus terminé avec le code {process.exitcode}"}
+        elif "error" not in result and result["echecs"]:
+            result = {"error": f"{result['echecs']}/{len(input_paths)} fichier(s) en échec"}
+        return result
+
+    def run_scale(self, n_docs: int, work_dir: str) -> dict:
+        """Génère un corpus de n_docs bulletins et mesure toutes les étapes"""
+        from scripts.synthetic_corpus import SyntheticBSVGenerator
+        corpus = SyntheticBSVGenerator(self.seed).generate(os.path.join(work_dir, "pdf"), n_docs, self.pages_per_doc)
+
+        # Catalogue jetable : le benchmark n'écrit jamais dans celui du corpus réel
+        catalog_path = os.path.join(work_dir, "catalog.sqlite")
+        outputs = {None: corpus["paths"]}
+        results = {}
+        for name, stage_factory, source in STAGES:
+            if source not in outputs:
+                results[name] = {"error": f"étape amont {source} en échec"}
+                logger.error(f"[{n_docs} docs] {name}: non mesurée, étape amont {source} en échec")
+                continue
+            input_paths = outputs[source]
+            result = self._run_stage(stage_factory, catalog_path, input_paths, os.path.join(work_dir, name))
+            if "error" in result:
+                results[name] = {"error": result["error"]}
+                logger.error(f"[{n_docs} docs] {name}: échec de l'étape ({result['error']})")
+                if result.get("traceback"):
+                    logger.debug(result["traceback"])
+                continue
+            outputs[name] = result["outputs"]
+            size = sum(os.path.getsize(p) for p in input_paths)
+            seconds = max(result["seconds"], 1e-9)
+            results[name] = {
+                "docs": len(input_paths),
+                "pages": corpus["pages"],
+                "mb": round(size / 1e6, 3),
+                "seconds": round(seconds, 3),
+                "docs_s": round(len(input_paths) / seconds, 2),
+                "pages_s": round(corpus["pages"] / seconds, 2),
+                "mb_s": round(size / 1e6 / seconds, 3),
+                "peak_rss_mb": round(result["peak_rss_mb"], 1),
+            }
+            logger.info(f"[{n_docs} docs] {name}: {results[name]['docs_s']} docs/s, {results[name]['pages_s']} "
+                        f"pages/s, {results[name]['mb_s']} Mo/s, pic RSS {results[name]['peak_rss_mb']} Mo")
+        return results
+
+    def run(self, scales=None) -> dict:
+        results = {}
+        for n_docs in scales or self.scales:
+            work_dir = tempfile.mkdtemp(prefix=f"bsv_bench_{n_docs}_")
+            try:
+                results[str(n_docs)] = self.run_scale(n_docs, work_dir)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        return results
+
+    def compare(self, results: dict) -> list:
+        """Régressions par rapport à la référence (débit plus faible ou mémoire plus haute que la tolérance)"""
+        if not os.path.exists(self.reference_path):
+            logger.warning(f"Aucune référence trouvée: {self.reference_path}")
+            return []
+        with open(self.reference_path, "r", encoding="utf-8") as f:
+            reference = json.load(f)
+
+        regressions = []
+        for scale, stages in results.items():
+            for name, metrics in stages.items():
+                ref = reference.get(scale, {}).get(name)
+                if ref is None or "error" in metrics or "error" in ref:
+                    continue
+                ratio_debit = metrics["docs_s"] / ref["docs_s"] if ref["docs_s"] else 1.0
+                ratio_rss = metrics["peak_rss_mb"] / ref["peak_rss_mb"] if ref["peak_rss_mb"] else 1.0
+                logger.info(f"[{scale} docs] {name}: débit x{ratio_debit:.2f}, mémoire x{ratio_rss:.2f} "
+                            f"par rapport à la référence")
+                if ratio_debit < 1 - self.tolerance or ratio_rss > 1 + self.tolerance:
+                    regressions.append((scale, name, ratio_debit, ratio_rss))
+                    logger.warning(f"Régression [{scale} docs] {name}")
+        return regressions
+
+    @staticmethod
+    def failures(results: dict) -> list:
+        """Étapes en échec : (échelle, étape, erreur)"""
+        return [(scale, name, metrics["error"]) for scale, stages in results.items()
+                for name, metrics in stages.items() if "error" in metrics]
+
+    def save_reference(self, results: dict):
+        os.makedirs(os.path.dirname(self.reference_path), exist_ok=True)
+        with open(self.reference_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Référence enregistrée: {self.reference_path}")
+
+
+def main():
+    """Fonction principale"""
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Benchmark des étapes du pipeline BSV")
+    parser.add_argument("--echelles", type=int, nargs="+", help="nombres de bulletins à générer")
+    parser.add_argument("--enregistrer-reference", action="store_true",
+                        help="enregistrer ces mesures comme nouvelle référence")
+    args = parser.parse_args()
+
+    try:
+        suite = BenchmarkSuite()
+        results = suite.run(args.echelles)
+        failures = suite.failures(results)
+        if failures:
+            logger.error(f"{len(failures)} étape(s) en échec, aucune comparaison ni référence enregistrée")
+            return 1
+        if args.enregistrer_reference:
+            suite.save_reference(results)
+            return 0
+        return 1 if suite.compare(results) else 0
+
+    except KeyboardInterrupt:
+        logger.warning("Interruption par l'utilisateur (Ctrl+C)")
+        return 1
+
+    except Exception as e:
+        logger.error("Erreur fatale lors du benchmark")
+        logger.exception(e)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
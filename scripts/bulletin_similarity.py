@@ -0,0 +1,327 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.catalog import BulletinCatalog, STATUS_FAILED
+from utils.config_loader import ConfigLoader
+from utils.logger import setup_logging, get_logger
+from utils.text_normalization import tokenize
+
+# Initialiser le logger
+logger = get_logger(__name__)
+
+# Comptes bruts par bulletin (CSR, une ligne par bulletin) : base du recalcul des poids
+COUNTS_INDPTR_FILE = "counts_indptr.npy"
+COUNTS_FEATURES_FILE = "counts_features.npy"
+COUNTS_VALUES_FILE = "counts_values.npy"
+DOC_IDS_FILE = "doc_ids.npy"
+
+# Index inversé des poids TF-IDF normalisés (CSC, une colonne par feature hachée)
+INDEX_INDPTR_FILE = "index_indptr.npy"
+INDEX_DOCS_FILE = "index_docs.npy"
+INDEX_WEIGHTS_FILE = "index_weights.npy"
+IDF_FILE = "idf.npy"
+
+# Chaque indexation écrit ses tableaux dans un nouveau dossier v<version> ; le manifeste,
+# remplacé en dernier, désigne le dossier valide
+MANIFEST_FILE = "manifest.json"
+VERSION_PREFIX = "v"
+
+# En dessous de ce nombre de bulletins, df_max n'élague aucune feature
+MIN_DOCS_ELAGAGE = 20
+
+
+def hash_features(text: str, n_bits: int) -> tuple:
+    """
+    Features hachées d'un texte (crc32 des mots de tokenize(), sans vocabulaire).
+
+    Returns:
+        tuple: (features uint32 triées, comptes float32)
+    """
+    counts = Counter(tokenize(text))
+    mask = (1 << n_bits) - 1
+    hashed = Counter()
+    for token, count in counts.items():
+        hashed[zlib.crc32(token.encode("utf-8")) & mask] += count
+    features = np.fromiter(hashed.keys(), dtype=np.uint32, count=len(hashed))
+    values = np.fromiter(hashed.values(), dtype=np.float32, count=len(hashed))
+    order = np.argsort(features)
+    return features[order], values[order]
+
+
+def tfidf_weights(features: np.ndarray, counts: np.ndarray, idf: np.ndarray) -> np.ndarray:
+    """Poids (1 + log tf) x idf d'une ligne, normalisés en norme L2"""
+    weights = (1 + np.log(counts)) * idf[features]
+    norm = np.sqrt(np.dot(weights, weights))
+    return weights / norm if norm > 0 else weights
+
+
+class TfidfIndex:
+    """
+    Lecture de la matrice TF-IDF hachée du corpus et recherche des k bulletins les plus
+    proches (cosinus). Seules les listes de postings des features de la requête sont
+    parcourues : le coût dépend de la requête, pas de la taille du corpus au carré.
+    """
+
+    def __init__(self, tfidf_dir: str = None):
+        self.config_loader = ConfigLoader("config.yaml")
+        if tfidf_dir is None:
+            tfidf_dir = self.config_loader.get_path(self.config_loader.config["data"]["tfidf_dir"])
+        self.tfidf_dir = tfidf_dir
+        self.n_bits = self.config_loader.config["analyse"]["similarite"]["bits_hachage"]
+        self.reload()
+
+    def _load(self, file_name, dtype, default_size=0, mmap_mode=None):
+        if self.data_dir is not None:
+            return np.load(os.path.join(self.data_dir, file_name), mmap_mode=mmap_mode)
+        return np.zeros(default_size, dtype=dtype)
+
+    def reload(self):
+        """(Re)charge les tableaux de la version désignée par le manifeste (postings en mémoire partagée)"""
+        self.manifest = None
+        self.data_dir = None
+        manifest_path = os.path.join(self.tfidf_dir, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+            self.data_dir = os.path.join(self.tfidf_dir, self.manifest["dir"])
+
+        n_features = 1 << self.n_bits
+        self.counts_indptr = self._load(COUNTS_INDPTR_FILE, np.int64, 1)
+        self.counts_features = self._load(COUNTS_FEATURES_FILE, np.uint32, mmap_mode="r")
+        self.counts_values = self._load(COUNTS_VALUES_FILE, np.float32, mmap_mode="r")
+        self.doc_ids = self._load(DOC_IDS_FILE, np.int64)
+        self.index_indptr = self._load(INDEX_INDPTR_FILE, np.int64, n_features + 1)
+        self.index_docs = self._load(INDEX_DOCS_FILE, np.int32, mmap_mode="r")
+        self.index_weights = self._load(INDEX_WEIGHTS_FILE, np.float32, mmap_mode="r")
+        self.idf = self._load(IDF_FILE, np.float32, n_features)
+        self.doc_index = {int(doc_id): i for i, doc_id in enumerate(self.doc_ids)}
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def doc_vector(self, bulletin_id: int) -> tuple:
+        """(features, poids normalisés) d'un bulletin indexé"""
+        i = self.doc_index[bulletin_id]
+        start, end = self.counts_indptr[i], self.counts_indptr[i + 1]
+        features = np.asarray(self.counts_features[start:end])
+        return features, tfidf_weights(features, np.asarray(self.counts_values[start:end]), self.idf)
+
+    def text_vector(self, text: str) -> tuple:
+        """(features, poids normalisés) d'un texte libre"""
+        features, counts = hash_features(text, self.n_bits)
+        return features, tfidf_weights(features, counts, self.idf)
+
+    def scores(self, features: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Cosinus entre un vecteur normalisé et chaque bulletin indexé"""
+        keep = weights > 0
+        features, weights = features[keep], weights[keep]
+        starts = self.index_indptr[features]
+        lengths = self.index_indptr[features + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(len(self.doc_ids), dtype=np.float32)
+        # Positions de toutes les postings concernées, sans boucle Python
+        shifts = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        positions = shifts + np.arange(total)
+        contributions = self.index_weights[positions] * np.repeat(weights, lengths)
+        return np.bincount(self.index_docs[positions], weights=contributions, minlength=len(self.doc_ids))
+
+    def top_k(self, features: np.ndarray, weights: np.ndarray, k: int, exclude: int = None) -> list:
+        """Les k bulletins les plus proches : [(bulletin_id, score)] par score décroissant"""
+        if isinstance(k, bool) or not isinstance(k, (int, np.integer)) or k < 1:
+            raise ValueError(f"k doit être un entier strictement positif: {k!r}")
+        scores = self.scores(features, weights)
+        if exclude is not None and exclude in self.doc_index:
+            scores[self.doc_index[exclude]] = -1
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(self.doc_ids[i]), float(scores[i])) for i in best if scores[i] > 0]
+
+    def similar(self, bulletin_id: int, k: int = 10) -> list:
+        """Bulletins passés les plus proches d'un bulletin indexé (lui-même exclu)"""
+        features, weights = self.doc_vector(bulletin_id)
+        return self.top_k(features, weights, k, exclude=bulletin_id)
+
+    def similar_to_text(self, text: str, k: int = 10) -> list:
+        features, weights = self.text_vector(text)
+        return self.top_k(features, weights, k)
+
+
+class TfidfIndexer:
+    """
+    Étape 'tfidf' : hache les BSV nettoyés depuis le dernier passage, ajoute leurs comptes
+    à la matrice CSR du corpus puis recalcule idf et index inversé de façon vectorisée.
+    """
+
+    def __init__(self, tfidf_dir: str = None, catalog_path: str = None):
+        self.config_loader = ConfigLoader("config.yaml")
+        if tfidf_dir is None:
+            tfidf_dir = self.config_loader.get_path(self.config_loader.config["data"]["tfidf_dir"])
+        self.tfidf_dir = tfidf_dir
+        os.makedirs(self.tfidf_dir, exist_ok=True)
+        similarite_cfg = self.config_loader.config["analyse"]["similarite"]
+        self.n_bits = similarite_cfg["bits_hachage"]
+        self.df_max = similarite_cfg["df_max"]
+        self.catalog = BulletinCatalog(catalog_path)
+
+    def _save(self, manifest: dict, arrays: dict):
+        """
+        Écrit tous les tableaux dans un nouveau dossier de version puis bascule le manifeste
+        (os.replace atomique) : un lecteur voit l'ancienne ou la nouvelle version entière.
+        """
+        version = (manifest or {}).get("version", 0) + 1
+        dir_name = f"{VERSION_PREFIX}{version}"
+        data_dir = os.path.join(self.tfidf_dir, dir_name)
+        # Reste d'une indexation interrompue, jamais désigné par le manifeste
+        shutil.rmtree(data_dir, ignore_errors=True)
+        os.makedirs(data_dir)
+        for file_name, array in arrays.items():
+            np.save(os.path.join(data_dir, file_name), array)
+
+        manifest_path = os.path.join(self.tfidf_dir, MANIFEST_FILE)
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": version, "dir": dir_name}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+        # Versions précédentes (les lecteurs déjà ouverts gardent leur mmap)
+        for name in os.listdir(self.tfidf_dir):
+            if name.startswith(VERSION_PREFIX) and name != dir_name and name[len(VERSION_PREFIX):].isdigit():
+                shutil.rmtree(os.path.join(self.tfidf_dir, name), ignore_errors=True)
+
+    def _fusionner(self, index, nouveaux_docs):
+        """Comptes CSR : lignes conservées puis nouvelles lignes (bulletins re-nettoyés remplacés)"""
+        remplaces = {doc_id for doc_id, _, _ in nouveaux_docs}
+        conserves = np.array([i for i, doc_id in enumerate(index.doc_ids) if int(doc_id) not in remplaces],
+                             dtype=np.int64)
+        starts, ends = index.counts_indptr[conserves], index.counts_indptr[conserves + 1]
+        lengths = np.concatenate((ends - starts, [len(f) for _, f, _ in nouveaux_docs])).astype(np.int64)
+        positions = np.repeat(starts - np.concatenate(([0], np.cumsum(ends - starts)[:-1])), ends - starts) + \
+            np.arange(int((ends - starts).sum()))
+
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        features = np.concatenate([np.asarray(index.counts_features[positions], dtype=np.uint32)] +
+                                  [f for _, f, _ in nouveaux_docs])
+        values = np.concatenate([np.asarray(index.counts_values[positions], dtype=np.float32)] +
+                                [v for _, _, v in nouveaux_docs])
+        doc_ids = np.concatenate((index.doc_ids[conserves], [d for d, _, _ in nouveaux_docs])).astype(np.int64)
+        return indptr, features, values, doc_ids
+
+    def _index_inverse(self, indptr, features, values):
+        """idf lissé, poids (1 + log tf) x idf normalisés par bulletin, puis tri par feature"""
+        n_docs = len(indptr) - 1
+        n_features = 1 << self.n_bits
+        df = np.bincount(features, minlength=n_features)
+        idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+        if n_docs >= MIN_DOCS_ELAGAGE:
+            # Mots présents presque partout : peu discriminants et postings les plus longues
+            idf[df > self.df_max * n_docs] = 0
+
+        rows = np.repeat(np.arange(n_docs, dtype=np.int32), np.diff(indptr))
+        weights = (1 + np.log(values)) * idf[features]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n_docs))
+        weights = weights / np.where(norms > 0, norms, 1)[rows]
+
+        keep = weights > 0
+        order = np.argsort(features[keep], kind="stable")
+        index_indptr = np.zeros(n_features + 1, dtype=np.int64)
+        np.cumsum(np.bincount(features[keep], minlength=n_features), out=index_indptr[1:])
+        return idf, index_indptr, rows[keep][order], weights[keep][order].astype(np.float32)
+
+    def indexer_nouveaux_fichiers(self, region=None, culture=None, year=None):
+        """Ajoute à la matrice TF-IDF les bulletins nettoyés pas encore indexés"""
+        logger.info("Debut de l'indexation TF-IDF")
+        index = TfidfIndex(self.tfidf_dir)
+        nouveaux_docs = []
+        succes = []
+        total_files = 0
+
+        for bulletin in self.catalog.pending("tfidf", region=region, culture=culture, year=year):
+            total_files += 1
+            chemin = self.catalog.absolute_path(bulletin["input_path"])
+            started_at = time.time()
+            start = time.perf_counter()
+            try:
+                with open(chemin, "r", encoding="utf-8") as f:
+                    features, counts = hash_features(f.read(), self.n_bits)
+                nouveaux_docs.append((bulletin["id"], features, counts))
+                succes.append((bulletin["id"], started_at, time.perf_counter() - start, len(features)))
+            except Exception as e:
+                self.catalog.record_stage(bulletin["id"], "tfidf", status=STATUS_FAILED, started_at=started_at,
+                                          duration=time.perf_counter() - start, detail=str(e))
+                logger.error(f"Erreur lors de l'indexation de {chemin}: {e}")
+
+        if nouveaux_docs:
+            indptr, features, values, doc_ids = self._fusionner(index, nouveaux_docs)
+            idf, index_indptr, index_docs, index_weights = self._index_inverse(indptr, features, values)
+            manifest = index.manifest
+            # Libérer les tableaux ouverts en mmap avant de supprimer l'ancienne version
+            del index
+            self._save(manifest, {
+                COUNTS_INDPTR_FILE: indptr, COUNTS_FEATURES_FILE: features, COUNTS_VALUES_FILE: values,
+                DOC_IDS_FILE: doc_ids, IDF_FILE: idf, INDEX_INDPTR_FILE: index_indptr,
+                INDEX_DOCS_FILE: index_docs, INDEX_WEIGHTS_FILE: index_weights,
+            })
+            for bulletin_id, started_at, duration, n_features in succes:
+                self.catalog.record_stage(bulletin_id, "tfidf", started_at=started_at, duration=duration,
+                                          detail=f"{n_features} features")
+            logger.info(f"Matrice TF-IDF: {len(doc_ids)} bulletins, {len(features)} valeurs non nulles")
+
+        logger.info(f"Indexation terminee: {len(succes)}/{total_files} fichiers")
+        return len(succes), total_files
+
+
+def main():
+    """Fonction principale"""
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Index TF-IDF haché et recherche de bulletins similaires")
+    parser.add_argument("--bulletin", type=int, help="identifiant catalogue du bulletin de référence")
+    parser.add_argument("--k", type=int, help="nombre de bulletins similaires")
+    args = parser.parse_args()
+
+    try:
+        if args.bulletin is None:
+            success, total = TfidfIndexer().indexer_nouveaux_fichiers()
+            return 0 if success == total else 1
+
+        index = TfidfIndex()
+        k = args.k or index.config_loader.config["analyse"]["similarite"]["k"]
+        catalog = BulletinCatalog()
+        start = time.perf_counter()
+        resultats = index.similar(args.bulletin, k)
+        logger.info(f"{len(resultats)} bulletin(s) similaire(s) en {(time.perf_counter() - start) * 1000:.1f} ms")
+        for bulletin_id, score in resultats:
+            bulletin = catalog.get(bulletin_id)
+            logger.info(f"  {score:.3f}  {bulletin['issue_date'] or bulletin['year']}  {bulletin['file_name']}")
+        return 0
+
+    except KeyError:
+        logger.error(f"Bulletin {args.bulletin} absent de l'index TF-IDF")
+        return 1
+
+    except KeyboardInterrupt:
+        logger.warning("Interruption par l'utilisateur (Ctrl+C)")
+        return 1
+
+    except Exception as e:
+        logger.error("Erreur fatale lors de l'indexation TF-IDF")
+        logger.exception(e)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
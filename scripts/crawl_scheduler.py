@@ -0,0 +1,304 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+
+# Ajouter le dossier parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.scraping import retrieve_website_page, find_year_links, find_pdf_links
+from utils.catalog import BulletinCatalog
+from utils.config_loader import ConfigLoader
+from utils.fetch_queue import FetchQueue
+from utils.file_utils import download_pdf, FetchError
+from utils.logger import setup_logging, get_logger
+
+
+logger = get_logger(__name__)
+
+# Culture utilisée pour les régions dont les pages mélangent toutes les filières
+ALL_CROPS = "toutes_cultures"
+
+# Dossier des bulletins dont l'année n'est connue qu'après lecture de leur date de parution
+UNDATED_DIR = "en_cours"
+
+
+@dataclass
+class CrawlJob:
+    """Une requête HTTP à effectuer : page d'archives, page de bulletins ou PDF"""
+    kind: str  # 'archive' | 'listing' | 'pdf'
+    region: str
+    culture: str
+    url: str
+    year: int = None
+
+
+def region_campaigns(scraping_cfg: dict, region: str) -> dict:
+    """
+    Normalise la configuration d'une région, quel que soit son schéma :
+      - current_campaign / previous_campaigns : {culture: url relative à draaf_url_website ou absolue}
+      - base_url / current_campaign_url : pages uniques de la région (toutes cultures)
+
+    Returns:
+        dict: {'output_dir', 'current': {culture: url}, 'previous': {culture: url}}
+    """
+    region_cfg = scraping_cfg["regions"][region]
+    site_url = region_cfg.get("site_url", scraping_cfg["draaf_url_website"])
+
+    def resolve(pages):
+        return {culture: urljoin(site_url, page) for culture, page in (pages or {}).items() if page}
+
+    current = resolve(region_cfg.get("current_campaign"))
+    previous = resolve(region_cfg.get("previous_campaigns"))
+    if region_cfg.get("current_campaign_url"):
+        current.setdefault(ALL_CROPS, region_cfg["current_campaign_url"])
+    if region_cfg.get("base_url"):
+        previous.setdefault(ALL_CROPS, region_cfg["base_url"])
+
+    return {
+        "output_dir": region_cfg.get("output_dir_pase_path") or region_cfg["output_dir_path"],
+        "current": current,
+        "previous": previous,
+    }
+
+
+class HostLimiter:
+    """
+    Politesse par site : au plus max_per_host requêtes simultanées vers un même hôte et
+    un délai minimal entre deux requêtes. Les hôtes différents ne se bloquent pas entre eux.
+    """
+
+    def __init__(self, max_per_host: int, delay: float):
+        self.max_per_host = max_per_host
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_slot = {}
+
+    def _host_state(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+                self._next_slot[host] = 0.0
+            return self._semaphores[host]
+
+    @contextmanager
+    def __call__(self, url: str):
+        host = urlparse(url).netloc
+        semaphore = self._host_state(host)
+        with semaphore:
+            with self._lock:
+                wait_until = max(self._next_slot[host], time.monotonic())
+                self._next_slot[host] = wait_until + self.delay
+            time.sleep(max(0.0, wait_until - time.monotonic()))
+            yield
+
+
+class CrawlScheduler:
+    """
+    Développe toutes les combinaisons région x culture x campagne (en cours et archivées)
+    de config.yaml en tâches, exécutées en parallèle avec une limite par site : la durée
+    d'un crawl national est celle du site le plus lent, pas la somme des sites.
+    """
+
+    def __init__(self):
+        self.cfg = ConfigLoader().config
+        self.base_directory_path = ConfigLoader().base_dir
+        crawl_cfg = self.cfg["scraping"]["crawl"]
+
+        self.max_workers = crawl_cfg["max_workers"]
+        self.year_count = crawl_cfg["year_count"]
+        self.origin_year = crawl_cfg["origin_year"]
+        self.limiter = HostLimiter(crawl_cfg["max_par_hote"], crawl_cfg["delai_par_hote"])
+        self.catalog = BulletinCatalog()
+        self.queue = FetchQueue()
+        # reprises : échecs temporaires replanifiés ; abandons : URL passées en dead-letter
+        self.stats = {"pages": 0, "pdf": 0, "reprises": 0, "abandons": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def expand_jobs(self, regions=None) -> list:
+        """Tâches initiales : une page par région x culture x campagne configurée"""
+        jobs = []
+        for region in regions or self.cfg["scraping"]["regions"]:
+            campaigns = region_campaigns(self.cfg["scraping"], region)
+            for culture, url in campaigns["previous"].items():
+                jobs.append(CrawlJob("archive", region, culture, url))
+            for culture, url in campaigns["current"].items():
+                jobs.append(CrawlJob("listing", region, culture, url, self.origin_year))
+        logger.info(f"{len(jobs)} page(s) de campagne à parcourir")
+        return jobs
+
+    def _output_dir(self, job):
+        output_dir = region_campaigns(self.cfg["scraping"], job.region)["output_dir"]
+        year_dir = str(job.year) if job.year is not None else UNDATED_DIR
+        return os.path.join(self.base_directory_path, output_dir, year_dir)
+
+    def run_job(self, job: CrawlJob) -> list:
+        """Exécute une tâche et retourne les tâches qu'elle engendre (FetchError en cas d'échec)"""
+        if job.kind == "pdf":
+            file_name = job.url.split("/")[-1]
+            output_dir = self._output_dir(job)
+            start = time.perf_counter()
+            with self.limiter(job.url):
+                download_pdf(job.url, output_dir, file_name, raise_errors=True)
+            self._count("pdf")
+            self.catalog.register_pdf(os.path.join(output_dir, file_name), job.region, job.culture, job.year,
+                                      source_url=job.url, duration=time.perf_counter() - start)
+            return []
+
+        with self.limiter(job.url):
+            html_content = retrieve_website_page(job.url, raise_errors=True)
+        self._count("pages")
+
+        if job.kind == "archive":
+            years = range(self.origin_year - 1, self.origin_year - self.year_count - 1, -1)
+            return [CrawlJob("listing", job.region, job.culture, url, year)
+                    for year, url in find_year_links(html_content, job.url, years).items()]
+
+        children = []
+        for pdf_url in find_pdf_links(html_content, job.url):
+            known = self.catalog.find_by_url(pdf_url)
+            if known is not None and os.path.exists(self.catalog.absolute_path(known["pdf_path"])):
+                continue
+            children.append(CrawlJob("pdf", job.region, job.culture, pdf_url, job.year))
+        logger.info(f"{job.region}/{job.culture}/{job.year}: {len(children)} nouveau(x) PDF")
+        return children
+
+    def enqueue(self, jobs, rearm: bool = False):
+        """Ajoute des tâches à la file persistante (rearm : pages d'index à reparcourir)"""
+        for job in jobs:
+            self.queue.enqueue(job.url, job.kind, job.region, job.culture, job.year,
+                               rearm=rearm and job.kind != "pdf")
+
+    def crawl(self, regions=None, resume: bool = False):
+        """
+        Parcourt toutes les campagnes configurées. Avec resume=True, seules les URL restées
+        en attente (échecs replanifiés, crawl interrompu) sont reprises.
+        """
+        logger.info("=" * 80)
+        logger.info("DÉBUT DU CRAWL MULTI-RÉGIONS" + (" (reprise)" if resume else ""))
+        logger.info("=" * 80)
+        start = time.perf_counter()
+
+        if not resume:
+            self.enqueue(self.expand_jobs(regions), rearm=True)
+        self.drain()
+
+        logger.info("=" * 80)
+        logger.info(f"CRAWL TERMINÉ en {time.perf_counter() - start:.1f}s: {self.stats['pages']} page(s), "
+                    f"{self.stats['pdf']} PDF, {self.stats['reprises']} échec(s) temporaire(s), "
+                    f"{self.stats['abandons']} abandon(s)")
+        logger.info("=" * 80)
+        return self.stats
+
+    def drain(self, wait_for_retries: bool = True, urls=None):
+        """
+        Exécute les tâches de la file persistante jusqu'à ce qu'elle soit vide. Sans
+        wait_for_retries, les tâches en attente de backoff sont laissées pour plus tard.
+        Avec 'urls', seules ces tâches et celles qu'elles engendrent sont exécutées.
+        """
+        urls = None if urls is None else set(urls)
+        # File d'attente par site : on ne soumet au pool que les tâches d'un site qui a une
+        # place libre, pour qu'un site très fourni n'occupe pas tous les workers
+        queues = defaultdict(deque)
+        in_flight = defaultdict(int)
+        claimed = set()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+
+            def dispatch():
+                for row in self.queue.ready(urls=urls):
+                    if row["url"] not in claimed:
+                        claimed.add(row["url"])
+                        queues[urlparse(row["url"]).netloc].append(
+                            CrawlJob(row["kind"], row["region"], row["culture"], row["url"], row["year"]))
+                for host, queue in queues.items():
+                    while queue and in_flight[host] < self.limiter.max_per_host:
+                        job = queue.popleft()
+                        in_flight[host] += 1
+                        running[executor.submit(self.run_job, job)] = job
+
+            dispatch()
+            while True:
+                if not running:
+                    next_attempt_at = self.queue.next_attempt_at(urls=urls)
+                    if next_attempt_at is None or not wait_for_retries:
+                        break
+                    time.sleep(max(0.0, next_attempt_at - time.time()))
+                    dispatch()
+                    continue
+
+                # Hors fin de tâche, seule l'échéance d'un backoff justifie de se réveiller
+                next_retry_at = self.queue.next_attempt_at(after=time.time(), urls=urls) if wait_for_retries else None
+                timeout = None if next_retry_at is None else max(0.0, next_retry_at - time.time())
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    in_flight[urlparse(job.url).netloc] -= 1
+                    claimed.discard(job.url)
+                    try:
+                        children = future.result()
+                    except Exception as e:
+                        if not isinstance(e, FetchError):
+                            logger.error(f"Erreur inattendue pour la tâche {job.kind} {job.url}")
+                            logger.exception(e)
+                            e = FetchError(job.url, f"Erreur inattendue: {e}")
+                        self._count("reprises" if self.queue.mark_failed(job.url, e) else "abandons")
+                        continue
+                    self.queue.mark_done(job.url)
+                    self.enqueue(children, rearm=True)
+                    if urls is not None:
+                        urls.update(child.url for child in children)
+                dispatch()
+
+
+def main():
+
+    setup_logging()
+    logger.info("Démarrage du crawl BSV multi-régions")
+    logger.info("Plant Health NLP Analysis - Polytech Dijon")
+
+    parser = argparse.ArgumentParser(description="Crawl des BSV de toutes les régions configurées")
+    parser.add_argument("--resume", action="store_true",
+                        help="reprendre uniquement les URL en attente ou en échec")
+    parser.add_argument("--replay-dead-letters", action="store_true",
+                        help="remettre en file les URL abandonnées avant de reprendre")
+    args = parser.parse_args()
+
+    try:
+        scheduler = CrawlScheduler()
+        if args.replay_dead_letters:
+            scheduler.queue.replay()
+        scheduler.crawl(resume=args.resume or args.replay_dead_letters)
+        # Les échecs temporaires repris avec succès ne comptent pas ; seules les URL abandonnées
+        dead_letters = scheduler.queue.dead_letters()
+        if dead_letters:
+            logger.warning(f"{len(dead_letters)} URL en dead-letter (--replay-dead-letters pour les reprendre)")
+            return 1
+        logger.info("Script terminé avec succès")
+        return 0
+
+    except KeyboardInterrupt:
+        logger.warning("Interruption par l'utilisateur (Ctrl+C)")
+        return 1
+
+    except Exception as e:
+        logger.error("Erreur fatale lors de l'exécution du script")
+        logger.exception(e)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,47 +1,117 @@
 import os
 import sys
+import time
 
 import pdfplumber
+import pymupdf
 from pathlib import Path
 
+from utils.catalog import BulletinCatalog, STATUS_FAILED
+from utils.table_store import TableStore
 from utils.config_loader import ConfigLoader
 from utils.file_utils import logger
 from utils.logger import setup_logging
+from utils.page_triage import PageTriage, PAGES_CONTENU, page_marker
 
 
 class TextExtractor:
 
-    def __init__(self):
+    def __init__(self, catalog_path: str = None, table_store_path: str = None):
         self.cfg = ConfigLoader().config
         self.base_directory_path = ConfigLoader().base_dir
+        self.catalog = BulletinCatalog(catalog_path)
+        # Les tableaux sont rangés par défaut dans la base du catalogue
+        self.table_store = TableStore(table_store_path or catalog_path)
+        self.triage = PageTriage()
+        # Classement des pages du dernier PDF traité (PageTriage.classify)
+        self.pages = None
         logger.info("Initialisation de l'extracteur de texte")
         logger.debug(f"Répertoire de base: {self.base_directory_path}")
 
 
+    def extract_pdf(self, fichier, output_path):
+        """
+        Extrait le texte d'un PDF dans un fichier texte et retourne tous ses tableaux,
+        destinés au TableStore plutôt qu'au fichier texte. Un triage PyMuPDF préalable
+        écarte les pages vides et images (à passer en OCR) et réserve l'extraction des
+        tableaux aux pages comportant des traits ; le type de chaque page est noté dans son
+        en-tête.
+
+        Returns:
+            list: (numéro de page, indice du tableau sur la page, lignes brutes)
+        """
+        extracted_text = []
+        tables = []
+        with pymupdf.open(fichier) as doc:
+            self.pages = self.triage.classify_document(doc)
+        with pdfplumber.open(fichier) as pdf:
+            for page, triage in zip(pdf.pages, self.pages):
+                extracted_text.append(page_marker(triage, len(pdf.pages)))
+                if triage["kind"] not in PAGES_CONTENU:
+                    continue
+                extracted_text.append(page.extract_text())
+                # La stratégie par défaut de pdfplumber ne trouve que des tableaux tracés : inutile
+                # sans aucun trait, même sous le seuil 'tableau' (petit tableau dans une page de texte)
+                if triage["strokes"]:
+                    for table_index, rows in enumerate(page.extract_tables()):
+                        tables.append((page.page_number, table_index, rows))
+        with open(output_path, "w") as text_file:
+            for chunk in extracted_text:
+                if chunk:
+                    text_file.write(chunk)
+        return tables
+
     def extract_text_pdfplumber(self, region="bourgogne_franche_comte", culture_type="grandes_cultures", year_count=3,origin_year=2025):
+        """
+        Extrait texte et tableaux des bulletins en attente des années demandées, ainsi que
+        des bulletins dont l'année est inconnue. Un PDF en erreur est noté en échec au
+        catalogue sans interrompre les suivants.
+
+        Returns:
+            tuple: (fichiers traités avec succès, fichiers en attente)
+        """
         extracted_text_file_base_output_dir = os.path.join(self.base_directory_path, self.cfg["scraping"]["regions"][region]["output_dir_extracted_base_path"])
         scrapped_file_base_output_dir = Path(str(os.path.join(self.base_directory_path, self.cfg["scraping"]["regions"][region]["output_dir_pase_path"])))
-        extracted_text = []
-        start_year = origin_year - 1
-        end_year = origin_year - year_count - 1
-        print(scrapped_file_base_output_dir)
-        for year in range(start_year, end_year, -1):
-            bsv_dir = scrapped_file_base_output_dir / str(year)
-            print(scrapped_file_base_output_dir)
-            for fichier in bsv_dir.glob("*.pdf"):  # tous les PDF du dossier
-                file_name = fichier.name.split('.')[0] + '.txt'
-                with pdfplumber.open(fichier) as pdf:
-                    for page in pdf.pages:
-                        extracted_text.append(f" ===== Page {page.page_number} of {len(pdf.pages)}  ====== \n")
-                        extracted_text.append(page.extract_text())
-                        extracted_text.append(page.extract_table())
-                year_dir = os.path.join(str(extracted_text_file_base_output_dir), str(year))
+        years = range(origin_year - 1, origin_year - year_count - 1, -1)
+        self.catalog.sync_raw_directory(str(scrapped_file_base_output_dir), region, culture_type)
+
+        # Texte et tableaux sont extraits en une seule lecture du PDF
+        pending = {bulletin["id"]: bulletin for stage in ("extract_pdfplumber", "tables")
+                   for bulletin in self.catalog.pending(stage, region=region, culture=culture_type)
+                   if bulletin["year"] is None or bulletin["year"] in years}
+        success_files = 0
+        for bulletin in pending.values():
+            fichier = Path(self.catalog.absolute_path(bulletin["input_path"]))
+            file_name = fichier.name.split('.')[0] + '.txt'
+            if bulletin["year"] is not None:
+                year_dir = os.path.join(str(extracted_text_file_base_output_dir), str(bulletin["year"]))
+            else:
+                # Année inconnue : même arborescence que les PDF bruts
+                year_dir = os.path.join(str(extracted_text_file_base_output_dir),
+                                        os.path.relpath(fichier.parent, scrapped_file_base_output_dir))
+            output_path = os.path.join(year_dir, file_name)
+            started_at = time.time()
+            start = time.perf_counter()
+            try:
                 os.makedirs(year_dir, exist_ok=True)
-                with open(f'{year_dir}/{file_name}', "w") as text_file:
-                    for chunk in extracted_text:
-                        if chunk:
-                            text_file.write(str(chunk))
-                extracted_text.clear()
+                tables = self.extract_pdf(fichier, output_path)
+            except Exception as e:
+                logger.error(f"Echec extraction pdfplumber de {fichier}: {e}")
+                for stage in ("extract_pdfplumber", "tables"):
+                    self.catalog.record_stage(bulletin["id"], stage, status=STATUS_FAILED, started_at=started_at,
+                                              duration=time.perf_counter() - start, detail=str(e))
+                continue
+            success_files += 1
+            self.catalog.record_stage(bulletin["id"], "extract_pdfplumber", path=output_path, started_at=started_at,
+                                      duration=time.perf_counter() - start)
+            self.catalog.replace_pages(bulletin["id"], self.pages)
+            cells = self.table_store.replace_tables(bulletin["id"], tables)
+            self.catalog.record_stage(bulletin["id"], "tables", started_at=started_at,
+                                      duration=time.perf_counter() - start,
+                                      detail=f"{len(tables)} tableau(x), {cells} cellule(s)")
+
+        logger.info(f"Extraction pdfplumber terminée: {success_files}/{len(pending)} fichiers traités avec succès")
+        return success_files, len(pending)
 
 
 def main():
@@ -49,12 +119,15 @@ def main():
     logger.info("Démarrage du script extraction de texte")
     try:
         textExtractor = TextExtractor()
-        textExtractor.extract_text_pdfplumber(
+        success, total = textExtractor.extract_text_pdfplumber(
             region="bourgogne_franche_comte",
             culture_type="grandes_cultures",
             year_count=3,
             origin_year=2025
         )
+        if success != total:
+            logger.warning(f"Extraction partielle: {success}/{total} fichiers")
+            return 1
         logger.info("Script terminé avec succès")
         return 0
     except KeyboardInterrupt:
@@ -68,5 +141,3 @@ def main():
 
 if __name__ == "__main__":
     sys.exit(main())
-
-
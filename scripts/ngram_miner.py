@@ -0,0 +1,242 @@
+import csv
+import heapq
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.tokenisation import TokenStore
+from utils.catalog import BulletinCatalog
+from utils.config_loader import ConfigLoader
+from utils.logger import setup_logging, get_logger
+from utils.text_normalization import load_term_list, tokenize
+
+# Initialiser le logger
+logger = get_logger(__name__)
+
+# Un n-gramme (n <= 3) est encodé sur 64 bits : n sur les bits 60-61, puis 20 bits par token
+TOKEN_BITS = 20
+MAX_TOKEN_ID = (1 << TOKEN_BITS) - 1
+
+# Mots outils qui ne peuvent ni ouvrir ni fermer un terme candidat
+STOPWORDS = frozenset("""
+a au aux avec ce ces cette dans de des du elle en est et etre il ils la le les leur leurs lors mais ne
+nous on ou par pas peu plus pour qu que qui sa se ses si son sont sur ta te tres un une vers vos votre d l
+n s c j m t y
+""".split())
+
+
+def encode_ngrams(tokens: np.ndarray, n: int) -> np.ndarray:
+    """Clés uint64 de tous les n-grammes d'un tableau de tokens (vectorisé)"""
+    if len(tokens) < n:
+        return np.zeros(0, dtype=np.uint64)
+    keys = np.full(len(tokens) - n + 1, n << 60, dtype=np.uint64)
+    for i in range(n):
+        part = tokens[i:len(tokens) - n + 1 + i].astype(np.uint64)
+        keys |= part << np.uint64(TOKEN_BITS * (n - 1 - i))
+    return keys
+
+
+def decode_ngram(key: int) -> list:
+    """Identifiants des tokens d'une clé de n-gramme"""
+    n = key >> 60
+    return [(key >> (TOKEN_BITS * (n - 1 - i))) & MAX_TOKEN_ID for i in range(n)]
+
+
+class CountMinSketch:
+    """Compteur approché en mémoire fixe (largeur x profondeur compteurs), ne sous-estime jamais"""
+
+    def __init__(self, width: int, depth: int, seed: int = 0):
+        self.width = 1 << max(1, int(width - 1).bit_length())  # puissance de 2
+        self.shift = np.uint64(64 - int(math.log2(self.width)))
+        rng = np.random.default_rng(seed)
+        self.multipliers = rng.integers(1, 2 ** 63, size=depth, dtype=np.uint64) | np.uint64(1)
+        self.table = np.zeros((depth, self.width), dtype=np.int64)
+
+    def _buckets(self, keys: np.ndarray) -> np.ndarray:
+        # Hachage multiplicatif : débordement uint64 voulu
+        with np.errstate(over="ignore"):
+            return (keys[None, :] * self.multipliers[:, None]) >> self.shift
+
+    def add(self, keys: np.ndarray, counts: np.ndarray):
+        buckets = self._buckets(keys)
+        for row in range(len(self.multipliers)):
+            np.add.at(self.table[row], buckets[row].astype(np.intp), counts)
+
+    def query(self, keys: np.ndarray) -> np.ndarray:
+        buckets = self._buckets(keys).astype(np.intp)
+        return np.min(self.table[np.arange(len(self.multipliers))[:, None], buckets], axis=0)
+
+
+class SpaceSaving:
+    """Heavy hitters (algorithme Space-Saving) : au plus k compteurs surveillés"""
+
+    def __init__(self, k: int):
+        self.k = k
+        self.counts = {}
+        self._heap = []  # (compte, clé) avec entrées périmées supprimées paresseusement
+
+    def _min(self):
+        while True:
+            count, key = self._heap[0]
+            if self.counts.get(key) == count:
+                return count, key
+            heapq.heappop(self._heap)
+
+    def update(self, key: int, count: int) -> int | None:
+        """Ajoute count à key ; retourne la clé évincée le cas échéant"""
+        evicted = None
+        if key in self.counts:
+            self.counts[key] += count
+        elif len(self.counts) < self.k:
+            self.counts[key] = count
+        else:
+            min_count, evicted = self._min()
+            heapq.heappop(self._heap)
+            del self.counts[evicted]
+            self.counts[key] = min_count + count
+        heapq.heappush(self._heap, (self.counts[key], key))
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(c, k) for k, c in self.counts.items()]
+            heapq.heapify(self._heap)
+        return evicted
+
+
+class PathogenCandidateMiner:
+    """
+    Propose de nouveaux termes de bioagresseurs absents de list/pathogenes.txt en un seul
+    passage sur le corpus tokenisé, en mémoire bornée (Count-Min + Space-Saving) quelle
+    que soit la taille du corpus.
+    """
+
+    def __init__(self, tokens_dir: str = None, catalog_path: str = None):
+        self.config_loader = ConfigLoader("config.yaml")
+        analyse_cfg = self.config_loader.config["analyse"]
+        ngram_cfg = analyse_cfg["ngrammes"]
+
+        self.n_max = min(ngram_cfg["n_max"], 3)
+        self.frequence_min = ngram_cfg["frequence_min"]
+        self.sketch = CountMinSketch(ngram_cfg["cms_largeur"], ngram_cfg["cms_profondeur"])
+        self.heavy_hitters = SpaceSaving(ngram_cfg["top_k"])
+        self.annees = {}  # clé surveillée -> {année: occurrences}
+
+        # Même découpage que le corpus : "Mouche-grise" se compare au n-gramme "mouche grise"
+        self.connus = {" ".join(tokenize(t)) for t in
+                       load_term_list(self.config_loader.get_path(analyse_cfg["pathogenes_list"]))}
+        self.output_path = os.path.join(self.config_loader.get_path(self.config_loader.config["data"]["results_dir"]),
+                                        ngram_cfg["fichier_resultats"])
+
+        self.store = TokenStore(tokens_dir)
+        self.catalog = BulletinCatalog(catalog_path)
+
+    def _traiter_document(self, tokens, annee, exclus):
+        # Les tokens au-delà de 2^20 (vocabulaire très large) ne peuvent pas être encodés
+        hors_limite = np.concatenate(([0], np.cumsum(tokens > MAX_TOKEN_ID)))
+        tokens_encodables = tokens & MAX_TOKEN_ID
+        for n in range(1, self.n_max + 1):
+            if len(tokens) < n:
+                break
+            valides = ~exclus[tokens[:len(tokens) - n + 1]] & ~exclus[tokens[n - 1:]]
+            valides &= (hors_limite[n:] - hors_limite[:-n]) == 0
+            keys = encode_ngrams(tokens_encodables, n)[valides]
+            if len(keys) == 0:
+                continue
+            keys, counts = np.unique(keys, return_counts=True)
+            self.sketch.add(keys, counts)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                evicted = self.heavy_hitters.update(key, count)
+                if evicted is not None:
+                    self.annees.pop(evicted, None)
+                par_annee = self.annees.setdefault(key, {})
+                par_annee[annee] = par_annee.get(annee, 0) + count
+
+    @staticmethod
+    def _tendance(par_annee, tokens_par_annee):
+        """Pente de la fréquence (par million de tokens) en fonction de l'année"""
+        annees = sorted(a for a in tokens_par_annee if a is not None)
+        if len(annees) < 2:
+            return 0.0
+        x = np.array(annees, dtype=float)
+        y = np.array([par_annee.get(a, 0) / tokens_par_annee[a] * 1e6 for a in annees])
+        return float(np.polyfit(x, y, 1)[0])
+
+    def miner(self) -> list:
+        """Parcourt le corpus une fois et retourne les candidats classés"""
+        logger.info(f"Recherche de candidats sur {len(self.store)} document(s)")
+        vocab = self.store.vocab
+        exclus = np.array([t in STOPWORDS or t.isdigit() for t in vocab], dtype=bool)
+        exclus_unigramme = exclus | np.array([len(t) < 5 or not t.isalpha() for t in vocab], dtype=bool)
+
+        annee_par_doc = {row["id"]: row["year"] for row in self.catalog.bulletins()}
+        tokens_par_annee = {}
+        total_tokens = 0
+        for doc_id, tokens in self.store.documents():
+            annee = annee_par_doc.get(doc_id)
+            tokens_par_annee[annee] = tokens_par_annee.get(annee, 0) + len(tokens)
+            total_tokens += len(tokens)
+            self._traiter_document(np.asarray(tokens), annee, exclus)
+
+        unigrammes = self.store.word_counts()
+        candidats = []
+        for key, count in self.heavy_hitters.counts.items():
+            ids = decode_ngram(key)
+            if len(ids) == 1 and exclus_unigramme[ids[0]]:
+                continue
+            terme = " ".join(vocab[i] for i in ids)
+            if terme in self.connus:
+                continue
+            frequence = int(self.sketch.query(np.array([key], dtype=np.uint64))[0])
+            if frequence < self.frequence_min:
+                continue
+            pmi = 0.0
+            if len(ids) > 1:
+                # PMI = log p(w1..wn) / prod p(wi)
+                pmi = math.log(frequence / total_tokens) - sum(math.log(unigrammes[i] / total_tokens) for i in ids)
+            score = math.log(frequence) * (1.0 + max(pmi, 0.0))
+            candidats.append({
+                "terme": terme,
+                "n": len(ids),
+                "frequence": frequence,
+                "pmi": round(pmi, 3),
+                "tendance": round(self._tendance(self.annees.get(key, {}), tokens_par_annee), 3),
+                "score": round(score, 3),
+            })
+
+        candidats.sort(key=lambda c: (c["score"], c["tendance"]), reverse=True)
+        logger.info(f"{len(candidats)} candidat(s) retenu(s)")
+        return candidats
+
+    def ecrire_candidats(self, candidats):
+        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+        with open(self.output_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["terme", "n", "frequence", "pmi", "tendance", "score"])
+            writer.writeheader()
+            writer.writerows(candidats)
+        logger.info(f"Candidats écrits dans {self.output_path}")
+
+
+def main():
+    """Fonction principale"""
+    setup_logging()
+    logger.info("Demarrage de la recherche de nouveaux pathogenes")
+    logger.info("Plant Health NLP Analysis - Polytech Dijon")
+
+    try:
+        miner = PathogenCandidateMiner()
+        miner.ecrire_candidats(miner.miner())
+        return 0
+
+    except KeyboardInterrupt:
+        logger.warning("Interruption par l'utilisateur (Ctrl+C)")
+        return 1
+
+    except Exception as e:
+        logger.error("Erreur fatale lors de la recherche de candidats")
+        logger.exception(e)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
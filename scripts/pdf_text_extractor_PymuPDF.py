@@ -1,16 +1,31 @@
 import pymupdf
 import os
+import re
 import sys
+import time
+from collections import Counter
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.bulletin_metadata import HeaderCollector
+from utils.catalog import BulletinCatalog, STATUS_FAILED, EXTRACTION_TEXTE, EXTRACTION_LAYOUT
 from utils.config_loader import ConfigLoader
 from utils.logger import setup_logging, get_logger
+from utils.page_triage import PageTriage, PAGES_CONTENU, TRIAGE_FLAGS, page_marker
 
 # Initialiser le logger
 logger = get_logger(__name__)
 
+# "3", "Page 3", "3/8", "3 sur 8"
+PAGE_NUMBER = re.compile(r'^(page\s*)?\d+(\s*(/|sur)\s*\d+)?$', re.IGNORECASE)
+
+# Une ligne qui atteint cette part de la largeur du bloc est poursuivie par la suivante
+LIGNE_PLEINE = 0.85
+
+PUCES = ("•", "·", "-", "–", "▪", "\uf0b7")  # \uf0b7 : puce de la police Symbol
+
+
 class PDFTextExtractor:
-    def __init__(self):
+    def __init__(self, mode=None, catalog_path: str = None):
         # Charger la config avec ton ConfigLoader
         self.config_loader = ConfigLoader("config.yaml")
         
@@ -22,47 +37,184 @@ class PDFTextExtractor:
         # Chemin complet 
         self.raw_full_path = self.config_loader.get_path(self.bourgogne_raw_dir)
 
+        # Extraction par mise en page : bandeaux haut/bas de page et blocs répétés
+        extraction_cfg = self.config_loader.config.get("extraction", {})
+        self.mode = mode or extraction_cfg.get("mode", EXTRACTION_TEXTE)
+        self.marge_haute = extraction_cfg.get("marge_haute", 0.07)
+        self.marge_basse = extraction_cfg.get("marge_basse", 0.07)
+        self.repetition_min = extraction_cfg.get("repetition_min", 0.5)
+
+        self.catalog = BulletinCatalog(catalog_path)
+        self.triage = PageTriage()
+
+        # Métadonnées (numéro, date) lues dans les en-têtes retirés lors de la dernière extraction
+        self.metadonnees = None
+        # Classement des pages du dernier PDF traité (PageTriage.classify)
+        self.pages = None
+
+    def _raw_dir(self, region):
+        """Dossier des PDF bruts d'une région"""
+        region_cfg = self.config_loader.config['scraping']['regions'][region]
+        return self.config_loader.get_path(region_cfg.get('output_dir_pase_path') or region_cfg['output_dir_path'])
+
     def extract_text_from_pdf(self, pdf_path, output_path):
-        """Extrait le texte d'un PDF et le sauvegarde dans un fichier texte"""
+        """
+        Extrait le texte d'un PDF et le sauvegarde dans un fichier texte ; chaque page y est
+        précédée d'un séparateur portant son type (pages images et vides sans texte).
+        """
+        self.metadonnees = None
+        self.pages = []
         try:
             with pymupdf.open(pdf_path) as doc:
+                # Triage : la couche texte du classement sert aussi à l'extraction, et seules
+                # les pages de contenu sont extraites (pages vides et images ignorées)
+                contenu = []
+                for page in doc:
+                    textpage = page.get_textpage(flags=TRIAGE_FLAGS)
+                    triage = self.triage.classify(page, textpage)
+                    self.pages.append(triage)
+                    if triage["kind"] in PAGES_CONTENU:
+                        contenu.append((page, textpage))
+
+                if self.mode == EXTRACTION_LAYOUT:
+                    textes = iter(self._pages_layout(contenu))
+                else:
+                    textes = (page.get_text(textpage=textpage) for page, textpage in contenu)
                 with open(output_path, "w", encoding="utf8") as out:
-                    for page in doc:
-                        text = page.get_text()
-                        out.write(text)
-                        out.write("\n")
-                        out.write("\n")
+                    for triage in self.pages:
+                        out.write(page_marker(triage, len(self.pages)))
+                        if triage["kind"] in PAGES_CONTENU:
+                            out.write(next(textes))
+                            out.write("\n")
+                            out.write("\n")
             return True
         except Exception as e:
             logger.error(f"Erreur lors de l'extraction de {pdf_path}: {e}")
             return False
 
-    def process_all_pdfs(self):
-        """Traite tous les PDF du dossier et extrait le texte"""
+    @staticmethod
+    def _lignes_bloc(block):
+        """
+        Lignes d'un bloc 'dict' PyMuPDF : les segments d'une même ligne visuelle (cellules)
+        sont réunis, et une ligne pleine est poursuivie par la suivante de même taille de
+        police (mot coupé par un tiret recollé), sauf si celle-ci commence par une puce ou
+        si l'une des deux est une rangée de tableau (plusieurs cellules).
+        """
+        lignes = []  # [texte, x1, taille, y1, cellules]
+        for line in block["lines"]:
+            texte = " ".join("".join(span["text"] for span in line["spans"]).split())
+            if not texte:
+                continue
+            _, _, x1, y1 = line["bbox"]
+            taille = max(span["size"] for span in line["spans"])
+            if lignes and abs(y1 - lignes[-1][3]) < 1.0:
+                lignes[-1][0] += " " + texte
+                lignes[-1][1] = max(lignes[-1][1], x1)
+                lignes[-1][4] = True
+                continue
+            lignes.append([texte, x1, taille, y1, False])
+
+        bx0, _, bx1, _ = block["bbox"]
+        seuil = bx0 + LIGNE_PLEINE * (bx1 - bx0)
+        resultat = []
+        precedente = None
+        for texte, x1, taille, _, cellules in lignes:
+            if (precedente and precedente[1] >= seuil and abs(taille - precedente[2]) < 0.5
+                    and not precedente[3] and not cellules and not texte.startswith(PUCES)):
+                if resultat[-1].endswith("-") and texte[0].islower():
+                    resultat[-1] = resultat[-1][:-1] + texte
+                else:
+                    resultat[-1] += " " + texte
+            else:
+                resultat.append(texte)
+            precedente = (texte, x1, taille, cellules)
+        return resultat
+
+    def _pages_layout(self, contenu):
+        """
+        Texte des pages de contenu [(page, textpage)] d'après leurs blocs : les blocs des
+        bandeaux haut et bas sont retirés s'ils sont des en-têtes de bulletin (métadonnées
+        mémorisées), des numéros de page ou s'ils se répètent sur une part suffisante des pages.
+        """
+        pages = []
+        repetitions = Counter()
+        for page, textpage in contenu:
+            haut = page.rect.height * self.marge_haute
+            bas = page.rect.height * (1 - self.marge_basse)
+            blocs = []
+            cles = set()
+            for block in page.get_text("dict", textpage=textpage)["blocks"]:
+                if block["type"] != 0:
+                    continue
+                lignes = self._lignes_bloc(block)
+                if not lignes:
+                    continue
+                _, y0, _, y1 = block["bbox"]
+                cle = None
+                if y1 <= haut or y0 >= bas:
+                    # Numéros et dates varient d'une page à l'autre : seuls les libellés comptent
+                    cle = re.sub(r'\d+', '#', " ".join(lignes).lower())
+                    cles.add(cle)
+                blocs.append((lignes, cle))
+            repetitions.update(cles)
+            pages.append(blocs)
+
+        headers = HeaderCollector()
+        seuil = max(2, self.repetition_min * len(pages))
+        textes = []
+        for blocs in pages:
+            conserves = []
+            for lignes, cle in blocs:
+                if cle is not None:
+                    texte = "\n".join(lignes)
+                    if headers.feed_text(texte) or PAGE_NUMBER.match(texte) or repetitions[cle] >= seuil:
+                        continue
+                conserves.extend(lignes)
+            textes.append("\n".join(conserves))
+
+        self.metadonnees = headers.summary()
+        return textes
+
+    def process_all_pdfs(self, region="bourgogne_franche_comte", culture=None, year=None):
+        """Traite les PDF en attente d'extraction d'après le catalogue et extrait le texte"""
         logger.info("Debut de l'extraction texte des PDF")
-        
+
+        raw_dir = self._raw_dir(region)
+
+        # PDF présents sur disque mais pas encore catalogués (corpus antérieur, dépôt manuel)
+        self.catalog.sync_raw_directory(raw_dir, region)
+
         total_files = 0
         success_files = 0
-        
-        for root, dirs, files in os.walk(self.raw_full_path):
-            for file in files:
-                if file.endswith('.pdf'):
-                    total_files += 1
-                    pdf_path = os.path.join(root, file)
-
-                    relative_path = os.path.relpath(root, self.raw_full_path)
-                    
-                   
-                    output_dir = os.path.join(self.processed_base_dir, 'txt', 'bourgogne_franche_comte', relative_path)
-                    os.makedirs(output_dir, exist_ok=True)
-                    txt_filename = os.path.splitext(file)[0] + '.txt'
-                    output_path = os.path.join(output_dir, txt_filename) 
-                    
-                    if self.extract_text_from_pdf(pdf_path, output_path):
-                        success_files += 1
-                        logger.info(f"Texte extrait: {output_path}")
-                    else:
-                        logger.error(f"Echec extraction: {pdf_path}")
+
+        for bulletin in self.catalog.pending("extract", region=region, culture=culture, year=year):
+            total_files += 1
+            pdf_path = self.catalog.absolute_path(bulletin["input_path"])
+
+            relative_path = os.path.relpath(os.path.dirname(pdf_path), raw_dir)
+            output_dir = os.path.join(self.processed_base_dir, 'txt', region, relative_path)
+            os.makedirs(output_dir, exist_ok=True)
+            txt_filename = os.path.splitext(bulletin["file_name"])[0] + '.txt'
+            output_path = os.path.join(output_dir, txt_filename)
+
+            started_at = time.time()
+            start = time.perf_counter()
+            if self.extract_text_from_pdf(pdf_path, output_path):
+                success_files += 1
+                self.catalog.record_stage(bulletin["id"], "extract", path=output_path, started_at=started_at,
+                                          duration=time.perf_counter() - start, detail=self.mode)
+                if self.metadonnees:
+                    self.catalog.set_metadata(bulletin["id"], self.metadonnees["number"],
+                                              self.metadonnees["issue_date"], self.metadonnees["culture"])
+                self.catalog.replace_pages(bulletin["id"], self.pages)
+                a_ocr = sum(1 for p in self.pages if p["needs_ocr"])
+                if a_ocr:
+                    logger.warning(f"{a_ocr} page(s) sans texte exploitable à passer en OCR: {pdf_path}")
+                logger.info(f"Texte extrait: {output_path}")
+            else:
+                self.catalog.record_stage(bulletin["id"], "extract", status=STATUS_FAILED,
+                                          started_at=started_at, duration=time.perf_counter() - start)
+                logger.error(f"Echec extraction: {pdf_path}")
 
         logger.info(f"Extraction terminee: {success_files}/{total_files} fichiers traites avec succes")
         return success_files, total_files
@@ -96,4 +248,4 @@ def main():
 
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,373 @@
+import argparse
+import asyncio
+import json
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qsl, unquote, urlencode
+
+# Ajouter le dossier parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.bulletin_similarity import TfidfIndex
+from scripts.tokenisation import TokenStore
+from utils.catalog import BulletinCatalog, STAGE_INPUTS
+from utils.config_loader import ConfigLoader
+from utils.logger import setup_logging, get_logger
+
+
+logger = get_logger(__name__)
+
+# Bornes par défaut des filtres de date (dates ISO comparées comme des chaînes)
+DATE_MIN = "0001-01-01"
+DATE_MAX = "9999-12-31"
+
+GRANULARITES = {
+    "semaine": lambda d: "{0}-W{1:02d}".format(*d.isocalendar()),
+    "mois": lambda d: f"{d.year}-{d.month:02d}",
+    "annee": lambda d: str(d.year),
+}
+
+
+class QueryError(Exception):
+    """Erreur de requête renvoyée au client avec son statut HTTP"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class LRUCache:
+    """Cache de réponses JSON encodées, borné en octets (utilisé depuis la seule boucle asyncio)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        body = self.entries.get(key)
+        if body is not None:
+            self.entries.move_to_end(key)
+        return body
+
+    def put(self, key, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key))
+        self.entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+
+def _bulletin(row) -> dict:
+    return {key: row[key] for key in ("id", "region", "culture", "year", "number", "issue_date", "file_name",
+                                      "source_url")}
+
+
+def _int(params, name, default):
+    try:
+        return int(params.get(name, default))
+    except ValueError:
+        raise QueryError(400, f"Paramètre '{name}' entier attendu")
+
+
+class QueryService:
+    """
+    Service HTTP/JSON local (asyncio) sur le corpus traité : recherche de bulletins,
+    mentions d'un pathogène dans le temps et consultation d'un document.
+
+    Les lectures disque et SQLite passent par un pool de threads pour ne jamais bloquer
+    la boucle ; chaque thread a sa propre connexion en lecture seule au catalogue. Les
+    réponses sont mises en cache (LRU borné en octets) ; le cache est vidé dès que la
+    signature du catalogue change, et les requêtes identiques simultanées ne sont
+    calculées qu'une fois.
+    """
+
+    def __init__(self, catalog_path: str = None, tokens_dir: str = None, tfidf_dir: str = None):
+        self.config_loader = ConfigLoader("config.yaml")
+        service_cfg = self.config_loader.config["service"]
+        self.host = service_cfg["host"]
+        self.port = service_cfg["port"]
+        self.manifest_interval = service_cfg["intervalle_manifeste"]
+        self.backlog = service_cfg["backlog"]
+        self.catalog_path = catalog_path
+        self.tokens_dir = tokens_dir or self.config_loader.get_path(self.config_loader.config["data"]["tokens_dir"])
+        self.tfidf_dir = tfidf_dir
+        self.default_k = self.config_loader.config["analyse"]["similarite"]["k"]
+        self.max_k = service_cfg["k_max"]
+
+        # Crée la base et son schéma si besoin, avant l'ouverture des lecteurs
+        BulletinCatalog(catalog_path).close()
+        self._local = threading.local()
+        self.executor = ThreadPoolExecutor(max_workers=service_cfg["max_workers"], initializer=self._open_catalog)
+        self.cache = LRUCache(service_cfg["cache_max_octets"])
+        self.manifest = None
+        self._manifest_checked = 0.0
+        self._inflight = {}
+        self.tokens = None
+        self.tfidf = None
+
+        self.routes = [
+            (re.compile(r"^/search$"), self.search),
+            (re.compile(r"^/bulletins$"), self.bulletins),
+            (re.compile(r"^/bulletins/(\d+)$"), self.bulletin),
+            (re.compile(r"^/bulletins/(\d+)/similar$"), self.similar),
+            (re.compile(r"^/pathogenes/([^/]+)/mentions$"), self.mentions),
+        ]
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def _open_catalog(self):
+        """Initialisation d'un thread du pool : sa connexion au catalogue, sans verrou partagé"""
+        self._local.catalog = BulletinCatalog(self.catalog_path, read_only=True)
+
+    @property
+    def catalog(self) -> BulletinCatalog:
+        """Catalogue du thread courant (threads du pool uniquement)"""
+        return self._local.catalog
+
+    def _k(self, params) -> int:
+        """Nombre de résultats demandé : entier >= 1, plafonné à service.k_max"""
+        k = _int(params, "k", self.default_k)
+        if k < 1:
+            raise QueryError(400, "Paramètre 'k' strictement positif attendu")
+        return min(k, self.max_k)
+
+    # ====================================================================
+    # Invalidation
+    # ====================================================================
+    def _load_stores(self):
+        return TokenStore(self.tokens_dir), TfidfIndex(self.tfidf_dir)
+
+    async def _check_manifest(self):
+        """Relit la signature du catalogue (au plus une fois par intervalle) et recharge si elle a changé"""
+        now = time.monotonic()
+        if self.manifest is not None and now - self._manifest_checked < self.manifest_interval:
+            return
+        self._manifest_checked = now
+        manifest = await self._run(lambda: self.catalog.manifest())
+        if manifest != self.manifest:
+            # Les lecteurs en cours gardent les anciens tableaux : simple échange de références
+            self.tokens, self.tfidf = await self._run(self._load_stores)
+            self.cache.clear()
+            logger.info(f"Corpus modifié ({self.manifest} -> {manifest}), cache vidé")
+            self.manifest = manifest
+
+    # ====================================================================
+    # Requêtes (exécutées dans le pool de threads)
+    # ====================================================================
+    def search(self, params):
+        """Bulletins les plus proches d'un texte libre (index TF-IDF)"""
+        if not params.get("q"):
+            raise QueryError(400, "Paramètre 'q' manquant")
+        k = self._k(params)
+        results = []
+        for bulletin_id, score in self.tfidf.similar_to_text(params["q"], k):
+            row = self.catalog.get(bulletin_id)
+            if row is not None:
+                results.append(dict(_bulletin(row), score=round(score, 4)))
+        return {"q": params["q"], "results": results}
+
+    def bulletins(self, params):
+        """Bulletins filtrés par région, culture, année ou période de parution"""
+        region, culture = params.get("region"), params.get("culture")
+        if "start" in params or "end" in params:
+            rows = self.catalog.bulletins_between(params.get("start", DATE_MIN), params.get("end", DATE_MAX),
+                                                  region, culture)
+        else:
+            year = _int(params, "year", 0) or None
+            rows = self.catalog.bulletins(region, culture, year)
+        return {"count": len(rows), "bulletins": [_bulletin(row) for row in rows]}
+
+    def bulletin(self, params, bulletin_id):
+        """Métadonnées, étapes, sections et texte nettoyé d'un bulletin"""
+        row = self.catalog.get(int(bulletin_id))
+        if row is None:
+            raise QueryError(404, f"Bulletin {bulletin_id} inconnu")
+        result = _bulletin(row)
+        result["stages"] = {}
+        for stage in STAGE_INPUTS:
+            stage_row = self.catalog.stage(row["id"], stage)
+            if stage_row is not None:
+                result["stages"][stage] = {"status": stage_row["status"], "finished_at": stage_row["finished_at"]}
+        result["sections"] = [{key: s[key] for key in ("title", "crop", "pest", "start", "end")}
+                              for s in self.catalog.sections(row["id"])]
+        clean = self.catalog.stage(row["id"], "clean")
+        result["text"] = None
+        if params.get("texte", "1") != "0" and clean is not None and clean["path"]:
+            with open(self.catalog.absolute_path(clean["path"]), "r", encoding="utf-8") as f:
+                result["text"] = f.read()
+        return result
+
+    def similar(self, params, bulletin_id):
+        """Bulletins passés les plus proches d'un bulletin indexé"""
+        k = self._k(params)
+        try:
+            pairs = self.tfidf.similar(int(bulletin_id), k)
+        except KeyError:
+            raise QueryError(404, f"Bulletin {bulletin_id} absent de l'index TF-IDF")
+        results = []
+        for other_id, score in pairs:
+            row = self.catalog.get(other_id)
+            if row is not None:
+                results.append(dict(_bulletin(row), score=round(score, 4)))
+        return {"bulletin_id": int(bulletin_id), "results": results}
+
+    def mentions(self, params, pathogene):
+        """Mentions d'un pathogène par période (semaine, mois ou année de parution)"""
+        granularite = params.get("granularite", "semaine")
+        if granularite not in GRANULARITES:
+            raise QueryError(400, f"Granularité inconnue: {granularite} ({', '.join(GRANULARITES)})")
+        period = GRANULARITES[granularite]
+        tokens = self.tokens
+        counts = tokens.phrase_counts(pathogene)
+
+        series = OrderedDict()
+        for row in self.catalog.bulletins_between(params.get("start", DATE_MIN), params.get("end", DATE_MAX),
+                                                  params.get("region"), params.get("culture")):
+            i = tokens.doc_index.get(row["id"])
+            if i is None:
+                continue
+            key = period(date.fromisoformat(row["issue_date"]))
+            entry = series.setdefault(key, {"periode": key, "mentions": 0, "bulletins": 0})
+            entry["mentions"] += int(counts[i])
+            entry["bulletins"] += 1
+        return {"pathogene": pathogene, "granularite": granularite, "series": list(series.values())}
+
+    # ====================================================================
+    # HTTP
+    # ====================================================================
+    async def _compute(self, handler, params, args):
+        try:
+            body = json.dumps(await self._run(handler, params, *args), ensure_ascii=False).encode("utf-8")
+            return 200, body, True
+        except QueryError as e:
+            return e.status, json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8"), False
+        except Exception as e:
+            logger.exception(e)
+            return 500, json.dumps({"error": "Erreur interne"}).encode("utf-8"), False
+
+    async def handle(self, target: str) -> tuple:
+        """(statut, corps JSON) d'une requête GET"""
+        parts = urlsplit(target)
+        path = unquote(parts.path)
+        params = dict(parse_qsl(parts.query))
+
+        if path == "/status":
+            await self._check_manifest()
+            status = {"manifest": self.manifest, "documents": len(self.tokens), "cache_entries":
+                      len(self.cache.entries), "cache_bytes": self.cache.size}
+            return 200, json.dumps(status).encode("utf-8")
+
+        for pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            return 404, json.dumps({"error": f"Route inconnue: {path}"}, ensure_ascii=False).encode("utf-8")
+
+        await self._check_manifest()
+        key = f"{self.manifest}|{path}?{urlencode(sorted(params.items()))}"
+        body = self.cache.get(key)
+        if body is not None:
+            return 200, body
+
+        # Requêtes identiques simultanées : un seul calcul partagé
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(handler, params, match.groups()))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        status, body, cacheable = await asyncio.shield(task)
+        if cacheable and key.startswith(f"{self.manifest}|"):
+            self.cache.put(key, body)
+        return status, body
+
+    async def _client(self, reader, writer):
+        """Connexion HTTP/1.1 (keep-alive), requêtes GET uniquement"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    status, body, version = 400, b'{"error": "Requete invalide"}', "HTTP/1.0"
+                else:
+                    if method != "GET":
+                        status, body = 405, b'{"error": "GET uniquement"}'
+                    else:
+                        status, body = await self.handle(target)
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = None, port: int = None):
+        await self._check_manifest()
+        server = await asyncio.start_server(self._client, host or self.host, port or self.port,
+                                            backlog=self.backlog)
+        logger.info(f"Service de requêtes sur http://{host or self.host}:{port or self.port} "
+                    f"({len(self.tokens)} documents)")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Service HTTP/JSON de requêtes sur le corpus BSV")
+    parser.add_argument("--port", type=int, help="port d'écoute (service.port par défaut)")
+    args = parser.parse_args()
+
+    try:
+        service = QueryService()
+        asyncio.run(service.serve(port=args.port))
+        return 0
+
+    except KeyboardInterrupt:
+        logger.warning("Interruption par l'utilisateur (Ctrl+C)")
+        return 0
+
+    except Exception as e:
+        logger.error("Erreur fatale du service de requêtes")
+        logger.exception(e)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
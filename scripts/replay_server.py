@@ -0,0 +1,117 @@
+import argparse
+import sys
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+# Ajouter le dossier parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.config_loader import ConfigLoader
+from utils.http_mirror import load_response
+from utils.logger import setup_logging, get_logger
+
+
+logger = get_logger(__name__)
+
+# En-têtes recalculés par le serveur (le corps archivé est déjà décompressé)
+_SKIPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """
+    Sert les réponses archivées en mode record : GET /<site>/<chemin>?<requête>.
+    Latence (avant le premier octet) et débit sont simulés ; If-None-Match et
+    If-Modified-Since sont honorés comme sur le site réel.
+    """
+
+    archive_dir = None
+    latency = 0.0
+    bandwidth = 0  # octets par seconde, 0 = illimité
+    chunk_size = 16384
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        # /<site>/<chemin>?<requête>, déjà encodé : archive_key() le canonise comme à l'enregistrement
+        original_url = "http:/" + self.path
+        archived = load_response(self.archive_dir, original_url)
+        if archived is None:
+            self.send_error(404, "Absent de l'archive")
+            return
+
+        status, headers, body = archived
+        if status == 200 and self._not_modified(headers):
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        for name, value in headers.items():
+            if name.lower() not in _SKIPPED_HEADERS:
+                self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self._write_throttled(body)
+
+    def _not_modified(self, headers):
+        headers = {k.lower(): v for k, v in headers.items()}
+        etag = self.headers.get("If-None-Match")
+        if etag and etag == headers.get("etag"):
+            return True
+        since = self.headers.get("If-Modified-Since")
+        return bool(since and since == headers.get("last-modified"))
+
+    def _write_throttled(self, body):
+        start = time.perf_counter()
+        for offset in range(0, len(body), self.chunk_size):
+            chunk = body[offset:offset + self.chunk_size]
+            self.wfile.write(chunk)
+            if self.bandwidth:
+                # Attendre le temps qu'aurait pris l'envoi au débit simulé
+                delay = (offset + len(chunk)) / self.bandwidth - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def create_server(archive_dir: str, host: str, port: int, latency: float = 0.0,
+                  bandwidth: int = 0) -> ThreadingHTTPServer:
+    handler = type("ConfiguredReplayHandler", (ReplayHandler,), {
+        "archive_dir": archive_dir, "latency": latency, "bandwidth": bandwidth})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+
+    setup_logging()
+    config_loader = ConfigLoader()
+    mirror_cfg = config_loader.config["scraping"]["mirror"]
+    replay_cfg = mirror_cfg["replay"]
+
+    parser = argparse.ArgumentParser(description="Serveur local de rejeu des pages et PDF archivés")
+    parser.add_argument("--port", type=int, default=replay_cfg["port"])
+    parser.add_argument("--latence", type=float, default=replay_cfg["latence"], help="secondes par requête")
+    parser.add_argument("--debit", type=int, default=replay_cfg["debit"], help="octets/s, 0 = illimité")
+    args = parser.parse_args()
+
+    archive_dir = config_loader.get_path(mirror_cfg["archive_dir"])
+    server = create_server(archive_dir, replay_cfg["host"], args.port, args.latence, args.debit)
+    logger.info(f"Rejeu de {archive_dir} sur http://{replay_cfg['host']}:{args.port} "
+                f"(latence {args.latence}s, débit {args.debit or 'illimité'} o/s)")
+
+    try:
+        server.serve_forever()
+        return 0
+
+    except KeyboardInterrupt:
+        logger.warning("Interruption par l'utilisateur (Ctrl+C)")
+        return 0
+
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,45 +9,111 @@ from pathlib import Path
 # Ajouter le dossier parent au PYTHONPATH
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from utils.catalog import BulletinCatalog
 from utils.config_loader import ConfigLoader
-from utils.file_utils import download_pdf
+from utils.fetch_queue import FetchQueue
+from utils.file_utils import download_pdf, FetchError, http_error
+from utils.http_mirror import http_get
 from utils.logger import setup_logging, get_logger
 
 
 logger = get_logger(__name__)
 
 
-def retrieve_website_page(url: str) -> BeautifulSoup | None:
+def retrieve_website_page(url: str, raise_errors: bool = False) -> BeautifulSoup | None:
+    """
+    Récupère et parse une page HTML. Les échecs sont journalisés et renvoient None, ou
+    lèvent une FetchError si raise_errors=True (utilisé par la file de réessais).
+    """
     try:
         logger.debug(f"Tentative de récupération de l'URL: {url}")
-        response = requests.get(url, timeout=10)
+        response = http_get(url, timeout=10)
 
         if response.status_code == 200:
             logger.info(f"Page récupérée avec succès: {url}")
             return BeautifulSoup(response.content, "lxml")
         else:
             logger.warning(f"Code HTTP inattendu {response.status_code} pour l'URL: {url}")
+            if raise_errors:
+                raise http_error(url, response)
             print("Error retrieving website page")
             return None
 
-    except requests.exceptions.Timeout:
+    except FetchError:
+        raise
+
+    except requests.exceptions.Timeout as e:
         logger.error(f"Timeout lors de la récupération de l'URL: {url}")
+        if raise_errors:
+            raise FetchError(url, "Timeout") from e
         print(f"Timeout: {url}")
         return None
 
     except requests.exceptions.ConnectionError as e:
         logger.error(f"Erreur de connexion pour l'URL: {url}")
         logger.exception(e)
+        if raise_errors:
+            raise FetchError(url, "Erreur de connexion") from e
         print(e)
         return None
 
     except Exception as e:
         logger.error(f"Erreur inattendue lors de la récupération de l'URL: {url}")
         logger.exception(e)
+        if raise_errors:
+            raise FetchError(url, f"Erreur inattendue: {e}") from e
         print(e)
         return None
 
 
+def retrieve_page_if_modified(url: str, etag: str = None, last_modified: str = None) -> tuple:
+    """
+    Requête conditionnelle (If-None-Match / If-Modified-Since) : une page inchangée
+    ne coûte qu'une réponse 304 sans corps.
+
+    Returns:
+        tuple: (code HTTP ou None si erreur, BeautifulSoup ou None, {'etag', 'last_modified'})
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    validators = {"etag": etag, "last_modified": last_modified}
+
+    try:
+        response = http_get(url, headers=headers, timeout=10)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Erreur lors de la requête conditionnelle vers {url}: {e}")
+        return None, None, validators
+
+    if response.status_code == 304:
+        logger.debug(f"Page inchangée (304): {url}")
+        return 304, None, validators
+    if response.status_code != 200:
+        logger.warning(f"Code HTTP inattendu {response.status_code} pour l'URL: {url}")
+        return response.status_code, None, validators
+
+    validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+    return 200, BeautifulSoup(response.content, "lxml"), validators
+
+
+def find_year_links(html_content: BeautifulSoup, base_url: str, years) -> dict:
+    """Liens des pages annuelles d'une page d'archives ({année: url})"""
+    year_links = {}
+    for year in years:
+        for a_tag in html_content.find_all("a", href=True):
+            if str(year) in a_tag["href"]:
+                year_links[year] = urljoin(base_url, a_tag["href"])
+    return year_links
+
+
+def find_pdf_links(html_content: BeautifulSoup, base_url: str) -> list:
+    """Liens absolus des PDF d'une page de bulletins"""
+    return [urljoin(base_url, a_tag["href"]) for a_tag in html_content.find_all("a", href=True)
+            if a_tag["href"].endswith(".pdf")]
+
+
 class Scraping:
 
 
@@ -55,12 +121,21 @@ class Scraping:
 
         self.cfg = ConfigLoader().config
         self.base_directory_path = ConfigLoader().base_dir
+        self.catalog = BulletinCatalog()
+        self.queue = FetchQueue()
         logger.info("Initialisation du scraper BSV")
         logger.debug(f"Répertoire de base: {self.base_directory_path}")
 
     def scrape_bsv(self, region="bourgogne_franche_comte", culture_type="grandes_cultures", year_count=3,
-                   origin_year=2025):
+                   origin_year=2025) -> int:
+        """
+        Télécharge les BSV des campagnes précédentes d'une région. Chaque PDF passe par la
+        file de réessais : un échec y est replanifié (ou placé en dead-letter) pour être
+        repris par crawl_scheduler.py --resume.
 
+        Returns:
+            int: nombre de PDF dont le téléchargement a échoué
+        """
 
         logger.info("=" * 80)
         logger.info("DÉBUT DU SCRAPING DRAAF")
@@ -88,36 +163,29 @@ class Scraping:
 
         start_year = origin_year - 1
         end_year = origin_year - year_count - 1
-        annual_bsv_pdf_links = {}
         pdf_docs = []
 
         if not draaf_html_content:
             logger.error("Impossible de récupérer la page principale")
             logger.error(f"URL tentée: {website_base_url}")
             print("Impossible de récupérer la page principale.")
-            return
+            return 0
 
         logger.info("Page principale récupérée avec succès")
 
         # Recherche des liens par année
         logger.info(f"Recherche des liens pour les années {start_year} à {end_year}...")
+        annual_bsv_pdf_links = find_year_links(draaf_html_content, website_base_url, range(start_year, end_year, -1))
         for year in range(start_year, end_year, -1):
-            logger.info(f"Recherche des liens pour l'année {year}")
-            links_found = 0
-
-            for a_tag in draaf_html_content.find_all("a", href=True):
-                if str(year) in a_tag["href"]:
-                    annual_bsv_pdf_links[year] = urljoin(website_base_url, a_tag["href"])
-                    links_found += 1
-
-            if links_found > 0:
-                logger.info(f"Trouvé {links_found} lien(s) pour l'année {year}")
+            if year in annual_bsv_pdf_links:
+                logger.info(f"Lien trouvé pour l'année {year}")
             else:
                 logger.warning(f"Aucun lien trouvé pour l'année {year}")
 
         logger.info(f"Total de {len(annual_bsv_pdf_links)} année(s) trouvée(s)")
 
         # Traitement de chaque année
+        failed = 0
         i = 1
         for year, annual_bsv_link in annual_bsv_pdf_links.items():
             logger.info("=" * 80)
@@ -138,14 +206,8 @@ class Scraping:
 
             # Collecte des liens PDF
             logger.info(f"Collecte des liens PDF pour l'année {year}...")
-            pdf_count = 0
-
-            for a_tag in annual_bsv_page_html_content.find_all("a", href=True):
-                if a_tag["href"].endswith(".pdf"):
-                    pdf_url = urljoin(website_base_url, a_tag["href"])
-                    pdf_docs.append(pdf_url)
-                    pdf_count += 1
-                    logger.debug(f"PDF trouvé: {pdf_url}")
+            pdf_docs.extend(find_pdf_links(annual_bsv_page_html_content, website_base_url))
+            pdf_count = len(pdf_docs)
 
             logger.info(f"Nombre de PDF trouvés pour l'année {year}: {pdf_count}")
 
@@ -162,12 +224,20 @@ class Scraping:
                 file_name = pdf_link.split("/")[-1]
                 logger.info(f"Téléchargement [{idx}/{len(pdf_docs)}]: {file_name}")
 
-                success = download_pdf(pdf_link, str(year_dir), file_name)
-                if success:
+                self.queue.enqueue(pdf_link, "pdf", region, culture_type, year)
+                start = time.perf_counter()
+                try:
+                    download_pdf(pdf_link, str(year_dir), file_name, raise_errors=True)
+                except FetchError as e:
+                    failed += 1
+                    self.queue.mark_failed(pdf_link, e)
+                    logger.warning(f"Échec du téléchargement: {file_name}")
+                else:
                     downloaded += 1
+                    self.catalog.register_pdf(os.path.join(year_dir, file_name), region, culture_type, year,
+                                              source_url=pdf_link, duration=time.perf_counter() - start)
+                    self.queue.mark_done(pdf_link)
                     logger.debug(f"Téléchargement réussi: {file_name}")
-                else:
-                    logger.warning(f"Échec du téléchargement: {file_name}")
 
                 time.sleep(1)
 
@@ -178,8 +248,12 @@ class Scraping:
             i += 1
 
         logger.info("=" * 80)
-        logger.info("SCRAPING TERMINÉ AVEC SUCCÈS")
+        if failed:
+            logger.warning(f"SCRAPING TERMINÉ : {failed} PDF en échec, à reprendre avec crawl_scheduler.py --resume")
+        else:
+            logger.info("SCRAPING TERMINÉ AVEC SUCCÈS")
         logger.info("=" * 80)
+        return failed
 
 
 def main():
@@ -190,11 +264,13 @@ def main():
 
     try:
         scraper = Scraping()
-        scraper.scrape_bsv(
+        failed = scraper.scrape_bsv(
             region="bourgogne_franche_comte",
             culture_type="grandes_cultures",
             year_count=3
         )
+        if failed:
+            return 1
 
         logger.info("Script terminé avec succès")
         return 0
@@ -0,0 +1,168 @@
+import mmap
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.catalog import BulletinCatalog, STATUS_FAILED
+from utils.config_loader import ConfigLoader
+from utils.logger import setup_logging, get_logger
+from utils.text_normalization import load_term_list, tokenize
+
+# Initialiser le logger
+logger = get_logger(__name__)
+
+
+def read_section(clean_path: str, start: int, end: int) -> str:
+    """Lit une section d'un texte nettoyé par mmap à partir de ses offsets en octets"""
+    with open(clean_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm[start:end].decode("utf-8")
+
+
+class BSVSegmenter:
+    """
+    Découpe les BSV nettoyés en sections par culture (blé, colza...) puis par ravageur ou
+    maladie, et enregistre les offsets des sections dans le catalogue.
+    """
+
+    def __init__(self, catalog_path: str = None):
+        self.config_loader = ConfigLoader("config.yaml")
+        analyse_cfg = self.config_loader.config["analyse"]
+
+        self.longueur_max_titre = analyse_cfg["sections"]["longueur_max_titre"]
+        self.mots_suffixe_max = analyse_cfg["sections"]["mots_suffixe_max"]
+        self.cultures = self._termes_normalises(analyse_cfg["sections"]["cultures"])
+        self.ravageurs = self._termes_normalises(
+            load_term_list(self.config_loader.get_path(analyse_cfg["pathogenes_list"])))
+
+        self.catalog = BulletinCatalog(catalog_path)
+
+    @staticmethod
+    def _termes_normalises(termes):
+        """
+        (mots normalisés, forme d'origine), les plus longs d'abord pour 'blé dur' avant 'blé'.
+        Termes et lignes sont découpés par tokenize() : 'Blé-tendre' et 'blé tendre' coïncident.
+        """
+        formes = ((tuple(tokenize(t)), t) for t in termes if t)
+        return sorted(((mots, t) for mots, t in formes if mots), key=lambda t: len(t[0]), reverse=True)
+
+    def _titre(self, ligne, termes):
+        """
+        Retourne le terme d'une ligne de titre, sinon None : la ligne est le terme lui-même,
+        éventuellement suivi d'un court complément ('Blé tendre', 'Pucerons : situation').
+        """
+        ligne = ligne.strip()
+        if not ligne or len(ligne) > self.longueur_max_titre or ligne.endswith((".", ",", ";")):
+            return None
+        mots = tokenize(ligne)
+        for mots_terme, terme in termes:
+            if (tuple(mots[:len(mots_terme)]) == mots_terme
+                    and len(mots) - len(mots_terme) <= self.mots_suffixe_max):
+                return terme
+        return None
+
+    def segmenter(self, contenu: bytes) -> list:
+        """
+        Détecte les titres de culture et de ravageur dans un texte nettoyé (UTF-8).
+
+        Returns:
+            list: sections {'title', 'crop', 'pest', 'start', 'end'} ; offsets en octets,
+            une section de niveau culture (pest=None) englobe ses sections ravageur
+        """
+        sections = []
+        culture_courante = None
+        ravageur_courant = None
+        offset = 0
+
+        def fermer(section, fin):
+            if section is not None:
+                section["end"] = fin
+                sections.append(section)
+
+        for ligne in contenu.split(b"\n"):
+            debut_ligne = offset
+            offset += len(ligne) + 1
+            if len(ligne) > 4 * self.longueur_max_titre:
+                continue
+            texte = ligne.decode("utf-8", errors="replace")
+
+            culture = self._titre(texte, self.cultures)
+            if culture is not None:
+                fermer(ravageur_courant, debut_ligne)
+                fermer(culture_courante, debut_ligne)
+                ravageur_courant = None
+                culture_courante = {"title": texte.strip(), "crop": culture, "pest": None, "start": debut_ligne}
+                continue
+
+            if culture_courante is not None:
+                ravageur = self._titre(texte, self.ravageurs)
+                if ravageur is not None:
+                    fermer(ravageur_courant, debut_ligne)
+                    ravageur_courant = {"title": texte.strip(), "crop": culture_courante["crop"],
+                                        "pest": ravageur, "start": debut_ligne}
+
+        fin = len(contenu)
+        fermer(ravageur_courant, fin)
+        fermer(culture_courante, fin)
+        return sorted(sections, key=lambda s: (s["start"], s["pest"] is not None))
+
+    def segmenter_tous_fichiers(self, region=None, culture=None, year=None):
+        """Segmente uniquement les bulletins nettoyés depuis la dernière segmentation"""
+        logger.info("Debut de la segmentation des BSV")
+        total_files = 0
+        success_files = 0
+
+        for bulletin in self.catalog.pending("segment", region=region, culture=culture, year=year):
+            total_files += 1
+            chemin = self.catalog.absolute_path(bulletin["input_path"])
+            started_at = time.time()
+            start = time.perf_counter()
+            try:
+                with open(chemin, "rb") as f:
+                    sections = self.segmenter(f.read())
+                self.catalog.replace_sections(bulletin["id"], sections)
+                self.catalog.record_stage(bulletin["id"], "segment", started_at=started_at,
+                                          duration=time.perf_counter() - start, detail=f"{len(sections)} sections")
+                success_files += 1
+                logger.info(f"Bulletin segmenté ({len(sections)} sections): {chemin}")
+            except Exception as e:
+                self.catalog.record_stage(bulletin["id"], "segment", status=STATUS_FAILED, started_at=started_at,
+                                          duration=time.perf_counter() - start, detail=str(e))
+                logger.error(f"Erreur lors de la segmentation de {chemin}: {e}")
+
+        logger.info(f"Segmentation terminee: {success_files}/{total_files} fichiers traites avec succes")
+        return success_files, total_files
+
+
+def main():
+    """Fonction principale"""
+    setup_logging()
+    logger.info("Demarrage de la segmentation des BSV")
+    logger.info("Plant Health NLP Analysis - Polytech Dijon")
+
+    try:
+        segmenter = BSVSegmenter()
+        success, total = segmenter.segmenter_tous_fichiers()
+
+        if success == total:
+            logger.info("Segmentation terminee avec succes!")
+            return 0
+        else:
+            logger.warning(f"Segmentation partielle: {success}/{total} fichiers")
+            return 1
+
+    except KeyboardInterrupt:
+        logger.warning("Interruption par l'utilisateur (Ctrl+C)")
+        return 1
+
+    except Exception as e:
+        logger.error("Erreur fatale lors de la segmentation")
+        logger.exception(e)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
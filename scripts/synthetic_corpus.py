@@ -0,0 +1,211 @@
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+import pymupdf
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.logger import setup_logging, get_logger
+
+# Initialiser le logger
+logger = get_logger(__name__)
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 en points
+MARGIN = 50
+FONT_SIZE = 10
+LINE_HEIGHT = 13
+LINE_WIDTH_CHARS = 95
+
+CULTURES = ["Blé tendre", "Orge d'hiver", "Colza", "Maïs", "Tournesol", "Pois protéagineux", "Triticale"]
+
+PATHOGENES = [
+    "Septoriose", "Rouille jaune", "Rouille brune", "Oïdium", "Piétin verse", "Fusariose", "Helminthosporiose",
+    "Rhynchosporiose", "Charançon du bourgeon terminal", "Méligèthes", "Altises", "Pucerons", "Cécidomyie",
+    "Limaces", "Sclérotinia", "Pyrale", "Taupins", "Grosse altise", "Phoma", "Cicadelles",
+]
+
+MOTS = (
+    "observations parcelles réseau stade risque seuil nuisibilité traitement surveillance présence absence "
+    "symptômes feuilles conditions climatiques humidité températures semaine prochaine évolution situation "
+    "secteur département piégeage captures cuvettes jaunes plantes attaquées fréquence intensité levée "
+    "montaison épiaison floraison variétés sensibles résistantes protection intervention recommandée "
+    "modèle prévision contamination pluies douces favorables développement maladie ravageurs auxiliaires"
+).split()
+
+
+class SyntheticBSVGenerator:
+    """
+    Génère des BSV PDF synthétiques réalistes pour les mesures de performance :
+    en-têtes aux formats reconnus par le nettoyage, numéros de page, mots coupés en fin de
+    ligne, listes à puces, tableaux d'observations et noms de bioagresseurs, ainsi que
+    quelques annexes scannées (pages image) et pages blanches.
+    """
+
+    def __init__(self, seed: int = 0):
+        self.random = random.Random(seed)
+
+    def _phrase(self, pathogene=None):
+        mots = self.random.choices(MOTS, k=self.random.randint(8, 20))
+        if pathogene:
+            mots.insert(self.random.randrange(len(mots)), pathogene.lower())
+        return mots[0].capitalize() + " " + " ".join(mots[1:]) + "."
+
+    def _paragraphe(self, pathogene):
+        """Lignes d'un paragraphe, coupées à largeur fixe avec quelques mots coupés par un tiret"""
+        texte = " ".join(self._phrase(pathogene if i == 0 else None) for i in range(self.random.randint(2, 5)))
+        lignes, ligne = [], ""
+        for mot in texte.split():
+            if len(ligne) + len(mot) + 1 > LINE_WIDTH_CHARS:
+                reste = LINE_WIDTH_CHARS - len(ligne) - 2
+                if len(mot) > 7 and reste > 3 and self.random.random() < 0.5:
+                    lignes.append(f"{ligne} {mot[:reste]}-")
+                    ligne = mot[reste:]
+                else:
+                    lignes.append(ligne)
+                    ligne = mot
+            else:
+                ligne = f"{ligne} {mot}" if ligne else mot
+        lignes.append(ligne)
+        return lignes
+
+    def _contenu(self, pages):
+        """Flux de blocs (titres, paragraphes, puces, tableaux) pour un bulletin"""
+        blocs = []
+        for culture in self.random.sample(CULTURES, k=min(len(CULTURES), max(2, pages))):
+            blocs.append(("titre", culture))
+            for pathogene in self.random.sample(PATHOGENES, k=self.random.randint(2, 4)):
+                blocs.append(("sous_titre", pathogene))
+                blocs.append(("paragraphe", self._paragraphe(pathogene)))
+                if self.random.random() < 0.5:
+                    blocs.append(("puces", [self._phrase()[:80] for _ in range(self.random.randint(2, 4))]))
+                if self.random.random() < 0.3:
+                    blocs.append(("tableau", pathogene))
+        return blocs
+
+    def _tableau(self, page, y, pathogene):
+        """Tableau d'observations (grille tracée + cellules) ; retourne la nouvelle ordonnée"""
+        entetes = ["Département", "Parcelles", "Stade", f"% {pathogene[:14]}", "Seuil"]
+        lignes = [entetes] + [[f"{self.random.randint(1, 95):02d}", str(self.random.randint(1, 30)),
+                               f"BBCH {self.random.randint(10, 69)}", f"{self.random.uniform(0, 60):.1f}".replace(".", ","),
+                               self.random.choice(["atteint", "non atteint"])] for _ in range(self.random.randint(3, 6))]
+        largeur = (PAGE_WIDTH - 2 * MARGIN) / len(entetes)
+        hauteur = LINE_HEIGHT + 4
+        for i, ligne in enumerate(lignes):
+            for j, cellule in enumerate(ligne):
+                x0, y0 = MARGIN + j * largeur, y + i * hauteur
+                page.draw_rect(pymupdf.Rect(x0, y0, x0 + largeur, y0 + hauteur), color=(0, 0, 0), width=0.5)
+                page.insert_text((x0 + 3, y0 + hauteur - 5), cellule, fontsize=FONT_SIZE - 1)
+        return y + len(lignes) * hauteur + LINE_HEIGHT
+
+    def _hauteur(self, bloc):
+        kind, valeur = bloc
+        if kind == "paragraphe" or kind == "puces":
+            return (len(valeur) + 1) * LINE_HEIGHT
+        if kind == "tableau":
+            return 8 * (LINE_HEIGHT + 4) + LINE_HEIGHT
+        return 2 * LINE_HEIGHT
+
+    @staticmethod
+    def _nouvelle_page(doc, header):
+        """Ajoute une page avec son en-tête et son numéro ; retourne (page, ordonnée de départ)"""
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_text((MARGIN, MARGIN - 15), header, fontsize=FONT_SIZE - 1)
+        page.insert_text((PAGE_WIDTH / 2, PAGE_HEIGHT - 25), str(doc.page_count), fontsize=FONT_SIZE - 1)
+        return page, MARGIN + LINE_HEIGHT
+
+    def _page_annexe(self, doc):
+        """Page composée d'une seule image en niveaux de gris couvrant la page"""
+        largeur, hauteur = PAGE_WIDTH // 2, PAGE_HEIGHT // 2
+        pixmap = pymupdf.Pixmap(pymupdf.csGRAY, largeur, hauteur, self.random.randbytes(largeur * hauteur), False)
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_image(page.rect, pixmap=pixmap)
+
+    def generate_pdf(self, output_path: str, numero: int, date_parution: date, pages: int) -> int:
+        """Écrit un bulletin d'environ `pages` pages ; retourne le nombre de pages réel"""
+        doc = pymupdf.open()
+        if self.random.random() < 0.5:
+            header = f"Grandes cultures n° {numero} du {date_parution.day} {date_parution.month} {date_parution.year}"
+        else:
+            header = f"N°{numero} du {date_parution.strftime('%d/%m/%Y')}"
+
+        blocs = self._contenu(pages)
+        page, y = self._nouvelle_page(doc, header)
+        while True:
+            if not blocs:
+                if doc.page_count >= pages:
+                    break
+                blocs = self._contenu(1)
+            if y + self._hauteur(blocs[0]) > PAGE_HEIGHT - MARGIN - 2 * LINE_HEIGHT:
+                page, y = self._nouvelle_page(doc, header)
+
+            kind, valeur = blocs.pop(0)
+            if kind in ("titre", "sous_titre"):
+                taille = FONT_SIZE + (4 if kind == "titre" else 2)
+                page.insert_text((MARGIN, y), valeur.upper() if kind == "titre" else valeur, fontsize=taille)
+                y += 2 * LINE_HEIGHT
+            elif kind == "paragraphe":
+                page.insert_text((MARGIN, y), "\n".join(valeur), fontsize=FONT_SIZE, lineheight=1.3)
+                y += (len(valeur) + 1) * LINE_HEIGHT
+            elif kind == "puces":
+                page.insert_text((MARGIN, y), "\n".join(f"• {p}" for p in valeur), fontsize=FONT_SIZE, lineheight=1.3)
+                y += (len(valeur) + 1) * LINE_HEIGHT
+            else:
+                y = self._tableau(page, y, valeur)
+
+        # Annexe scannée (image pleine page, sans couche texte) et intercalaire blanc
+        if self.random.random() < 0.3:
+            self._page_annexe(doc)
+        if self.random.random() < 0.2:
+            doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+
+        doc.save(output_path)
+        page_count = doc.page_count
+        doc.close()
+        return page_count
+
+    def generate(self, output_dir: str, n_docs: int, pages_per_doc: int = 4, year: int = 2024) -> dict:
+        """
+        Génère n_docs bulletins hebdomadaires dans output_dir/<année>/.
+
+        Returns:
+            dict: {'docs', 'pages', 'bytes', 'paths'}
+        """
+        year_dir = os.path.join(output_dir, str(year))
+        os.makedirs(year_dir, exist_ok=True)
+        stats = {"docs": 0, "pages": 0, "bytes": 0, "paths": []}
+        debut = date(year, 2, 1)
+        for i in range(n_docs):
+            path = os.path.join(year_dir, f"bsv_synthetique_{year}_{i + 1:04d}.pdf")
+            stats["pages"] += self.generate_pdf(path, i % 40 + 1, debut + timedelta(weeks=i % 40),
+                                                max(1, pages_per_doc + self.random.randint(-1, 1)))
+            stats["docs"] += 1
+            stats["bytes"] += os.path.getsize(path)
+            stats["paths"].append(path)
+        logger.info(f"{stats['docs']} BSV synthétique(s) générés ({stats['pages']} pages) dans {year_dir}")
+        return stats
+
+
+def main():
+    """Fonction principale"""
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Génération d'un corpus BSV synthétique")
+    parser.add_argument("output_dir")
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=4, help="pages par bulletin (environ)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        SyntheticBSVGenerator(args.seed).generate(args.output_dir, args.docs, args.pages)
+        return 0
+
+    except Exception as e:
+        logger.error("Erreur fatale lors de la génération du corpus synthétique")
+        logger.exception(e)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
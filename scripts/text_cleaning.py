@@ -1,11 +1,15 @@
 import re
 import os
 import sys
+import time
 from pathlib import Path
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.bulletin_metadata import HEADER_PATTERN, HeaderCollector
+from utils.catalog import BulletinCatalog, STATUS_FAILED, EXTRACTION_LAYOUT
 from utils.config_loader import ConfigLoader
 from utils.logger import setup_logging, get_logger
+from utils.page_triage import PAGE_MARKER_PATTERN
 
 # Initialiser le logger
 logger = get_logger(__name__)
@@ -15,69 +19,92 @@ class BSVCleaner:
     Classe pour nettoyer les fichiers BSV texte et les organiser dans clean_txt
     """
     
-    def __init__(self):
+    def __init__(self, catalog_path: str = None):
         # Charger la config
         self.config_loader = ConfigLoader("config.yaml")
         
         # Chemins depuis la config
         self.processed_base_dir = self.config_loader.get_path(self.config_loader.config["data"]["processed_dir"])
+
+        self.catalog = BulletinCatalog(catalog_path)
         
-        # Chemins source et destination
-        self.source_dir = os.path.join(self.processed_base_dir, "txt", "bourgogne_franche_comte")
-        self.dest_dir = os.path.join(self.processed_base_dir, "clean_txt", "bourgogne_franche_comte")
-        
+        # Métadonnées (numéro, date) capturées dans les en-têtes lors du dernier nettoyage
+        self.metadonnees = None
+
         # Compiler les regex pour la performance
         self._compiler_regex()
 
     def _compiler_regex(self):
         """Compile toutes les expressions régulières"""
         self.regex_patterns = {
+            'separateurs_pages': PAGE_MARKER_PATTERN,
             'pages_isoles': re.compile(r'^\s*\d+\s*$', re.MULTILINE),
-            'headers_repetitifs': re.compile(r'(?<=\n)(Grandes cultures n° \d+ du \d+ \d+ \d+|N°\d+ du \d{2}/\d{2}/\d{4})\s*$\n', re.MULTILINE),
+            'headers_repetitifs': HEADER_PATTERN,
             'mots_coupes': re.compile(r'(\w+)-\n\s*(\w+)'),
-            'puces': re.compile(r'^[•]\s*', re.MULTILINE),
+            # Mêmes puces que l'extraction par mise en page (\uf0b7 : puce de la police Symbol)
+            'puces': re.compile(r'^[•·–▪\uf0b7]\s*', re.MULTILINE),
             'espaces_multiples': re.compile(r'[ ]{2,}'),
             'lignes_coupees': re.compile(r'([a-zàâäéèêëïîôöùûüÿç,;])\n([a-zàâäéèêëïîôöùûüÿç])'),
             'lignes_espaces': re.compile(r'^[ \t]+\n', re.MULTILINE),
             'lignes_vides_excessives': re.compile(r'\n{3,}')
         }
 
-    def nettoyer_contenu(self, contenu):
+    def nettoyer_contenu(self, contenu, mise_en_page=False):
         """
         Nettoie un contenu de BSV en préservant la structure
         
         Args:
             contenu (str): Contenu brut du BSV
+            mise_en_page (bool): texte issu de l'extraction par mise en page, dont les
+                numéros de page, en-têtes et lignes coupées sont déjà traités
             
         Returns:
             str: Contenu nettoyé
         """
         contenu_avant = contenu
+        self._headers = HeaderCollector()
         
         # Appliquer toutes les étapes de nettoyage
-        etapes_nettoyage = [
-            self._supprimer_pages_isoles,
-            self._supprimer_headers_repetitifs,
-            self._reformer_mots_coupes,
-            self._uniformiser_puces,
-            self._supprimer_espaces_multiples,
-            self._fusionner_lignes_coupees,
-            self._optimiser_lignes_vides,
-            self._nettoyer_bords
-        ]
+        if mise_en_page:
+            etapes_nettoyage = [
+                self._supprimer_separateurs_pages,
+                self._uniformiser_puces,
+                self._optimiser_lignes_vides,
+                self._nettoyer_bords
+            ]
+        else:
+            etapes_nettoyage = [
+                self._supprimer_separateurs_pages,
+                self._supprimer_pages_isoles,
+                self._supprimer_headers_repetitifs,
+                self._reformer_mots_coupes,
+                self._uniformiser_puces,
+                self._supprimer_espaces_multiples,
+                self._fusionner_lignes_coupees,
+                self._optimiser_lignes_vides,
+                self._nettoyer_bords
+            ]
         
         for etape in etapes_nettoyage:
             contenu = etape(contenu)
-        
+
+        self.metadonnees = self._headers.summary()
         return contenu
 
+    def _supprimer_separateurs_pages(self, contenu):
+        """
+        Remplace les séparateurs de page (type de page) écrits par l'extraction par un saut
+        de ligne : l'en-tête de la première page est ainsi reconnu comme les suivants.
+        """
+        return self.regex_patterns['separateurs_pages'].sub('\n', contenu)
+
     def _supprimer_pages_isoles(self, contenu):
         """Supprime les numéros de pages isolés"""
         return self.regex_patterns['pages_isoles'].sub('', contenu)
 
     def _supprimer_headers_repetitifs(self, contenu):
-        """Supprime les headers répétitifs"""
-        return self.regex_patterns['headers_repetitifs'].sub('', contenu)
+        """Supprime les headers répétitifs en mémorisant leur numéro et leur date"""
+        return self.regex_patterns['headers_repetitifs'].sub(self._headers, contenu)
 
     def _reformer_mots_coupes(self, contenu):
         """Reforme les mots coupés par des tirets"""
@@ -104,13 +131,14 @@ class BSVCleaner:
         """Nettoie les bords du contenu"""
         return contenu.strip()
 
-    def nettoyer_fichier(self, chemin_entree, chemin_sortie):
+    def nettoyer_fichier(self, chemin_entree, chemin_sortie, mise_en_page=False):
         """
         Nettoie un fichier BSV et le sauvegarde
         
         Args:
             chemin_entree (str): Chemin vers le fichier d'entrée
             chemin_sortie (str): Chemin vers le fichier de sortie
+            mise_en_page (bool): fichier issu de l'extraction par mise en page
             
         Returns:
             bool: True si succès, False sinon
@@ -119,7 +147,7 @@ class BSVCleaner:
             with open(chemin_entree, 'r', encoding='utf-8') as f:
                 contenu_original = f.read()
             
-            contenu_nettoye = self.nettoyer_contenu(contenu_original)
+            contenu_nettoye = self.nettoyer_contenu(contenu_original, mise_en_page)
             
             os.makedirs(os.path.dirname(chemin_sortie), exist_ok=True)
             
@@ -147,16 +175,15 @@ class BSVCleaner:
             'reduction_pourcentage': ((len(contenu_original) - len(contenu_nettoye)) / len(contenu_original) * 100) if contenu_original else 0
         }
 
-    def nettoyer_tous_fichiers(self):
+    def nettoyer_tous_fichiers(self, region="bourgogne_franche_comte", culture=None, year=None):
         """
-        Nettoie tous les fichiers .txt du dossier source et les sauvegarde dans clean_txt
-        en conservant la même structure
+        Nettoie les fichiers .txt en attente de nettoyage d'après le catalogue et les
+        sauvegarde dans clean_txt en conservant la même structure
         """
         logger.info("Debut du nettoyage des fichiers BSV")
-        
-        if not os.path.exists(self.source_dir):
-            logger.error(f"Dossier source non trouve: {self.source_dir}")
-            return 0, 0
+
+        source_dir = os.path.join(self.processed_base_dir, "txt", region)
+        dest_dir = os.path.join(self.processed_base_dir, "clean_txt", region)
         
         total_files = 0
         success_files = 0
@@ -167,38 +194,49 @@ class BSVCleaner:
             'caracteres_nettoye': 0
         }
         
-        for root, dirs, files in os.walk(self.source_dir):
-            for file in files:
-                if file.endswith('.txt'):
-                    total_files += 1
-                    chemin_entree = os.path.join(root, file)
-                    
-                    # Construire le chemin de sortie en conservant la structure
-                    relative_path = os.path.relpath(root, self.source_dir)
-                    chemin_sortie = os.path.join(self.dest_dir, relative_path, file)
-                    
-                    if self.nettoyer_fichier(chemin_entree, chemin_sortie):
-                        success_files += 1
-                        
-                        # Calculer les statistiques pour ce fichier
-                        with open(chemin_entree, 'r', encoding='utf-8') as f:
-                            contenu_original = f.read()
-                        with open(chemin_sortie, 'r', encoding='utf-8') as f:
-                            contenu_nettoye = f.read()
-                        
-                        stats = self.obtenir_statistiques(contenu_original, contenu_nettoye)
-                        
-                        # Accumuler les statistiques totales
-                        for key in stats_totales:
-                            stats_totales[key] += stats[key]
-                        
-                        logger.info(f"Fichier nettoye: {chemin_sortie} "
-                                  f"({stats['reduction_pourcentage']:.1f}% de reduction)")
-                    else:
-                        logger.error(f"Echec du nettoyage: {chemin_entree}")
+        for bulletin in self.catalog.pending("clean", region=region, culture=culture, year=year):
+            total_files += 1
+            chemin_entree = self.catalog.absolute_path(bulletin["input_path"])
+
+            # Construire le chemin de sortie en conservant la structure
+            relative_path = os.path.relpath(chemin_entree, source_dir)
+            chemin_sortie = os.path.join(dest_dir, relative_path)
+
+            # Passes réduites pour un texte déjà débarrassé des en-têtes à l'extraction
+            extraction = self.catalog.stage(bulletin["id"], "extract")
+            mise_en_page = extraction is not None and extraction["detail"] == EXTRACTION_LAYOUT
+
+            started_at = time.time()
+            start = time.perf_counter()
+            if self.nettoyer_fichier(chemin_entree, chemin_sortie, mise_en_page):
+                success_files += 1
+                self.catalog.record_stage(bulletin["id"], "clean", path=chemin_sortie, started_at=started_at,
+                                          duration=time.perf_counter() - start)
+                if self.metadonnees:
+                    self.catalog.set_metadata(bulletin["id"], self.metadonnees["number"],
+                                              self.metadonnees["issue_date"], self.metadonnees["culture"])
+
+                # Calculer les statistiques pour ce fichier
+                with open(chemin_entree, 'r', encoding='utf-8') as f:
+                    contenu_original = f.read()
+                with open(chemin_sortie, 'r', encoding='utf-8') as f:
+                    contenu_nettoye = f.read()
+
+                stats = self.obtenir_statistiques(contenu_original, contenu_nettoye)
+
+                # Accumuler les statistiques totales
+                for key in stats_totales:
+                    stats_totales[key] += stats[key]
+
+                logger.info(f"Fichier nettoye: {chemin_sortie} "
+                          f"({stats['reduction_pourcentage']:.1f}% de reduction)")
+            else:
+                self.catalog.record_stage(bulletin["id"], "clean", status=STATUS_FAILED,
+                                          started_at=started_at, duration=time.perf_counter() - start)
+                logger.error(f"Echec du nettoyage: {chemin_entree}")
         
         # Afficher les statistiques globales
-        if total_files > 0:
+        if total_files > 0 and stats_totales['caracteres_original'] > 0:
             reduction_moyenne = ((stats_totales['caracteres_original'] - stats_totales['caracteres_nettoye']) / 
                                stats_totales['caracteres_original'] * 100)
             
@@ -0,0 +1,285 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.catalog import BulletinCatalog, STATUS_FAILED
+from utils.config_loader import ConfigLoader
+from utils.logger import setup_logging, get_logger
+from utils.text_normalization import tokenize
+
+# Initialiser le logger
+logger = get_logger(__name__)
+
+VOCAB_FILE = "vocab.txt"
+MANIFEST_FILE = "manifest.json"
+TOKENS_PREFIX = "tokens"    # tokens.<version>.u32 : uint32 bruts, complétés en ajout seul
+INDEX_PREFIX = "index"      # index.<version>.npz : offsets et doc_ids
+
+
+class TokenStore:
+    """
+    Lecture du corpus encodé : vocabulaire global et tableaux d'identifiants uint32.
+
+    Le fichier de tokens contient les documents concaténés ; les tokens du document i
+    sont tokens[offsets[i]:offsets[i + 1]] et doc_ids[i] est l'identifiant du bulletin.
+    manifest.json, écrit en dernier, fait foi : il désigne les fichiers de tokens et
+    d'index valides et le nombre de tokens et de mots à lire, ce qu'une écriture
+    interrompue a pu ajouter au-delà est ignoré. Les tokens sont ouverts en mmap.
+    """
+
+    def __init__(self, tokens_dir: str = None):
+        if tokens_dir is None:
+            config_loader = ConfigLoader("config.yaml")
+            tokens_dir = config_loader.get_path(config_loader.config["data"]["tokens_dir"])
+        self.tokens_dir = tokens_dir
+        self.reload()
+
+    def reload(self):
+        """(Re)charge le vocabulaire et les tableaux désignés par le manifeste"""
+        self.manifest = None
+        manifest_path = os.path.join(self.tokens_dir, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        manifest = self.manifest or {"version": 0, "n_tokens": 0, "n_vocab": 0}
+
+        lignes = []
+        vocab_path = os.path.join(self.tokens_dir, VOCAB_FILE)
+        if os.path.exists(vocab_path):
+            with open(vocab_path, "r", encoding="utf-8") as f:
+                lignes = f.read().split("\n")[:-1]
+        self.vocab_lines = len(lignes)
+        self.vocab = lignes[:manifest["n_vocab"]]
+        self.index = {token: i for i, token in enumerate(self.vocab)}
+
+        if manifest["n_tokens"]:
+            self.tokens = np.memmap(os.path.join(self.tokens_dir, manifest["tokens"]), dtype=np.uint32, mode="r",
+                                    shape=(manifest["n_tokens"],))
+        else:
+            self.tokens = np.zeros(0, dtype=np.uint32)
+        if self.manifest is not None:
+            with np.load(os.path.join(self.tokens_dir, manifest["index"])) as index:
+                self.offsets = index["offsets"]
+                self.doc_ids = index["doc_ids"]
+            if (len(self.doc_ids) != manifest["n_docs"] or len(self.offsets) != manifest["n_docs"] + 1
+                    or int(self.offsets[-1]) != manifest["n_tokens"]):
+                raise ValueError(f"Corpus encodé incohérent avec son manifeste: {self.tokens_dir}")
+        else:
+            self.offsets = np.zeros(1, dtype=np.int64)
+            self.doc_ids = np.zeros(0, dtype=np.int64)
+        self.doc_index = {int(doc_id): i for i, doc_id in enumerate(self.doc_ids)}
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def token_id(self, token: str) -> int | None:
+        """Identifiant d'un mot (normalisé comme le corpus), None s'il est inconnu"""
+        tokens = tokenize(token)
+        return self.index.get(tokens[0]) if len(tokens) == 1 else None
+
+    def encode(self, text: str) -> np.ndarray:
+        """Encode un texte avec le vocabulaire existant (mots inconnus ignorés)"""
+        ids = [self.index[t] for t in tokenize(text) if t in self.index]
+        return np.array(ids, dtype=np.uint32)
+
+    def doc_tokens(self, bulletin_id: int) -> np.ndarray:
+        """Tokens d'un bulletin (vue sans copie sur le tableau partagé)"""
+        i = self.doc_index[bulletin_id]
+        return self.tokens[self.offsets[i]:self.offsets[i + 1]]
+
+    def documents(self):
+        """Itère sur (bulletin_id, tokens) dans l'ordre du stockage"""
+        for i, doc_id in enumerate(self.doc_ids):
+            yield int(doc_id), self.tokens[self.offsets[i]:self.offsets[i + 1]]
+
+    def doc_of_positions(self, positions: np.ndarray) -> np.ndarray:
+        """Index de document de chaque position dans le tableau concaténé"""
+        return np.searchsorted(self.offsets, positions, side="right") - 1
+
+    def phrase_counts(self, phrase: str) -> np.ndarray:
+        """Occurrences d'un mot ou d'une expression ("rouille jaune") dans chaque document"""
+        counts = np.zeros(len(self.doc_ids), dtype=np.int64)
+        ids = [self.index.get(token) for token in tokenize(phrase)]
+        if not ids or None in ids or len(self.tokens) < len(ids):
+            return counts
+        n = len(ids)
+        last = len(self.tokens) - n + 1
+        match = self.tokens[:last] == ids[0]
+        for i in range(1, n):
+            match &= self.tokens[i:last + i] == ids[i]
+        positions = np.flatnonzero(match)
+        # Une expression à cheval sur deux documents n'est pas une occurrence
+        docs = self.doc_of_positions(positions)
+        docs = docs[docs == self.doc_of_positions(positions + n - 1)]
+        return np.bincount(docs, minlength=len(self.doc_ids)).astype(np.int64)
+
+    def word_counts(self) -> np.ndarray:
+        """Fréquence de chaque identifiant du vocabulaire sur tout le corpus"""
+        return np.bincount(self.tokens, minlength=len(self.vocab))
+
+
+class CorpusTokenizer:
+    """
+    Tokenise une seule fois les BSV nettoyés et maintient le corpus encodé de façon
+    incrémentale : seuls les bulletins nettoyés depuis le dernier passage sont lus.
+    """
+
+    def __init__(self, tokens_dir: str = None, catalog_path: str = None):
+        self.config_loader = ConfigLoader("config.yaml")
+        if tokens_dir is None:
+            tokens_dir = self.config_loader.get_path(self.config_loader.config["data"]["tokens_dir"])
+        self.tokens_dir = tokens_dir
+        os.makedirs(self.tokens_dir, exist_ok=True)
+        self.catalog = BulletinCatalog(catalog_path)
+
+    def _encoder(self, texte, store, nouveaux_mots):
+        ids = []
+        for token in tokenize(texte):
+            token_id = store.index.get(token)
+            if token_id is None:
+                token_id = len(store.vocab)
+                store.index[token] = token_id
+                store.vocab.append(token)
+                nouveaux_mots.append(token)
+            ids.append(token_id)
+        return np.array(ids, dtype=np.uint32)
+
+    def _ecrire(self, store, nouveaux_docs, nouveaux_mots, remplaces):
+        """
+        Ajoute les nouveaux documents au corpus encodé. Les tokens sont ajoutés à la fin du
+        fichier existant ; il n'est réécrit (compacté) que si des documents sont remplacés.
+        Le manifeste est remplacé en dernier : jusque-là, les lecteurs voient l'état précédent.
+        """
+        manifest = store.manifest or {"version": 0, "n_tokens": 0, "n_vocab": 0}
+        version = manifest["version"] + 1
+
+        # Vocabulaire en ajout seul : les identifiants existants restent valides. Les mots
+        # ajoutés par une écriture interrompue (au-delà du manifeste) sont d'abord retirés.
+        vocab_path = os.path.join(self.tokens_dir, VOCAB_FILE)
+        if store.vocab_lines != manifest["n_vocab"]:
+            with open(vocab_path + ".tmp", "w", encoding="utf-8") as f:
+                f.writelines(token + "\n" for token in store.vocab[:manifest["n_vocab"]])
+            os.replace(vocab_path + ".tmp", vocab_path)
+        with open(vocab_path, "a", encoding="utf-8") as f:
+            f.writelines(token + "\n" for token in nouveaux_mots)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if remplaces:
+            conserves = [i for i, doc_id in enumerate(store.doc_ids) if int(doc_id) not in remplaces]
+            tokens_file = f"{TOKENS_PREFIX}.{version}.u32"
+            with open(os.path.join(self.tokens_dir, tokens_file), "wb") as f:
+                for i in conserves:
+                    f.write(np.ascontiguousarray(store.tokens[store.offsets[i]:store.offsets[i + 1]]).tobytes())
+                for _, tokens in nouveaux_docs:
+                    f.write(tokens.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            longueurs = [int(store.offsets[i + 1] - store.offsets[i]) for i in conserves]
+            doc_ids = [int(store.doc_ids[i]) for i in conserves]
+            precedents = np.zeros(0, dtype=np.int64)
+        else:
+            tokens_file = manifest.get("tokens", f"{TOKENS_PREFIX}.{version}.u32")
+            with open(os.path.join(self.tokens_dir, tokens_file), "ab") as f:
+                # Tokens d'une écriture interrompue, jamais validés par le manifeste
+                f.truncate(manifest["n_tokens"] * np.dtype(np.uint32).itemsize)
+                for _, tokens in nouveaux_docs:
+                    f.write(tokens.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            longueurs = []
+            doc_ids = store.doc_ids.tolist()
+            precedents = store.offsets[:-1]
+
+        longueurs += [len(tokens) for _, tokens in nouveaux_docs]
+        offsets = np.zeros(len(longueurs) + 1, dtype=np.int64)
+        np.cumsum(longueurs, out=offsets[1:])
+        if len(precedents):
+            offsets = np.concatenate((precedents, offsets + store.offsets[-1]))
+        doc_ids = np.array(doc_ids + [d for d, _ in nouveaux_docs], dtype=np.int64)
+        index_file = f"{INDEX_PREFIX}.{version}.npz"
+        np.savez(os.path.join(self.tokens_dir, index_file), offsets=offsets, doc_ids=doc_ids)
+
+        manifest_path = os.path.join(self.tokens_dir, MANIFEST_FILE)
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": version, "tokens": tokens_file, "index": index_file,
+                       "n_tokens": int(offsets[-1]), "n_docs": len(doc_ids),
+                       "n_vocab": manifest["n_vocab"] + len(nouveaux_mots)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+        # Fichiers des versions précédentes (les lecteurs déjà ouverts gardent leur mmap)
+        for name in os.listdir(self.tokens_dir):
+            if name.startswith((TOKENS_PREFIX + ".", INDEX_PREFIX + ".")) and name not in (tokens_file, index_file):
+                os.remove(os.path.join(self.tokens_dir, name))
+
+    def tokeniser_nouveaux_fichiers(self, region=None, culture=None, year=None):
+        """Ajoute au corpus encodé les bulletins nettoyés pas encore tokenisés"""
+        logger.info("Debut de la tokenisation du corpus")
+        store = TokenStore(self.tokens_dir)
+        nouveaux_docs = []
+        nouveaux_mots = []
+        succes = []
+        total_files = 0
+
+        for bulletin in self.catalog.pending("tokenize", region=region, culture=culture, year=year):
+            total_files += 1
+            chemin = self.catalog.absolute_path(bulletin["input_path"])
+            started_at = time.time()
+            start = time.perf_counter()
+            try:
+                with open(chemin, "r", encoding="utf-8") as f:
+                    tokens = self._encoder(f.read(), store, nouveaux_mots)
+                nouveaux_docs.append((bulletin["id"], tokens))
+                succes.append((bulletin["id"], started_at, time.perf_counter() - start, len(tokens)))
+            except Exception as e:
+                self.catalog.record_stage(bulletin["id"], "tokenize", status=STATUS_FAILED, started_at=started_at,
+                                          duration=time.perf_counter() - start, detail=str(e))
+                logger.error(f"Erreur lors de la tokenisation de {chemin}: {e}")
+
+        if nouveaux_docs:
+            remplaces = {doc_id for doc_id, _ in nouveaux_docs if doc_id in store.doc_index}
+            self._ecrire(store, nouveaux_docs, nouveaux_mots, remplaces)
+            for bulletin_id, started_at, duration, n_tokens in succes:
+                self.catalog.record_stage(bulletin_id, "tokenize", started_at=started_at, duration=duration,
+                                          detail=f"{n_tokens} tokens")
+
+        logger.info(f"Tokenisation terminee: {len(succes)}/{total_files} fichiers, "
+                    f"{len(nouveaux_mots)} nouveau(x) mot(s), vocabulaire de {len(store.vocab)} mots")
+        return len(succes), total_files
+
+
+def main():
+    """Fonction principale"""
+    setup_logging()
+    logger.info("Demarrage de la tokenisation du corpus")
+    logger.info("Plant Health NLP Analysis - Polytech Dijon")
+
+    try:
+        tokenizer = CorpusTokenizer()
+        success, total = tokenizer.tokeniser_nouveaux_fichiers()
+
+        if success == total:
+            logger.info("Tokenisation terminee avec succes!")
+            return 0
+        else:
+            logger.warning(f"Tokenisation partielle: {success}/{total} fichiers")
+            return 1
+
+    except KeyboardInterrupt:
+        logger.warning("Interruption par l'utilisateur (Ctrl+C)")
+        return 1
+
+    except Exception as e:
+        logger.error("Erreur fatale lors de la tokenisation")
+        logger.exception(e)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
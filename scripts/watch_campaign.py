@@ -0,0 +1,140 @@
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le dossier parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.bulletin_similarity import TfidfIndexer
+from scripts.crawl_scheduler import CrawlScheduler, CrawlJob, region_campaigns
+from scripts.pdf_text_extractor_PymuPDF import PDFTextExtractor
+from scripts.scraping import retrieve_page_if_modified, find_pdf_links
+from scripts.section_segmentation import BSVSegmenter
+from scripts.text_cleaning import BSVCleaner
+from scripts.tokenisation import CorpusTokenizer
+from utils.logger import setup_logging, get_logger
+
+
+logger = get_logger(__name__)
+
+
+class CampaignWatcher:
+    """
+    Surveille les pages de la campagne en cours : à chaque cycle, une requête conditionnelle
+    par page ; seuls les bulletins nouvellement publiés sont téléchargés puis extraits,
+    nettoyés, segmentés, tokenisés et indexés (TF-IDF).
+    """
+
+    def __init__(self):
+        self.scheduler = CrawlScheduler()
+        self.catalog = self.scheduler.catalog
+        watch_cfg = self.scheduler.cfg["scraping"]["watch"]
+        self.interval = watch_cfg["intervalle_secondes"]
+
+        self.extractor = PDFTextExtractor()
+        self.cleaner = BSVCleaner()
+        self.segmenter = BSVSegmenter()
+        self.tokenizer = CorpusTokenizer()
+        self.tfidf_indexer = TfidfIndexer()
+
+    def current_pages(self, regions=None) -> list:
+        """Pages de campagne en cours configurées : [(région, culture, url)]"""
+        pages = []
+        for region in regions or self.scheduler.cfg["scraping"]["regions"]:
+            for culture, url in region_campaigns(self.scheduler.cfg["scraping"], region)["current"].items():
+                pages.append((region, culture, url))
+        return pages
+
+    def poll_page(self, region: str, culture: str, url: str) -> int:
+        """
+        Interroge une page et télécharge les bulletins qui ne sont pas encore au catalogue.
+        Les validateurs HTTP ne sont mémorisés qu'une fois qu'aucun lien de la page n'attend
+        plus de nouvelle tentative, pour qu'un échec temporaire soit retenté au cycle
+        suivant ; un lien abandonné (dead-letter, erreur 4xx définitive) ne bloque pas la page.
+
+        Returns:
+            int: nombre de bulletins téléchargés
+        """
+        validators = self.catalog.http_validators(url)
+        with self.scheduler.limiter(url):
+            status, html_content, validators = retrieve_page_if_modified(url, **validators)
+        if status != 200:
+            return 0
+
+        # Année inconnue : déduite de la date de parution lors de l'extraction (une campagne
+        # chevauche deux années civiles)
+        jobs = [CrawlJob("pdf", region, culture, pdf_url)
+                for pdf_url in find_pdf_links(html_content, url) if self.catalog.find_by_url(pdf_url) is None]
+        if jobs:
+            logger.info(f"{region}/{culture}: {len(jobs)} nouveau(x) bulletin(s) publié(s)")
+        self.scheduler.enqueue(jobs)
+        # Seuls les bulletins de cette page : les reprises d'autres pages restent à leur cycle
+        self.scheduler.drain(wait_for_retries=False, urls=[job.url for job in jobs])
+
+        downloaded = sum(1 for job in jobs if self.catalog.find_by_url(job.url) is not None)
+        retrying = self.scheduler.queue.pending(job.url for job in jobs)
+        if retrying:
+            logger.info(f"{region}/{culture}: {len(retrying)} bulletin(s) à retenter au prochain cycle")
+        else:
+            self.catalog.set_http_validators(url, **validators)
+        return downloaded
+
+    def poll_once(self, regions=None) -> int:
+        """
+        Un cycle de surveillance ; retourne le nombre de bulletins nouvellement téléchargés.
+        Les étapes sont lancées à chaque cycle, même sans téléchargement, pour reprendre le
+        travail laissé en attente par un cycle précédent (étape en échec, arrêt en cours de route).
+        """
+        downloaded = 0
+        pages = self.current_pages(regions)
+        for region, culture, url in pages:
+            downloaded += self.poll_page(region, culture, url)
+        if downloaded:
+            logger.info(f"{downloaded} nouveau(x) bulletin(s) téléchargé(s)")
+        else:
+            logger.debug("Aucun nouveau bulletin")
+
+        # Chaque étape ne traite que son travail en attente d'après le catalogue
+        for region in sorted({region for region, _, _ in pages}):
+            self.extractor.process_all_pdfs(region=region)
+            self.cleaner.nettoyer_tous_fichiers(region=region)
+            self.segmenter.segmenter_tous_fichiers(region=region)
+        self.tokenizer.tokeniser_nouveaux_fichiers()
+        self.tfidf_indexer.indexer_nouveaux_fichiers()
+        return downloaded
+
+    def watch(self, regions=None):
+        """Boucle de surveillance (Ctrl+C pour arrêter)"""
+        logger.info(f"Surveillance de la campagne en cours toutes les {self.interval}s")
+        while True:
+            start = time.monotonic()
+            try:
+                self.poll_once(regions)
+            except Exception as e:
+                logger.error("Erreur lors du cycle de surveillance")
+                logger.exception(e)
+            time.sleep(max(0.0, self.interval - (time.monotonic() - start)))
+
+
+def main():
+
+    setup_logging()
+    logger.info("Démarrage de la surveillance de la campagne BSV en cours")
+    logger.info("Plant Health NLP Analysis - Polytech Dijon")
+
+    try:
+        CampaignWatcher().watch()
+        return 0
+
+    except KeyboardInterrupt:
+        logger.warning("Interruption par l'utilisateur (Ctrl+C)")
+        return 0
+
+    except Exception as e:
+        logger.error("Erreur fatale lors de la surveillance")
+        logger.exception(e)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
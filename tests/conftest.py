@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Ajouter le dossier parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
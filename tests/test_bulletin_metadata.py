@@ -0,0 +1,33 @@
+from utils.bulletin_metadata import HEADER_PATTERN, HeaderCollector
+
+
+def test_collector_removes_headers_and_keeps_metadata():
+    texte = ("Blé tendre\n"
+             "Grandes cultures n° 12 du 3 4 2024\n"
+             "Septoriose en progression.\n"
+             "N°12 du 03/04/2024\n"
+             "Colza\n")
+    collector = HeaderCollector()
+    nettoye = HEADER_PATTERN.sub(collector, texte)
+
+    assert "n° 12" not in nettoye and "N°12" not in nettoye
+    assert "Septoriose en progression." in nettoye
+    assert len(collector.headers) == 2
+    assert collector.summary() == {"number": 12, "issue_date": "2024-04-03", "culture": "grandes_cultures"}
+
+
+def test_invalid_date_is_removed_but_ignored():
+    collector = HeaderCollector()
+    nettoye = HEADER_PATTERN.sub(collector, "Titre\nN°3 du 31/02/2024\nSuite\n")
+
+    assert nettoye == "Titre\nSuite\n"
+    assert collector.headers == []
+    assert collector.summary() is None
+
+
+def test_feed_text_recognises_isolated_header_block():
+    collector = HeaderCollector()
+
+    assert collector.feed_text("  N°7 du 15/05/2023 ")
+    assert not collector.feed_text("Pucerons : seuil atteint")
+    assert collector.summary() == {"number": 7, "issue_date": "2023-05-15", "culture": None}
@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+
+from scripts.bulletin_similarity import MANIFEST_FILE, TfidfIndex, TfidfIndexer, hash_features
+
+DOCUMENTS = {
+    1: "rouille jaune sur blé tendre, rouille jaune en progression",
+    2: "rouille brune sur blé dur",
+    3: "altises et charançons du colza",
+    4: "pucerons dans l'orge",
+}
+
+
+def _indexer(tfidf_dir):
+    # Indexation seule : pas de catalogue
+    indexer = TfidfIndexer.__new__(TfidfIndexer)
+    indexer.tfidf_dir = str(tfidf_dir)
+    indexer.n_bits = 20
+    indexer.df_max = 0.5
+    return indexer
+
+
+def _indexer_documents(tfidf_dir, documents):
+    indexer = _indexer(tfidf_dir)
+    index = TfidfIndex(indexer.tfidf_dir)
+    nouveaux = [(doc_id, *hash_features(texte, indexer.n_bits)) for doc_id, texte in documents.items()]
+    indptr, features, values, doc_ids = indexer._fusionner(index, nouveaux)
+    idf, index_indptr, index_docs, index_weights = indexer._index_inverse(indptr, features, values)
+    indexer._save(index.manifest, {
+        "counts_indptr.npy": indptr, "counts_features.npy": features, "counts_values.npy": values,
+        "doc_ids.npy": doc_ids, "idf.npy": idf, "index_indptr.npy": index_indptr,
+        "index_docs.npy": index_docs, "index_weights.npy": index_weights,
+    })
+    return TfidfIndex(indexer.tfidf_dir)
+
+
+def test_top_k_ranks_and_excludes(tmp_path):
+    index = _indexer_documents(tmp_path, DOCUMENTS)
+
+    resultats = index.similar(1, k=2)
+    assert [doc_id for doc_id, _ in resultats] == [2]  # documents sans mot commun écartés
+    assert 0 < resultats[0][1] < 1
+
+    features, weights = index.text_vector("rouille jaune")
+    resultats = index.top_k(features, weights, k=10)
+    assert [doc_id for doc_id, _ in resultats] == [1, 2]
+    assert resultats[0][1] > resultats[1][1]
+    assert index.top_k(features, weights, k=1) == resultats[:1]
+
+
+@pytest.mark.parametrize("k", [0, -1, 2.5, True, None])
+def test_top_k_rejects_invalid_k(tmp_path, k):
+    index = _indexer_documents(tmp_path, DOCUMENTS)
+    features, weights = index.text_vector("rouille")
+    with pytest.raises(ValueError):
+        index.top_k(features, weights, k)
+
+
+def test_reindexing_switches_version(tmp_path):
+    index = _indexer_documents(tmp_path, DOCUMENTS)
+    ancien = index.manifest["dir"]
+
+    nouvel_index = _indexer_documents(tmp_path, {5: "rouille jaune sur triticale"})
+    assert nouvel_index.manifest["version"] == index.manifest["version"] + 1
+    assert sorted(int(d) for d in nouvel_index.doc_ids) == [1, 2, 3, 4, 5]
+    assert not os.path.exists(tmp_path / ancien)
+    assert os.path.exists(tmp_path / MANIFEST_FILE)
+    # Un lecteur ouvert avant la bascule garde une version complète et cohérente
+    assert len(index) == 4 and np.asarray(index.index_docs).max() < 4
+
+
+def test_empty_index(tmp_path):
+    index = TfidfIndex(str(tmp_path))
+    features, weights = index.text_vector("rouille")
+    assert len(index) == 0
+    assert index.top_k(features, weights, k=3) == []
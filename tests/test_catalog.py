@@ -0,0 +1,29 @@
+from utils.catalog import BulletinCatalog
+
+
+def _pdf(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"%PDF-1.7 " + path.name.encode())
+    return path
+
+
+def test_sync_raw_directory_imports_only_new_files(tmp_path):
+    raw = tmp_path / "raw"
+    _pdf(raw / "2024" / "bsv_01.pdf")
+    catalog = BulletinCatalog(str(tmp_path / "catalog.sqlite"))
+
+    assert catalog.sync_raw_directory(str(raw), "bfc") == 1
+    bulletin = catalog.bulletins("bfc")[0]
+    assert (bulletin["year"], bulletin["culture"]) == (2024, "grandes_cultures")
+    assert [row["id"] for row in catalog.pending("extract", region="bfc")] == [bulletin["id"]]
+
+    # Nouveau passage : rien à importer, culture des bulletins connus conservée
+    catalog.conn.execute("UPDATE bulletins SET culture = 'viticulture'")
+    assert catalog.sync_raw_directory(str(raw), "bfc") == 0
+    assert catalog.get(bulletin["id"])["culture"] == "viticulture"
+
+    # PDF déposé après le premier passage
+    _pdf(raw / "bsv_hors_annee.pdf")
+    assert catalog.sync_raw_directory(str(raw), "bfc") == 1
+    assert sorted(row["year"] is None for row in catalog.bulletins("bfc")) == [False, True]
+    catalog.close()
@@ -0,0 +1,46 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+from utils.fetch_queue import FetchQueue
+from utils.file_utils import FetchError, parse_retry_after
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), ("", None), ("120", 120.0), (" 5 ", 5.0),
+                                             ("bientôt", None)])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    assert 50 <= parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    # Date passée : pas d'attente négative
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+
+def test_retryable_status_codes():
+    assert FetchError("u", "réseau").retryable
+    assert all(FetchError("u", "http", code).retryable for code in (408, 429, 500, 503))
+    assert not any(FetchError("u", "http", code).retryable for code in (400, 403, 404, 410))
+
+
+def test_failures_are_rescheduled_then_dead_lettered(tmp_path):
+    queue = FetchQueue(str(tmp_path / "queue.sqlite"))
+    queue.max_attempts = 2
+    queue.enqueue("http://a/temporaire.pdf", "pdf", "r", "c", 2024)
+    queue.enqueue("http://a/absent.pdf", "pdf", "r", "c", 2024)
+
+    assert queue.mark_failed("http://a/temporaire.pdf", FetchError("u", "HTTP 503", 503, retry_after=30))
+    assert not queue.mark_failed("http://a/absent.pdf", FetchError("u", "HTTP 404", 404))
+    assert queue.pending(["http://a/temporaire.pdf", "http://a/absent.pdf"]) == {"http://a/temporaire.pdf"}
+    assert queue.ready() == []
+    assert queue.next_attempt_at(after=time.time()) >= time.time() + 29
+
+    assert not queue.mark_failed("http://a/temporaire.pdf", FetchError("u", "HTTP 503", 503))
+    assert queue.next_attempt_at() is None
+    assert [row["url"] for row in queue.dead_letters()] == ["http://a/absent.pdf", "http://a/temporaire.pdf"]
+
+    assert queue.replay(["http://a/absent.pdf"]) == 1
+    assert [row["url"] for row in queue.ready(urls=["http://a/absent.pdf"])] == ["http://a/absent.pdf"]
+    queue.close()
@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from utils.http_mirror import archive_key, load_response, replay_address, store_response
+
+
+def test_archive_key_ignores_scheme_fragment_and_host_case():
+    url = "https://draaf.example.fr/bsv/2024?page=2"
+    assert archive_key(url) == archive_key("http://DRAAF.example.fr/bsv/2024?page=2#haut")
+    assert archive_key(url) != archive_key("https://draaf.example.fr/bsv/2024?page=3")
+    assert archive_key("https://draaf.example.fr") == archive_key("https://draaf.example.fr/")
+
+
+def test_archive_key_matches_percent_encoded_form():
+    brute = "https://draaf.example.fr/bsv/BSV GC n°12 blé.pdf"
+    encodee = "https://draaf.example.fr/bsv/BSV%20GC%20n%C2%B012%20bl%C3%A9.pdf"
+    assert archive_key(brute) == archive_key(encodee)
+
+
+def test_replay_address_resolves_to_the_recorded_key():
+    url = "https://draaf.example.fr/bsv/BSV GC n°12 blé.pdf?v=1"
+    address = replay_address(url, "http://127.0.0.1:8765")
+    assert address.startswith("http://127.0.0.1:8765/draaf.example.fr/bsv/BSV%20GC")
+    # Le serveur de rejeu reconstruit l'URL d'origine depuis le chemin reçu
+    parts = urlsplit(address)
+    assert archive_key("http:/" + parts.path + "?" + parts.query) == archive_key(url)
+
+
+def test_store_and_load_response(tmp_path):
+    response = SimpleNamespace(content=b"%PDF-1.7", status_code=200, headers={"ETag": '"abc"'})
+    store_response(str(tmp_path), "https://draaf.example.fr/a b.pdf", response)
+
+    assert load_response(str(tmp_path), "http://draaf.example.fr/a%20b.pdf") == (200, {"ETag": '"abc"'}, b"%PDF-1.7")
+    assert load_response(str(tmp_path), "http://draaf.example.fr/autre.pdf") is None
@@ -0,0 +1,91 @@
+import numpy as np
+
+from scripts.ngram_miner import (CountMinSketch, PathogenCandidateMiner, SpaceSaving, decode_ngram,
+                                 encode_ngrams, MAX_TOKEN_ID)
+from scripts.tokenisation import CorpusTokenizer
+
+
+def test_encode_ngrams_round_trip():
+    tokens = np.array([3, 7, MAX_TOKEN_ID, 0], dtype=np.uint32)
+    assert [decode_ngram(k) for k in encode_ngrams(tokens, 1).tolist()] == [[3], [7], [MAX_TOKEN_ID], [0]]
+    assert [decode_ngram(k) for k in encode_ngrams(tokens, 3).tolist()] == [[3, 7, MAX_TOKEN_ID], [7, MAX_TOKEN_ID, 0]]
+    # Mêmes tokens, longueurs différentes : clés distinctes
+    assert encode_ngrams(np.array([0, 0], dtype=np.uint32), 2)[0] != encode_ngrams(np.array([0], dtype=np.uint32), 1)[0]
+    assert len(encode_ngrams(tokens[:2], 3)) == 0
+
+
+def test_count_min_sketch_never_underestimates():
+    rng = np.random.default_rng(1)
+    keys = np.arange(2000, dtype=np.uint64) * np.uint64(2654435761)
+    counts = rng.integers(1, 50, size=len(keys))
+    # Sketch volontairement trop petit : collisions garanties
+    sketch = CountMinSketch(width=64, depth=3)
+    sketch.add(keys, counts)
+    estimes = sketch.query(keys)
+    assert np.all(estimes >= counts)
+    assert np.all(estimes <= counts.sum())
+
+
+def test_count_min_sketch_is_exact_without_collisions():
+    sketch = CountMinSketch(width=1 << 16, depth=4)
+    keys = np.array([11, 22, 33], dtype=np.uint64)
+    sketch.add(keys, np.array([5, 1, 2]))
+    sketch.add(keys[:1], np.array([3]))
+    assert sketch.query(keys).tolist() == [8, 1, 2]
+
+
+def test_space_saving_evicts_minimum_and_carries_its_count():
+    summary = SpaceSaving(k=2)
+    assert summary.update(1, 5) is None
+    assert summary.update(2, 2) is None
+    assert summary.update(1, 1) is None
+    # Le compteur minimal (clé 2, compte 2) est évincé ; la nouvelle clé hérite de son compte
+    assert summary.update(3, 1) == 2
+    assert summary.counts == {1: 6, 3: 3}
+    # L'erreur est une surestimation bornée par le minimum au moment de l'éviction
+    assert summary.update(4, 1) == 3
+    assert summary.counts == {1: 6, 4: 4}
+
+
+def test_space_saving_keeps_heavy_hitters():
+    summary = SpaceSaving(k=3)
+    flux = [1] * 50 + [2] * 30 + list(range(100, 140)) + [1] * 10
+    for key in flux:
+        summary.update(key, 1)
+    # Toute clé de fréquence > N/k reste surveillée, et aucun compte n'est sous-estimé
+    assert len(summary.counts) == 3
+    assert summary.counts[1] >= 60
+    assert all(count >= flux.count(key) for key, count in summary.counts.items())
+    assert len(summary._heap) <= 4 * summary.k + 1
+
+
+def test_candidates_filter(tmp_path):
+    tokenizer = CorpusTokenizer(str(tmp_path / "tokens"), catalog_path=str(tmp_path / "catalog.sqlite"))
+    textes = ["La mouche grise sur le blé", "La mouche grise sur le colza", "Le colza est sain",
+              "Les pucerons sur blé", "Rouille jaune sur le blé", "Sept mouche grise"]
+    for i, texte in enumerate(textes):
+        pdf, clean = tmp_path / f"{i}.pdf", tmp_path / f"{i}.txt"
+        pdf.write_bytes(b"%PDF " + str(i).encode())
+        clean.write_text(" ".join([texte] * 3), encoding="utf-8")
+        bulletin_id = tokenizer.catalog.register_pdf(str(pdf), "bfc", "grandes_cultures", 2020 + i % 2)
+        tokenizer.catalog.record_stage(bulletin_id, "clean", path=str(clean))
+    tokenizer.tokeniser_nouveaux_fichiers()
+    tokenizer.catalog.close()
+
+    miner = PathogenCandidateMiner(str(tmp_path / "tokens"), catalog_path=str(tmp_path / "catalog.sqlite"))
+    miner.connus = {"mouche"}
+    candidats = miner.miner()
+    miner.catalog.close()
+    par_terme = {c["terme"]: c for c in candidats}
+
+    assert par_terme["mouche grise"]["frequence"] == 9
+    assert par_terme["mouche grise"]["pmi"] > 0
+    assert par_terme["colza"]["pmi"] == 0.0
+    # Termes connus, n-grammes rares, bords en mot outil et unigrammes courts exclus
+    assert "mouche" not in par_terme
+    assert "pucerons" not in par_terme
+    assert not any(t.split()[0] in ("la", "le", "sur") or t.split()[-1] in ("la", "le", "sur") for t in par_terme)
+    assert "ble" not in par_terme and "sain" not in par_terme
+    assert all(c["frequence"] >= miner.frequence_min for c in candidats)
+    scores = [c["score"] for c in candidats]
+    assert scores == sorted(scores, reverse=True)
@@ -0,0 +1,88 @@
+import pymupdf
+import pytest
+
+from utils.page_triage import (PAGE_MARKER_PATTERN, PAGE_IMAGE, PAGE_TABLEAU, PAGE_TEXTE, PAGE_VIDE, PageTriage,
+                               page_marker)
+
+LEGENDE = "Symptômes de rouille jaune sur feuille de blé tendre, stade épiaison."
+
+
+@pytest.fixture
+def triage():
+    return PageTriage()
+
+
+@pytest.fixture
+def doc():
+    with pymupdf.open() as doc:
+        yield doc
+
+
+def _image(page, rect):
+    pixmap = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 8, 8), 0)
+    pixmap.clear_with(180)
+    page.insert_image(rect, pixmap=pixmap)
+
+
+def _traits(page, n):
+    for i in range(n):
+        page.draw_line((50, 200 + 10 * i), (500, 200 + 10 * i))
+
+
+def test_page_marker_round_trip():
+    pages = [{"page": 1, "kind": PAGE_TABLEAU}, {"page": 2, "kind": PAGE_IMAGE}]
+    texte = page_marker(pages[0], 2) + "Colza\n\n" + page_marker(pages[1], 2)
+
+    assert PAGE_MARKER_PATTERN.findall(texte) == [PAGE_TABLEAU, PAGE_IMAGE]
+    assert PAGE_MARKER_PATTERN.sub("", texte) == "Colza\n\n"
+
+
+def test_text_and_table_pages(triage, doc):
+    texte = doc.new_page()
+    texte.insert_text((50, 100), LEGENDE)
+    _traits(texte, triage.traits_tableau - 1)
+    tableau = doc.new_page()
+    tableau.insert_text((50, 100), LEGENDE)
+    _traits(tableau, triage.traits_tableau)
+
+    resultats = triage.classify_document(doc)
+    assert [r["kind"] for r in resultats] == [PAGE_TEXTE, PAGE_TABLEAU]
+    assert [r["strokes"] for r in resultats] == [triage.traits_tableau - 1, triage.traits_tableau]
+    assert [r["page"] for r in resultats] == [1, 2]
+    assert not any(r["needs_ocr"] for r in resultats)
+
+
+def test_empty_and_image_pages(triage, doc):
+    doc.new_page()
+    logo = doc.new_page()
+    _image(logo, pymupdf.Rect(0, 0, 100, 100))
+    scan = doc.new_page()
+    _image(scan, scan.rect)
+
+    vide, petit_logo, image = triage.classify_document(doc)
+    assert (vide["kind"], vide["needs_ocr"]) == (PAGE_VIDE, False)
+    assert (petit_logo["kind"], petit_logo["needs_ocr"]) == (PAGE_VIDE, False)
+    assert 0 < petit_logo["image_ratio"] < triage.couverture_image
+    assert (image["kind"], image["needs_ocr"], image["image_ratio"]) == (PAGE_IMAGE, True, 1.0)
+
+
+def test_captioned_image_is_content(triage, doc):
+    # Photo pleine page et sa légende : la légende doit être extraite
+    page = doc.new_page()
+    _image(page, page.rect)
+    page.insert_text((50, 800), LEGENDE)
+
+    resultat = triage.classify(page)
+    assert resultat["kind"] == PAGE_TEXTE and not resultat["needs_ocr"]
+
+
+@pytest.mark.parametrize("ecart, kind", [(-1, PAGE_IMAGE), (0, PAGE_TEXTE)])
+def test_image_threshold_is_caracteres_min(triage, doc, ecart, kind):
+    page = doc.new_page()
+    _image(page, page.rect)
+    page.insert_text((50, 800), "x" * (triage.caracteres_min + ecart))
+
+    resultat = triage.classify(page)
+    assert resultat["chars"] == triage.caracteres_min + ecart
+    assert resultat["kind"] == kind
+    assert resultat["needs_ocr"] == (kind == PAGE_IMAGE)
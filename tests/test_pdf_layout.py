@@ -0,0 +1,110 @@
+import pymupdf
+import pytest
+
+from scripts.pdf_text_extractor_PymuPDF import PDFTextExtractor
+from utils.catalog import EXTRACTION_LAYOUT
+from utils.page_triage import PAGE_MARKER_PATTERN
+
+CORPS = "Colza : les pucerons cendrés sont observés dans plusieurs parcelles de la région."
+
+
+@pytest.fixture
+def extractor(tmp_path):
+    extractor = PDFTextExtractor(mode=EXTRACTION_LAYOUT, catalog_path=str(tmp_path / "catalog.sqlite"))
+    yield extractor
+    extractor.catalog.close()
+
+
+def _blocs(page):
+    return [b for b in page.get_text("dict")["blocks"] if b["type"] == 0]
+
+
+def _pdf(tmp_path, pages):
+    """PDF A4 dont chaque page est une liste de (y, texte) ; le corps occupe le milieu de page"""
+    path = tmp_path / "bulletin.pdf"
+    with pymupdf.open() as doc:
+        for lignes in pages:
+            page = doc.new_page(width=595, height=842)
+            page.insert_text((50, 400), CORPS, fontsize=10)
+            for y, texte in lignes:
+                page.insert_text((50, y), texte, fontsize=9)
+        doc.save(path)
+    return path
+
+
+def _extraire(extractor, tmp_path, pages):
+    output = tmp_path / "bulletin.txt"
+    assert extractor.extract_text_from_pdf(str(_pdf(tmp_path, pages)), str(output))
+    texte = PAGE_MARKER_PATTERN.sub("\f", output.read_text(encoding="utf8"))
+    return [page.strip() for page in texte.split("\f")[1:]]
+
+
+def test_lignes_bloc_dehyphenates_and_merges_cells():
+    with pymupdf.open() as doc:
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((50, 100), "Les premiers symptômes de septoriose sont visibles sur les parcel-", fontsize=11)
+        page.insert_text((50, 114), "les précoces.", fontsize=11)
+        page.insert_text((50, 300), "Stade", fontsize=11)
+        page.insert_text((200, 300), "Parcelles", fontsize=11)
+        page.insert_text((50, 314), "Épiaison", fontsize=11)
+        page.insert_text((200, 314), "12", fontsize=11)
+        paragraphe, tableau = _blocs(page)
+
+        assert PDFTextExtractor._lignes_bloc(paragraphe) == [
+            "Les premiers symptômes de septoriose sont visibles sur les parcelles précoces."]
+        # Cellules d'une même ligne visuelle réunies, lignes du tableau non poursuivies
+        assert PDFTextExtractor._lignes_bloc(tableau) == ["Stade Parcelles", "Épiaison 12"]
+
+
+def test_lignes_bloc_keeps_bullets_and_short_lines():
+    with pymupdf.open() as doc:
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((50, 100), "Rouille jaune : foyers signalés dans le nord de la région,", fontsize=11)
+        page.insert_text((50, 114), "- surveiller les variétés sensibles", fontsize=11)
+        page.insert_text((50, 128), "Fin.", fontsize=11)
+        page.insert_text((50, 142), "Prochain bulletin mardi", fontsize=11)
+        bloc, = _blocs(page)
+
+        assert PDFTextExtractor._lignes_bloc(bloc) == [
+            "Rouille jaune : foyers signalés dans le nord de la région,",
+            "- surveiller les variétés sensibles", "Fin.", "Prochain bulletin mardi"]
+
+
+def test_layout_drops_headers_and_page_numbers(extractor, tmp_path):
+    pages = _extraire(extractor, tmp_path, [
+        [(30, "N°12 du 03/04/2024"), (830, "1")],
+        [(30, "N°12 du 03/04/2024"), (830, "Page 2")],
+        [(30, "N°12 du 03/04/2024"), (830, "3 sur 3")],
+    ])
+    assert pages == [CORPS] * 3
+    assert extractor.metadonnees["number"] == 12
+    assert extractor.metadonnees["issue_date"] == "2024-04-03"
+
+
+def test_layout_drops_recurring_band_blocks(extractor, tmp_path):
+    pages = _extraire(extractor, tmp_path, [
+        [(30, "Chambre d'agriculture - édition 1"), (820, "Reproduction interdite"), (600, "Bas de corps")],
+        [(30, "Chambre d'agriculture - édition 2"), (820, "Contact : 03 80 00 00 00")],
+        [(30, "Chambre d'agriculture - édition 3"), (820, "Reproduction interdite"), (600, "Bas de corps")],
+        [(30, "Document provisoire")],
+    ])
+    # Bandeaux répétés sur au moins la moitié des pages (chiffres ignorés) retirés, les autres
+    # conservés ; un bloc du corps de page n'est jamais retiré, même répété
+    assert pages == [f"{CORPS}\nBas de corps", f"{CORPS}\nContact : 03 80 00 00 00",
+                     f"{CORPS}\nBas de corps", f"{CORPS}\nDocument provisoire"]
+
+
+def test_layout_repetition_threshold(extractor, tmp_path):
+    extractor.repetition_min = 1.0
+    pages = _extraire(extractor, tmp_path, [
+        [(820, "Reproduction interdite")],
+        [(820, "Reproduction interdite")],
+        [],
+    ])
+    # 2 pages sur 3 : sous le seuil, le pied de page reste
+    assert pages == [f"{CORPS}\nReproduction interdite"] * 2 + [CORPS]
+
+    extractor.repetition_min = 0.5
+    pages = _extraire(extractor, tmp_path, [[(820, "Reproduction interdite")], [], []])
+    # Un bloc vu sur une seule page n'est jamais une répétition
+    assert pages == [f"{CORPS}\nReproduction interdite", CORPS, CORPS]
@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+import pytest
+
+from scripts.bulletin_similarity import TfidfIndexer
+from scripts.query_service import LRUCache, QueryService
+from scripts.tokenisation import CorpusTokenizer
+from utils.catalog import BulletinCatalog
+
+BULLETINS = [
+    ("2024-03-05", "Rouille jaune sur blé tendre : premiers foyers"),
+    ("2024-03-12", "Rouille jaune en progression sur blé"),
+    ("2024-04-02", "Pucerons et altises sur colza"),
+]
+
+
+class Corpus:
+    """Catalogue, tokens et index TF-IDF temporaires, interrogés par un QueryService"""
+
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.paths = {"catalog_path": str(tmp_path / "catalog.sqlite"), "tokens_dir": str(tmp_path / "tokens"),
+                      "tfidf_dir": str(tmp_path / "tfidf")}
+        self.catalog = BulletinCatalog(self.paths["catalog_path"])
+        self.ids = [self.ajouter(f"bsv_{i}", issue_date, texte) for i, (issue_date, texte) in enumerate(BULLETINS)]
+        self.indexer()
+
+    def ajouter(self, nom, issue_date, texte):
+        pdf, clean = self.tmp_path / f"{nom}.pdf", self.tmp_path / f"{nom}.txt"
+        pdf.write_bytes(b"%PDF " + nom.encode())
+        clean.write_text(texte, encoding="utf-8")
+        bulletin_id = self.catalog.register_pdf(str(pdf), "bfc", "grandes_cultures")
+        self.catalog.set_metadata(bulletin_id, issue_date=issue_date)
+        self.catalog.record_stage(bulletin_id, "clean", path=str(clean))
+        return bulletin_id
+
+    def indexer(self):
+        tokenizer = CorpusTokenizer(self.paths["tokens_dir"], self.paths["catalog_path"])
+        tokenizer.tokeniser_nouveaux_fichiers()
+        tokenizer.catalog.close()
+        indexer = TfidfIndexer(self.paths["tfidf_dir"], self.paths["catalog_path"])
+        indexer.indexer_nouveaux_fichiers()
+        indexer.catalog.close()
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    corpus = Corpus(tmp_path)
+    yield corpus
+    corpus.catalog.close()
+
+
+@pytest.fixture
+def service(corpus):
+    service = QueryService(**corpus.paths)
+    service.max_k = 2
+    # Signature du catalogue relue à chaque requête
+    service.manifest_interval = 0
+    yield service
+    service.executor.shutdown()
+
+
+def _get(service, *targets):
+    async def requetes():
+        return [await service.handle(target) for target in targets]
+    return [(status, json.loads(body)) for status, body in asyncio.run(requetes())]
+
+
+def test_lru_cache_is_bounded_in_bytes():
+    cache = LRUCache(10)
+    cache.put("a", b"1234")
+    cache.put("b", b"5678")
+    assert cache.get("a") == b"1234"  # 'a' devient la plus récente
+    cache.put("c", b"90ab")
+    assert cache.get("b") is None
+    assert list(cache.entries) == ["a", "c"] and cache.size == 8
+
+    cache.put("a", b"123456")  # remplacement : seule la différence de taille compte
+    assert list(cache.entries) == ["c", "a"] and cache.size == 10
+    cache.put("d", b"xyz")
+    assert list(cache.entries) == ["a", "d"] and cache.size == 9
+    cache.put("trop", b"x" * 11)  # plus grand que le cache entier : ignoré
+    assert cache.get("trop") is None and cache.size == 9
+
+
+def test_routes(service, corpus):
+    (status, bulletins), (status_1, bulletin), (status_2, recherche), (status_3, mentions), (status_4, inconnue) = _get(
+        service, "/bulletins?start=2024-03-01&end=2024-03-31", f"/bulletins/{corpus.ids[0]}",
+        "/search?q=rouille%20jaune", "/pathogenes/rouille%20jaune/mentions?granularite=mois", "/inconnue")
+
+    assert status == 200 and [b["id"] for b in bulletins["bulletins"]] == corpus.ids[:2]
+    assert status_1 == 200 and bulletin["text"] == BULLETINS[0][1] and bulletin["year"] == 2024
+    assert bulletin["stages"]["tokenize"]["status"] == "done"
+    assert status_2 == 200 and sorted(r["id"] for r in recherche["results"]) == corpus.ids[:2]
+    assert status_3 == 200 and mentions["series"] == [
+        {"periode": "2024-03", "mentions": 2, "bulletins": 2}, {"periode": "2024-04", "mentions": 0, "bulletins": 1}]
+    assert status_4 == 404
+
+
+def test_k_is_validated_and_capped(service, corpus):
+    reponses = _get(service, "/search?q=rouille&k=0", "/search?q=rouille&k=-5", "/search?q=rouille&k=deux",
+                    "/search?q=rouille&k=" + "9" * 5000, f"/bulletins/{corpus.ids[0]}/similar?k=0")
+    assert [status for status, _ in reponses] == [400] * 5
+    assert all("k" in body["error"] for _, body in reponses)
+
+    (status, body), = _get(service, "/search?q=sur&k=1000")
+    assert status == 200 and len(body["results"]) == service.max_k
+
+
+def test_unknown_ids(service, corpus):
+    inconnu = max(corpus.ids) + 1
+    reponses = _get(service, f"/bulletins/{inconnu}", f"/bulletins/{inconnu}/similar")
+    assert [status for status, _ in reponses] == [404, 404]
+    assert str(inconnu) in reponses[0][1]["error"]
+
+
+def test_cache_invalidated_when_catalog_changes(service, corpus):
+    (_, avant), (_, encore) = _get(service, "/bulletins", "/bulletins")
+    assert avant == encore and avant["count"] == 3
+    assert len(service.cache.entries) == 1
+    manifest = service.manifest
+
+    corpus.ajouter("bsv_3", "2024-04-09", "Charançons du bourgeon terminal")
+    (_, apres), = _get(service, "/bulletins")
+    assert apres["count"] == 4
+    assert service.manifest != manifest
+    # Ancienne réponse retirée, seule la nouvelle est en cache
+    assert len(service.cache.entries) == 1 and next(iter(service.cache.entries)).startswith(service.manifest)
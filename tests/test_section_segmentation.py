@@ -0,0 +1,59 @@
+import pytest
+
+from scripts.section_segmentation import BSVSegmenter, read_section
+
+TEXTE = """N°12 du 03/04/2024
+Blé tendre
+Stade épi 1 cm.
+Rouille jaune : situation
+Premiers foyers signalés.
+Colza : les larves d'altises sont présentes dans la plupart des parcelles
+Pucerons
+Présence faible.
+Colza
+Charançon de la tige
+Vols en cours.
+"""
+
+
+@pytest.fixture
+def segmenter(tmp_path):
+    segmenter = BSVSegmenter(catalog_path=str(tmp_path / "catalog.sqlite"))
+    segmenter.cultures = segmenter._termes_normalises(["blé", "blé dur", "colza"])
+    segmenter.ravageurs = segmenter._termes_normalises(["rouille jaune", "pucerons", "charançon de la tige"])
+    yield segmenter
+    segmenter.catalog.close()
+
+
+def test_titles_require_the_term_and_a_short_suffix(segmenter):
+    assert segmenter._titre("Blé-dur", segmenter.cultures) == "blé dur"
+    assert segmenter._titre("BLÉ TENDRE", segmenter.cultures) == "blé"
+    assert segmenter._titre("Pucerons : situation", segmenter.ravageurs) == "pucerons"
+    assert segmenter._titre("Colza : les larves sont présentes partout", segmenter.cultures) is None
+    assert segmenter._titre("Bléssure", segmenter.cultures) is None
+    assert segmenter._titre("Colza.", segmenter.cultures) is None
+
+
+def test_sections_and_byte_offsets(segmenter, tmp_path):
+    contenu = TEXTE.encode("utf-8")
+    sections = segmenter.segmenter(contenu)
+
+    assert [(s["crop"], s["pest"]) for s in sections] == [
+        ("blé", None), ("blé", "rouille jaune"), ("blé", "pucerons"), ("colza", None), ("colza", "charançon de la tige")]
+    # La phrase commençant par "Colza" reste dans la section blé
+    assert sections[2]["title"] == "Pucerons"
+    assert sections[0]["end"] == sections[3]["start"] and sections[-1]["end"] == len(contenu)
+
+    path = tmp_path / "bulletin.txt"
+    path.write_bytes(contenu)
+    rouille = sections[1]
+    assert read_section(str(path), rouille["start"], rouille["end"]) == (
+        "Rouille jaune : situation\nPremiers foyers signalés.\n"
+        "Colza : les larves d'altises sont présentes dans la plupart des parcelles\n")
+    assert read_section(str(path), sections[-1]["start"], sections[-1]["end"]).startswith("Charançon")
+
+
+def test_read_section_of_empty_file(tmp_path):
+    path = tmp_path / "vide.txt"
+    path.write_bytes(b"")
+    assert read_section(str(path), 0, 0) == ""
@@ -0,0 +1,43 @@
+import pytest
+
+from utils.table_store import column_name, normalize_table, parse_number
+
+
+@pytest.mark.parametrize("text, expected", [("12", (12.0, None)), ("12,5", (12.5, None)),
+                                            ("1 234,5", (1234.5, None)), ("-3.2", (-3.2, None)),
+                                            ("45 %", (45.0, "%")), ("< 5", (5.0, None)),
+                                            ("", (None, None)), ("stade 32", (None, None))])
+def test_parse_number(text, expected):
+    assert parse_number(text) == expected
+
+
+def test_column_name():
+    assert column_name("Parcelles touchées (%)") == "parcelles_touchees_pct"
+    assert column_name(None) == ""
+
+
+def test_header_rows_and_merged_cells():
+    rows = [["Culture", "Pucerons", None],
+            ["", "Parcelles", "Intensité"],
+            ["Blé", "12", "1,5"],
+            ["Orge", "", "0"],
+            [None, None, None]]
+    columns, data = normalize_table(rows)
+
+    assert columns == ["culture", "pucerons_parcelles", "pucerons_intensite"]
+    assert data == [["Blé", "12", "1,5"], ["Orge", "", "0"]]
+
+
+def test_duplicate_names_never_collide():
+    columns, _ = normalize_table([["Note", "Note", "Note 2", "", ""], ["1", "2", "3", "4", "5"]])
+
+    assert columns == ["note", "note_2", "note_2_2", "colonne_4", "colonne_5"]
+    assert len(set(columns)) == len(columns)
+
+
+def test_numeric_first_row_is_data():
+    columns, data = normalize_table([["1", "2"], ["3", "4"]])
+
+    assert columns == ["colonne_1", "colonne_2"]
+    assert data == [["1", "2"], ["3", "4"]]
+    assert normalize_table([["", None]]) == ([], [])
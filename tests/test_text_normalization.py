@@ -0,0 +1,18 @@
+from utils.text_normalization import fold_accents, load_term_list, tokenize
+
+
+def test_tokenize_folds_accents_case_and_separators():
+    assert tokenize("l'Oïdium du Blé-tendre") == ["l", "oidium", "du", "ble", "tendre"]
+    assert tokenize("  45 % — n°12 ") == ["45", "n", "12"]
+
+
+def test_fold_accents_keeps_other_characters():
+    assert fold_accents("Charançon, maïs & œillet") == "Charancon, mais & œillet"
+
+
+def test_load_term_list(tmp_path):
+    path = tmp_path / "termes.txt"
+    path.write_text("# commentaire\nrouille jaune\n\n  Pucerons  \n", encoding="utf-8")
+
+    assert load_term_list(str(path)) == ["rouille jaune", "Pucerons"]
+    assert load_term_list(str(tmp_path / "absent.txt")) == []
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from scripts.tokenisation import CorpusTokenizer, TokenStore, MANIFEST_FILE, VOCAB_FILE
+from utils.catalog import STATUS_FAILED
+
+
+class Corpus:
+    """Bulletins nettoyés d'un catalogue temporaire, tokenisés par CorpusTokenizer"""
+
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.tokens_dir = str(tmp_path / "tokens")
+        self.tokenizer = CorpusTokenizer(self.tokens_dir, catalog_path=str(tmp_path / "catalog.sqlite"))
+        self.catalog = self.tokenizer.catalog
+        self.ids = {}
+
+    def nettoyer(self, nom, texte):
+        """Enregistre (ou met à jour) le texte nettoyé d'un bulletin"""
+        pdf = self.tmp_path / f"{nom}.pdf"
+        pdf.write_bytes(b"%PDF " + nom.encode())
+        clean = self.tmp_path / f"{nom}.txt"
+        clean.write_text(texte, encoding="utf-8")
+        bulletin_id = self.catalog.register_pdf(str(pdf), "bfc", "grandes_cultures", 2024)
+        self.catalog.record_stage(bulletin_id, "clean", path=str(clean))
+        self.ids[nom] = bulletin_id
+
+    def tokeniser(self):
+        self.tokenizer.tokeniser_nouveaux_fichiers()
+        return TokenStore(self.tokens_dir)
+
+    def textes(self, store):
+        noms = {bulletin_id: nom for nom, bulletin_id in self.ids.items()}
+        return {noms[doc_id]: " ".join(store.vocab[i] for i in tokens) for doc_id, tokens in store.documents()}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    corpus = Corpus(tmp_path)
+    yield corpus
+    corpus.catalog.close()
+
+
+def test_round_trip_append_and_replace(corpus, tmp_path):
+    corpus.nettoyer("a", "Rouille jaune sur blé")
+    corpus.nettoyer("b", "Pucerons sur colza")
+    store = corpus.tokeniser()
+    assert corpus.textes(store) == {"a": "rouille jaune sur ble", "b": "pucerons sur colza"}
+    fichier = store.manifest["tokens"]
+
+    # Nouveau bulletin seul : ajout en fin du même fichier, identifiants conservés
+    corpus.nettoyer("c", "Rouille brune")
+    store = corpus.tokeniser()
+    assert store.manifest["tokens"] == fichier
+    assert corpus.textes(store)["c"] == "rouille brune"
+    assert store.vocab[:6] == ["rouille", "jaune", "sur", "ble", "pucerons", "colza"]
+    assert store.phrase_counts("rouille jaune").tolist() == [1, 0, 0]
+
+    # Rien de nouveau : aucune écriture
+    assert corpus.tokeniser().manifest["version"] == store.manifest["version"]
+
+    # Bulletin re-nettoyé : le corpus est compacté dans un nouveau fichier
+    corpus.nettoyer("b", "Charançons")
+    store = corpus.tokeniser()
+    assert store.manifest["tokens"] != fichier
+    assert not (tmp_path / "tokens" / fichier).exists()
+    assert corpus.textes(store) == {"a": "rouille jaune sur ble", "c": "rouille brune", "b": "charancons"}
+    assert store.word_counts()[store.token_id("pucerons")] == 0
+    assert corpus.catalog.pending("tokenize") == []
+
+
+def test_unreadable_file_is_recorded_as_failed(corpus, tmp_path):
+    corpus.nettoyer("a", "septoriose")
+    (tmp_path / "a.txt").unlink()
+
+    assert corpus.tokenizer.tokeniser_nouveaux_fichiers() == (0, 1)
+    assert corpus.catalog.stage(corpus.ids["a"], "tokenize")["status"] == STATUS_FAILED
+    assert len(TokenStore(corpus.tokens_dir)) == 0
+
+
+def test_interrupted_write_is_ignored(corpus, tmp_path):
+    corpus.nettoyer("a", "septoriose")
+    store = corpus.tokeniser()
+    version = store.manifest["version"]
+
+    # Écriture interrompue avant le manifeste : mots et tokens en trop sur le disque
+    with open(tmp_path / "tokens" / VOCAB_FILE, "a", encoding="utf-8") as f:
+        f.write("fantome\n")
+    with open(tmp_path / "tokens" / store.manifest["tokens"], "ab") as f:
+        f.write(np.array([1, 1], dtype=np.uint32).tobytes())
+
+    store = TokenStore(corpus.tokens_dir)
+    assert store.vocab == ["septoriose"] and len(store.tokens) == 1
+
+    corpus.nettoyer("b", "oidium")
+    store = corpus.tokeniser()
+    assert corpus.textes(store) == {"a": "septoriose", "b": "oidium"}
+    assert store.vocab == ["septoriose", "oidium"]
+    assert store.manifest["version"] == version + 1
+    assert (tmp_path / "tokens" / MANIFEST_FILE).exists()
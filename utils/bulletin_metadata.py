@@ -0,0 +1,77 @@
+import re
+from collections import Counter
+from datetime import date
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# En-têtes répétés en haut de page des BSV :
+#   "Grandes cultures n° 12 du 3 4 2024" et "N°12 du 03/04/2024"
+HEADER_PATTERN = re.compile(
+    r'(?<=\n)((?P<culture>Grandes cultures) n° (?P<numero_a>\d+) du (?P<jour_a>\d+) (?P<mois_a>\d+) (?P<annee_a>\d+)'
+    r'|N°(?P<numero_b>\d+) du (?P<jour_b>\d{2})/(?P<mois_b>\d{2})/(?P<annee_b>\d{4}))\s*$\n',
+    re.MULTILINE
+)
+
+
+def parse_header(match: re.Match) -> dict | None:
+    """
+    Convertit une correspondance de HEADER_PATTERN en métadonnées.
+
+    Returns:
+        dict: {'number', 'issue_date' (ISO), 'culture'} ou None si la date est invalide
+    """
+    suffix = "a" if match.group("numero_a") else "b"
+    year = int(match.group(f"annee_{suffix}"))
+    if year < 100:
+        year += 2000
+    try:
+        issue_date = date(year, int(match.group(f"mois_{suffix}")), int(match.group(f"jour_{suffix}")))
+    except ValueError:
+        logger.debug(f"Date d'en-tête invalide ignorée: {match.group(1)!r}")
+        return None
+
+    culture = match.group("culture")
+    return {
+        "number": int(match.group(f"numero_{suffix}")),
+        "issue_date": issue_date.isoformat(),
+        "culture": culture.lower().replace(" ", "_") if culture else None,
+    }
+
+
+class HeaderCollector:
+    """
+    Callback de re.sub() qui supprime les en-têtes tout en mémorisant leurs métadonnées,
+    afin de les récupérer sans passe supplémentaire sur le texte.
+    """
+
+    def __init__(self):
+        self.headers = []
+
+    def __call__(self, match: re.Match) -> str:
+        metadata = parse_header(match)
+        if metadata is not None:
+            self.headers.append(metadata)
+        return ""
+
+    def feed_text(self, text: str) -> bool:
+        """
+        Mémorise les en-têtes d'un bloc de texte déjà isolé (bandeau de page retiré à
+        l'extraction). Retourne True si le bloc est un en-tête de bulletin.
+        """
+        _, count = HEADER_PATTERN.subn(self, "\n" + text.strip() + "\n")
+        return count > 0
+
+    def summary(self) -> dict | None:
+        """Métadonnées les plus fréquentes parmi les en-têtes vus (un par page en général)"""
+        if not self.headers:
+            return None
+        (number, issue_date), _ = Counter((h["number"], h["issue_date"]) for h in self.headers).most_common(1)[0]
+        cultures = [h["culture"] for h in self.headers if h["culture"]]
+        return {
+            "number": number,
+            "issue_date": issue_date,
+            "culture": Counter(cultures).most_common(1)[0][0] if cultures else None,
+        }
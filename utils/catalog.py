@@ -0,0 +1,416 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+
+from utils.config_loader import ConfigLoader
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# Étape amont dont chaque étape dépend (None = point d'entrée du pipeline)
+STAGE_INPUTS = {
+    "download": None,
+    "extract": "download",
+    "extract_pdfplumber": "download",
+    "tables": "download",
+    "clean": "extract",
+    "segment": "clean",
+    "tokenize": "clean",
+    "tfidf": "clean",
+}
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# Valeurs de 'detail' de l'étape extract : mode d'extraction du texte
+EXTRACTION_TEXTE = "texte"
+EXTRACTION_LAYOUT = "layout"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bulletins (
+    id INTEGER PRIMARY KEY,
+    source_url TEXT,
+    region TEXT NOT NULL,
+    culture TEXT NOT NULL,
+    year INTEGER,
+    number INTEGER,
+    issue_date TEXT,
+    file_name TEXT NOT NULL,
+    pdf_path TEXT NOT NULL UNIQUE,
+    pdf_sha256 TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bulletins_region_culture_year ON bulletins(region, culture, year);
+CREATE INDEX IF NOT EXISTS idx_bulletins_source_url ON bulletins(source_url);
+-- Index temporel trié (région, culture, date) : requêtes par période sans lire les textes
+CREATE INDEX IF NOT EXISTS idx_bulletins_temporal ON bulletins(region, culture, issue_date);
+
+CREATE TABLE IF NOT EXISTS stages (
+    bulletin_id INTEGER NOT NULL REFERENCES bulletins(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    path TEXT,
+    sha256 TEXT,
+    started_at REAL,
+    finished_at REAL NOT NULL,
+    duration REAL,
+    detail TEXT,
+    PRIMARY KEY (bulletin_id, stage)
+);
+CREATE INDEX IF NOT EXISTS idx_stages_stage_status ON stages(stage, status);
+
+-- Sections des textes nettoyés : offsets en octets (UTF-8) pour un découpage par mmap
+CREATE TABLE IF NOT EXISTS sections (
+    bulletin_id INTEGER NOT NULL REFERENCES bulletins(id) ON DELETE CASCADE,
+    section_index INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    crop TEXT NOT NULL,
+    pest TEXT,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    PRIMARY KEY (bulletin_id, section_index)
+);
+CREATE INDEX IF NOT EXISTS idx_sections_crop_pest ON sections(crop, pest);
+
+-- Classement des pages de chaque PDF avant extraction (utils/page_triage.py)
+CREATE TABLE IF NOT EXISTS pages (
+    bulletin_id INTEGER NOT NULL REFERENCES bulletins(id) ON DELETE CASCADE,
+    page INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    chars INTEGER NOT NULL,
+    fonts INTEGER NOT NULL,
+    image_ratio REAL NOT NULL,
+    strokes INTEGER NOT NULL,
+    needs_ocr INTEGER NOT NULL,
+    PRIMARY KEY (bulletin_id, page)
+);
+CREATE INDEX IF NOT EXISTS idx_pages_ocr ON pages(needs_ocr);
+
+-- Validateurs HTTP des pages surveillées (requêtes conditionnelles)
+CREATE TABLE IF NOT EXISTS http_validators (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    checked_at REAL NOT NULL
+);
+"""
+
+
+def file_sha256(file_path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BulletinCatalog:
+    """
+    Catalogue SQLite local du corpus : une ligne par bulletin, une ligne par étape traitée.
+
+    Les étapes interrogent le catalogue (requêtes indexées) pour connaître leur travail
+    en attente au lieu de parcourir l'arborescence data/.
+    """
+
+    def __init__(self, db_path: str = None, read_only: bool = False):
+        config_loader = ConfigLoader()
+        self.base_dir = config_loader.base_dir
+        if db_path is None:
+            db_path = config_loader.config["data"].get("catalog_path", "data/catalog.sqlite")
+        self.db_path = config_loader.get_path(db_path)
+
+        self._lock = threading.RLock()
+        if read_only:
+            # Lecteur dédié à un thread (service de requêtes) sur une base existante : en WAL,
+            # les lecteurs ne se bloquent ni entre eux ni avec l'écrivain
+            self.conn = sqlite3.connect(f"{Path(self.db_path).as_uri()}?mode=ro", uri=True,
+                                        check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+            logger.debug(f"Catalogue ouvert en lecture seule: {self.db_path}")
+            return
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        # Une connexion partagée entre threads, protégée par un verrou
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        with self._lock, self.conn:
+            self.conn.executescript(_SCHEMA)
+        logger.debug(f"Catalogue ouvert: {self.db_path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    # ====================================================================
+    # Chemins (stockés relativement à la racine du projet)
+    # ====================================================================
+    def relative_path(self, path: str) -> str:
+        path = os.path.abspath(path)
+        if path.startswith(self.base_dir + os.sep):
+            return os.path.relpath(path, self.base_dir)
+        return path
+
+    def absolute_path(self, path: str) -> str:
+        return os.path.join(self.base_dir, path)
+
+    # ====================================================================
+    # Bulletins
+    # ====================================================================
+    def register_pdf(self, pdf_path: str, region: str, culture: str, year: int = None,
+                     source_url: str = None, duration: float = None) -> int:
+        """
+        Enregistre (ou met à jour) un PDF téléchargé et marque l'étape 'download' terminée.
+
+        Returns:
+            int: identifiant du bulletin
+        """
+        rel_path = self.relative_path(pdf_path)
+        sha256 = file_sha256(pdf_path)
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT id, pdf_sha256 FROM bulletins WHERE pdf_path = ?",
+                                    (rel_path,)).fetchone()
+            if row is None:
+                cursor = self.conn.execute(
+                    "INSERT INTO bulletins (source_url, region, culture, year, file_name, pdf_path, "
+                    "pdf_sha256, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (source_url, region, culture, year, os.path.basename(pdf_path), rel_path, sha256, time.time()))
+                bulletin_id = cursor.lastrowid
+                logger.debug(f"Bulletin catalogué (id={bulletin_id}): {rel_path}")
+            else:
+                bulletin_id = row["id"]
+                self.conn.execute(
+                    "UPDATE bulletins SET source_url = COALESCE(?, source_url), region = ?, culture = ?, "
+                    "year = COALESCE(?, year), pdf_sha256 = ? WHERE id = ?",
+                    (source_url, region, culture, year, sha256, bulletin_id))
+                if row["pdf_sha256"] == sha256 and self.stage(bulletin_id, "download") is not None:
+                    return bulletin_id
+        self.record_stage(bulletin_id, "download", path=pdf_path, duration=duration, sha256=sha256)
+        return bulletin_id
+
+    def get(self, bulletin_id: int) -> sqlite3.Row | None:
+        with self._lock:
+            return self.conn.execute("SELECT * FROM bulletins WHERE id = ?", (bulletin_id,)).fetchone()
+
+    def find_by_url(self, source_url: str) -> sqlite3.Row | None:
+        with self._lock:
+            return self.conn.execute("SELECT * FROM bulletins WHERE source_url = ?", (source_url,)).fetchone()
+
+    def bulletins(self, region: str = None, culture: str = None, year: int = None) -> list:
+        where, params = self._filters(region, culture, year)
+        with self._lock:
+            return self.conn.execute(f"SELECT b.* FROM bulletins b {where} ORDER BY b.year, b.id",
+                                     params).fetchall()
+
+    def count(self, region: str = None) -> int:
+        where, params = self._filters(region, None, None)
+        with self._lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM bulletins b {where}", params).fetchone()[0]
+
+    def manifest(self) -> str:
+        """Signature du corpus : change dès qu'un bulletin est ajouté ou qu'une étape se termine"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT (SELECT COUNT(*) FROM bulletins), (SELECT COUNT(*) FROM stages), "
+                "(SELECT MAX(finished_at) FROM stages)").fetchone()
+        return f"{row[0]}:{row[1]}:{row[2]}"
+
+    def set_metadata(self, bulletin_id: int, number: int = None, issue_date: str = None, culture: str = None):
+        """Renseigne le numéro, la date de parution et la culture extraits des en-têtes du bulletin"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE bulletins SET number = COALESCE(?, number), issue_date = COALESCE(?, issue_date), "
+                "culture = COALESCE(?, culture), year = COALESCE(year, CAST(substr(?, 1, 4) AS INTEGER)) "
+                "WHERE id = ?",
+                (number, issue_date, culture, issue_date, bulletin_id))
+
+    def bulletins_between(self, start: str, end: str, region: str = None, culture: str = None) -> list:
+        """Bulletins parus entre deux dates ISO incluses, triés par date (via l'index temporel)"""
+        where, params = self._filters(region, culture, None)
+        where = (where + " AND" if where else "WHERE") + " b.issue_date BETWEEN ? AND ?"
+        with self._lock:
+            return self.conn.execute(
+                f"SELECT b.* FROM bulletins b {where} ORDER BY b.issue_date, b.id",
+                params + [start, end]).fetchall()
+
+    def weekly_counts(self, start: str, end: str, region: str = None, culture: str = None) -> OrderedDict:
+        """
+        Nombre de bulletins par semaine ISO ('2024-W14') sur une période.
+        Seules les dates de l'index sont lues, jamais le contenu des documents.
+        """
+        where, params = self._filters(region, culture, None)
+        where = (where + " AND" if where else "WHERE") + " b.issue_date BETWEEN ? AND ?"
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT b.issue_date, COUNT(*) FROM bulletins b {where} GROUP BY b.issue_date "
+                "ORDER BY b.issue_date", params + [start, end]).fetchall()
+        weeks = OrderedDict()
+        for issue_date, count in rows:
+            iso_year, iso_week, _ = date.fromisoformat(issue_date).isocalendar()
+            key = f"{iso_year}-W{iso_week:02d}"
+            weeks[key] = weeks.get(key, 0) + count
+        return weeks
+
+    def sync_raw_directory(self, raw_dir: str, region: str, culture: str = "grandes_cultures") -> int:
+        """
+        Importe dans le catalogue les PDF présents sur disque qui n'y figurent pas encore
+        (corpus téléchargé avant le catalogue, fichiers déposés à la main). Idempotent et
+        sans relecture des PDF déjà catalogués : appelé à chaque passage des extracteurs.
+        L'année est déduite du dossier parent lorsqu'il s'agit d'un nombre.
+        """
+        with self._lock:
+            known = {row[0] for row in self.conn.execute("SELECT pdf_path FROM bulletins")}
+        imported = 0
+        for pdf_path in sorted(Path(raw_dir).glob("**/*.pdf")):
+            if self.relative_path(str(pdf_path)) in known:
+                continue
+            year = int(pdf_path.parent.name) if pdf_path.parent.name.isdigit() else None
+            self.register_pdf(str(pdf_path), region, culture, year)
+            imported += 1
+        if imported:
+            logger.info(f"{imported} PDF importé(s) dans le catalogue depuis {raw_dir}")
+        return imported
+
+    # ====================================================================
+    # Étapes
+    # ====================================================================
+    def record_stage(self, bulletin_id: int, stage: str, path: str = None, status: str = STATUS_DONE,
+                     started_at: float = None, duration: float = None, detail: str = None,
+                     sha256: str = None):
+        """Enregistre le résultat d'une étape pour un bulletin"""
+        if sha256 is None and path and status == STATUS_DONE and os.path.isfile(path):
+            sha256 = file_sha256(path)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO stages (bulletin_id, stage, status, path, sha256, started_at, "
+                "finished_at, duration, detail) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (bulletin_id, stage, status, self.relative_path(path) if path else None, sha256,
+                 started_at, time.time(), duration, detail))
+
+    def stage(self, bulletin_id: int, stage: str) -> sqlite3.Row | None:
+        with self._lock:
+            return self.conn.execute("SELECT * FROM stages WHERE bulletin_id = ? AND stage = ?",
+                                     (bulletin_id, stage)).fetchone()
+
+    def pending(self, stage: str, region: str = None, culture: str = None, year: int = None) -> list:
+        """
+        Bulletins dont l'étape amont est terminée mais dont l'étape demandée n'a pas encore
+        été faite, a échoué ou est plus ancienne que son entrée.
+
+        Chaque ligne expose les colonnes du bulletin ainsi que 'input_path' (chemin
+        relatif produit par l'étape amont).
+        """
+        upstream = STAGE_INPUTS[stage]
+        if upstream is None:
+            raise ValueError(f"L'étape '{stage}' n'a pas d'étape amont")
+        where, params = self._filters(region, culture, year)
+        where = (where + " AND" if where else "WHERE") + \
+            " (s.bulletin_id IS NULL OR s.status != ? OR s.finished_at < u.finished_at)"
+        query = (
+            "SELECT b.*, u.path AS input_path FROM bulletins b "
+            "JOIN stages u ON u.bulletin_id = b.id AND u.stage = ? AND u.status = ? "
+            "LEFT JOIN stages s ON s.bulletin_id = b.id AND s.stage = ? "
+            f"{where} ORDER BY b.year, b.id"
+        )
+        with self._lock:
+            return self.conn.execute(query, [upstream, STATUS_DONE, stage] + params + [STATUS_DONE]).fetchall()
+
+    # ====================================================================
+    # Sections
+    # ====================================================================
+    def replace_sections(self, bulletin_id: int, sections: list):
+        """Remplace les sections d'un bulletin par une liste de dicts (title, crop, pest, start, end)"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM sections WHERE bulletin_id = ?", (bulletin_id,))
+            self.conn.executemany(
+                "INSERT INTO sections (bulletin_id, section_index, title, crop, pest, start, end) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(bulletin_id, i, s["title"], s["crop"], s["pest"], s["start"], s["end"])
+                 for i, s in enumerate(sections)])
+
+    def sections(self, bulletin_id: int = None, crop: str = None, pest: str = None) -> list:
+        """
+        Sections enregistrées, avec le chemin du texte nettoyé ('clean_path') à découper.
+        pest='' sélectionne les sections de niveau culture uniquement.
+        """
+        clauses, params = ["c.stage = 'clean'"], []
+        if bulletin_id is not None:
+            clauses.append("s.bulletin_id = ?")
+            params.append(bulletin_id)
+        if crop is not None:
+            clauses.append("s.crop = ?")
+            params.append(crop)
+        if pest == "":
+            clauses.append("s.pest IS NULL")
+        elif pest is not None:
+            clauses.append("s.pest = ?")
+            params.append(pest)
+        with self._lock:
+            return self.conn.execute(
+                "SELECT s.*, c.path AS clean_path FROM sections s "
+                "JOIN stages c ON c.bulletin_id = s.bulletin_id "
+                f"WHERE {' AND '.join(clauses)} ORDER BY s.bulletin_id, s.section_index", params).fetchall()
+
+    # ====================================================================
+    # Pages
+    # ====================================================================
+    def replace_pages(self, bulletin_id: int, pages: list):
+        """Remplace le classement des pages d'un bulletin (dicts de PageTriage.classify)"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM pages WHERE bulletin_id = ?", (bulletin_id,))
+            self.conn.executemany(
+                "INSERT INTO pages (bulletin_id, page, kind, chars, fonts, image_ratio, strokes, needs_ocr) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(bulletin_id, p["page"], p["kind"], p["chars"], p["fonts"], p["image_ratio"], p["strokes"],
+                  int(p["needs_ocr"])) for p in pages])
+
+    def pages(self, bulletin_id: int) -> list:
+        with self._lock:
+            return self.conn.execute("SELECT * FROM pages WHERE bulletin_id = ? ORDER BY page",
+                                     (bulletin_id,)).fetchall()
+
+    def pages_needing_ocr(self, region: str = None, culture: str = None, year: int = None) -> list:
+        """Pages sans couche texte exploitable à passer en OCR, avec le chemin du PDF"""
+        where, params = self._filters(region, culture, year)
+        where = (where + " AND" if where else "WHERE") + " p.needs_ocr = 1"
+        with self._lock:
+            return self.conn.execute(
+                "SELECT b.id AS bulletin_id, b.pdf_path, p.page, p.image_ratio FROM pages p "
+                f"JOIN bulletins b ON b.id = p.bulletin_id {where} ORDER BY b.id, p.page", params).fetchall()
+
+    # ====================================================================
+    # Validateurs HTTP
+    # ====================================================================
+    def http_validators(self, url: str) -> dict:
+        with self._lock:
+            row = self.conn.execute("SELECT etag, last_modified FROM http_validators WHERE url = ?",
+                                    (url,)).fetchone()
+        return dict(row) if row else {"etag": None, "last_modified": None}
+
+    def set_http_validators(self, url: str, etag: str = None, last_modified: str = None):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO http_validators (url, etag, last_modified, checked_at) VALUES (?, ?, ?, ?)",
+                (url, etag, last_modified, time.time()))
+
+    @staticmethod
+    def _filters(region, culture, year):
+        clauses, params = [], []
+        for column, value in (("region", region), ("culture", culture), ("year", year)):
+            if value is not None:
+                clauses.append(f"b.{column} = ?")
+                params.append(value)
+        return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
@@ -0,0 +1,186 @@
+import random
+import sqlite3
+import threading
+import time
+
+from utils.config_loader import ConfigLoader
+from utils.file_utils import FetchError
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fetch_queue (
+    url TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    region TEXT NOT NULL,
+    culture TEXT NOT NULL,
+    year INTEGER,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fetch_queue_ready ON fetch_queue(status, next_attempt_at);
+
+CREATE TABLE IF NOT EXISTS dead_letters (
+    url TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    region TEXT NOT NULL,
+    culture TEXT NOT NULL,
+    year INTEGER,
+    attempts INTEGER NOT NULL,
+    status_code INTEGER,
+    last_error TEXT,
+    failed_at REAL NOT NULL
+);
+"""
+
+
+def _url_filter(urls) -> tuple:
+    """Clause SQL restreignant une requête à une liste d'URL (aucune restriction si None)"""
+    if urls is None:
+        return "", []
+    urls = list(urls)
+    return f" AND url IN ({', '.join('?' * len(urls))})", urls
+
+
+class FetchQueue:
+    """
+    File persistante (SQLite) des pages et PDF à récupérer.
+
+    Un échec temporaire est replanifié avec un backoff exponentiel à jitter (ou le délai
+    Retry-After du serveur) ; au-delà de max_attempts, ou pour une erreur définitive,
+    l'URL passe dans la table dead_letters d'où elle peut être rejouée. Une relance ne
+    reprend que les URL non terminées.
+    """
+
+    def __init__(self, db_path: str = None):
+        config_loader = ConfigLoader()
+        retry_cfg = config_loader.config["scraping"]["retry"]
+        self.max_attempts = retry_cfg["max_attempts"]
+        self.backoff_base = retry_cfg["backoff_base"]
+        self.backoff_max = retry_cfg["backoff_max"]
+
+        if db_path is None:
+            db_path = config_loader.config["data"].get("catalog_path", "data/catalog.sqlite")
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(config_loader.get_path(db_path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self.conn:
+            self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def enqueue(self, url: str, kind: str, region: str, culture: str, year: int = None, rearm: bool = False):
+        """
+        Ajoute une URL à la file. Une URL déjà terminée n'est remise en attente que si
+        rearm=True (pages d'index à reparcourir) ; une URL en dead-letter est ignorée.
+        """
+        now = time.time()
+        with self._lock, self.conn:
+            if self.conn.execute("SELECT 1 FROM dead_letters WHERE url = ?", (url,)).fetchone():
+                return
+            self.conn.execute(
+                "INSERT OR IGNORE INTO fetch_queue (url, kind, region, culture, year, status, next_attempt_at, "
+                "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, kind, region, culture, year, STATUS_PENDING, now, now))
+            if rearm:
+                self.conn.execute(
+                    "UPDATE fetch_queue SET status = ?, attempts = 0, next_attempt_at = ?, updated_at = ? "
+                    "WHERE url = ? AND status = ?", (STATUS_PENDING, now, now, url, STATUS_DONE))
+
+    def ready(self, limit: int = 1000, urls=None) -> list:
+        """URL en attente dont la prochaine tentative est échue (restreintes à 'urls' si fourni)"""
+        clause, params = _url_filter(urls)
+        with self._lock:
+            return self.conn.execute(
+                f"SELECT * FROM fetch_queue WHERE status = ? AND next_attempt_at <= ?{clause} "
+                "ORDER BY next_attempt_at LIMIT ?", [STATUS_PENDING, time.time()] + params + [limit]).fetchall()
+
+    def next_attempt_at(self, after: float = None, urls=None) -> float | None:
+        """
+        Date de la prochaine tentative planifiée (None si la file est vide). Avec 'after',
+        seules les tentatives postérieures comptent : None signifie alors qu'aucune URL
+        n'est en attente de backoff.
+        """
+        clause, params = _url_filter(urls)
+        if after is not None:
+            clause += " AND next_attempt_at > ?"
+            params.append(after)
+        with self._lock:
+            return self.conn.execute(f"SELECT MIN(next_attempt_at) FROM fetch_queue WHERE status = ?{clause}",
+                                     [STATUS_PENDING] + params).fetchone()[0]
+
+    def pending(self, urls) -> set:
+        """URL de la liste encore en attente d'une tentative (ni terminées, ni en dead-letter)"""
+        clause, params = _url_filter(urls)
+        with self._lock:
+            return {row["url"] for row in self.conn.execute(
+                f"SELECT url FROM fetch_queue WHERE status = ?{clause}", [STATUS_PENDING] + params)}
+
+    def mark_done(self, url: str):
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE fetch_queue SET status = ?, last_error = NULL, updated_at = ? WHERE url = ?",
+                              (STATUS_DONE, time.time(), url))
+
+    def backoff(self, attempts: int, retry_after: float = None) -> float:
+        """Délai avant la tentative suivante : 'full jitter', jamais inférieur au Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempts))
+        return max(delay, retry_after or 0.0)
+
+    def mark_failed(self, url: str, error: FetchError) -> bool:
+        """
+        Replanifie l'URL, ou la déplace en dead-letter si elle ne doit plus être retentée.
+
+        Returns:
+            bool: True si une nouvelle tentative est planifiée
+        """
+        now = time.time()
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT * FROM fetch_queue WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return False
+            attempts = row["attempts"] + 1
+            if attempts >= self.max_attempts or not error.retryable:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO dead_letters (url, kind, region, culture, year, attempts, status_code, "
+                    "last_error, failed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, row["kind"], row["region"], row["culture"], row["year"], attempts, error.status_code,
+                     str(error), now))
+                self.conn.execute("DELETE FROM fetch_queue WHERE url = ?", (url,))
+                logger.error(f"Abandon après {attempts} tentative(s), URL en dead-letter: {url} ({error})")
+                return False
+            delay = self.backoff(attempts, error.retry_after)
+            self.conn.execute(
+                "UPDATE fetch_queue SET attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? "
+                "WHERE url = ?", (attempts, now + delay, str(error), now, url))
+            logger.warning(f"Tentative {attempts}/{self.max_attempts} échouée ({error}), "
+                           f"nouvel essai dans {delay:.1f}s: {url}")
+            return True
+
+    def dead_letters(self) -> list:
+        with self._lock:
+            return self.conn.execute("SELECT * FROM dead_letters ORDER BY failed_at").fetchall()
+
+    def replay(self, urls: list = None) -> int:
+        """Remet en file les URL en dead-letter (toutes par défaut), compteur de tentatives remis à zéro"""
+        now = time.time()
+        with self._lock, self.conn:
+            rows = self.dead_letters() if urls is None else [
+                r for r in self.dead_letters() if r["url"] in set(urls)]
+            for row in rows:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO fetch_queue (url, kind, region, culture, year, status, attempts, "
+                    "next_attempt_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)",
+                    (row["url"], row["kind"], row["region"], row["culture"], row["year"], STATUS_PENDING, now, now))
+                self.conn.execute("DELETE FROM dead_letters WHERE url = ?", (row["url"],))
+        logger.info(f"{len(rows)} URL rejouée(s) depuis la dead-letter")
+        return len(rows)
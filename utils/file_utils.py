@@ -1,11 +1,51 @@
 import requests
+import time
+from email.utils import parsedate_to_datetime
 from pathlib import Path
+from utils.http_mirror import http_get
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
-def download_pdf(url: str, output_dir: str, filename: str, skip_existing: bool = True) -> bool:
+class FetchError(Exception):
+    """Échec d'une requête HTTP, avec ce qu'il faut pour planifier une nouvelle tentative"""
+
+    def __init__(self, url: str, message: str, status_code: int = None, retry_after: float = None):
+        super().__init__(message)
+        self.url = url
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        # Erreurs réseau, 408, 429 et 5xx : temporaires ; les autres codes 4xx sont définitifs
+        return self.status_code is None or self.status_code in (408, 429) or self.status_code >= 500
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """En-tête Retry-After (secondes ou date HTTP) converti en secondes d'attente"""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value.strip())
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def http_error(url: str, response: requests.Response) -> FetchError:
+    return FetchError(url, f"HTTP {response.status_code}", response.status_code,
+                      parse_retry_after(response.headers.get("Retry-After")))
+
+
+def download_pdf(url: str, output_dir: str, filename: str, skip_existing: bool = True,
+                 raise_errors: bool = False) -> bool:
+    """
+    Télécharge un PDF. Les échecs sont journalisés et renvoient False, ou lèvent une
+    FetchError si raise_errors=True (utilisé par la file de réessais).
+    """
 
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
@@ -24,7 +64,7 @@ def download_pdf(url: str, output_dir: str, filename: str, skip_existing: bool =
     # Télécharger le fichier
     try:
         logger.debug(f"Début du téléchargement depuis: {url}")
-        response = requests.get(url, timeout=15, stream=True)
+        response = http_get(url, timeout=15, stream=True)
         response.raise_for_status()
 
         # Vérifier le Content-Type
@@ -44,26 +84,39 @@ def download_pdf(url: str, output_dir: str, filename: str, skip_existing: bool =
         if file_size < 1000:
             logger.error(f"Fichier téléchargé trop petit ({file_size} bytes): {filename}")
             file_path.unlink()  # Supprimer le fichier invalide
+            if raise_errors:
+                raise FetchError(url, f"Fichier trop petit ({file_size} bytes)")
             return False
 
         logger.info(f"PDF téléchargé avec succès ({file_size / 1024:.1f} KB): {filename}")
         return True
 
-    except requests.exceptions.Timeout:
+    except FetchError:
+        raise
+
+    except requests.exceptions.Timeout as e:
         logger.error(f"Timeout lors du téléchargement: {url}")
+        if raise_errors:
+            raise FetchError(url, "Timeout") from e
         return False
 
     except requests.exceptions.HTTPError as e:
         logger.error(f"Erreur HTTP {e.response.status_code} lors du téléchargement: {url}")
+        if raise_errors:
+            raise http_error(url, e.response) from e
         return False
 
-    except requests.exceptions.ConnectionError:
+    except requests.exceptions.ConnectionError as e:
         logger.error(f"Erreur de connexion lors du téléchargement: {url}")
+        if raise_errors:
+            raise FetchError(url, "Erreur de connexion") from e
         return False
 
     except Exception as e:
         logger.error(f"Erreur inattendue lors du téléchargement de {url}")
         logger.exception(e)
+        if raise_errors:
+            raise FetchError(url, f"Erreur inattendue: {e}") from e
         return False
 
 
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.utils import requote_uri
+
+from utils.config_loader import ConfigLoader
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def configure(mode: str = None, archive_dir: str = None, replay_url: str = None) -> dict:
+    """
+    Charge (ou surcharge) la configuration du miroir HTTP (scraping.mirror de config.yaml) :
+      - record : chaque réponse est archivée (corps + en-têtes) dans archive_dir
+      - replay : les requêtes sont redirigées vers le serveur de rejeu replay_url
+    """
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            config_loader = ConfigLoader()
+            mirror_cfg = config_loader.config["scraping"].get("mirror", {})
+            _settings = {
+                "mode": mirror_cfg.get("mode") or MODE_OFF,
+                "archive_dir": config_loader.get_path(mirror_cfg.get("archive_dir", "data/mirror")),
+                "replay_url": "http://{host}:{port}".format(**mirror_cfg.get("replay", {"host": "127.0.0.1",
+                                                                                       "port": 8765})),
+            }
+        if mode is not None:
+            _settings["mode"] = mode
+        if archive_dir is not None:
+            _settings["archive_dir"] = archive_dir
+        if replay_url is not None:
+            _settings["replay_url"] = replay_url.rstrip("/")
+        return _settings
+
+
+def canonical_url(url: str) -> tuple:
+    """
+    (hôte, chemin, requête) d'une URL sous la forme envoyée sur le réseau : encodée comme
+    le fait requests (espaces, accents), hôte en minuscules, chemin vide -> '/'. Une URL
+    enregistrée et celle reçue par le serveur de rejeu ont ainsi la même forme.
+    """
+    parts = urlsplit(requote_uri(url))
+    return parts.netloc.lower(), parts.path or "/", parts.query
+
+
+def archive_key(url: str) -> str:
+    """Clé d'archive d'une URL : hôte + chemin + requête canoniques (schéma et fragment ignorés)"""
+    netloc, path, query = canonical_url(url)
+    return hashlib.sha1(f"{netloc}{path}?{query}".encode("utf-8")).hexdigest()
+
+
+def replay_address(url: str, replay_url: str) -> str:
+    """https://site/chemin?q -> http://serveur-de-rejeu/site/chemin?q (forme canonique)"""
+    netloc, path, query = canonical_url(url)
+    query = f"?{query}" if query else ""
+    return f"{replay_url}/{netloc}{path}{query}"
+
+
+def store_response(archive_dir: str, url: str, response: requests.Response):
+    """Archive le corps et les en-têtes d'une réponse (écriture atomique)"""
+    os.makedirs(archive_dir, exist_ok=True)
+    key = archive_key(url)
+    body_path = os.path.join(archive_dir, key + ".body")
+    meta_path = os.path.join(archive_dir, key + ".json")
+    for path, data in ((body_path, response.content),
+                       (meta_path, json.dumps({"url": url, "status": response.status_code,
+                                               "headers": dict(response.headers)}).encode("utf-8"))):
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+
+def load_response(archive_dir: str, url: str) -> tuple | None:
+    """(statut, en-têtes, corps) archivés pour une URL, None si absente"""
+    key = archive_key(url)
+    try:
+        with open(os.path.join(archive_dir, key + ".json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(archive_dir, key + ".body"), "rb") as f:
+            return meta["status"], meta["headers"], f.read()
+    except FileNotFoundError:
+        return None
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """
+    requests.get() passant par le miroir : point d'entrée unique des requêtes du scraper.
+    Les URL restent celles du site d'origine pour l'appelant (liens, limites par site).
+    """
+    settings = configure()
+    if settings["mode"] == MODE_REPLAY:
+        return requests.get(replay_address(url, settings["replay_url"]), **kwargs)
+
+    response = requests.get(url, **kwargs)
+    if settings["mode"] == MODE_RECORD and response.status_code != 304:
+        store_response(settings["archive_dir"], url, response)
+        logger.debug(f"Réponse archivée ({response.status_code}): {url}")
+    return response
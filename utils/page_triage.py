@@ -0,0 +1,89 @@
+import re
+
+import pymupdf
+
+from utils.config_loader import ConfigLoader
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PAGE_TEXTE = "texte"
+PAGE_TABLEAU = "tableau"
+PAGE_IMAGE = "image"
+PAGE_VIDE = "vide"
+
+# Pages transmises aux extracteurs de texte
+PAGES_CONTENU = (PAGE_TEXTE, PAGE_TABLEAU)
+
+# Couche texte seule, sans les images (les plus coûteuses à décoder)
+TRIAGE_FLAGS = pymupdf.TEXTFLAGS_TEXT & ~pymupdf.TEXT_PRESERVE_IMAGES
+
+# Traits vectoriels de get_cdrawings() : segments, rectangles et quadrilatères
+TRAITS = ("l", "re", "qu")
+
+# Ligne de séparation écrite avant chaque page des fichiers texte extraits
+PAGE_MARKER_PATTERN = re.compile(r'^ ?===== Page \d+ of \d+ \((\w+)\) ====== ?\n', re.MULTILINE)
+
+
+def page_marker(triage: dict, n_pages: int) -> str:
+    """Séparateur de page portant le type de la page (PageTriage.classify)"""
+    return f" ===== Page {triage['page']} of {n_pages} ({triage['kind']}) ====== \n"
+
+
+class PageTriage:
+    """
+    Classement rapide des pages d'un PDF d'après les métadonnées PyMuPDF (caractères de
+    la couche texte, polices, couverture des images, traits vectoriels) : seules les pages
+    'texte' et 'tableau' méritent les extractions coûteuses ; les pages 'image' (scans,
+    diaporamas) sont signalées pour un OCR ultérieur.
+    """
+
+    def __init__(self):
+        triage_cfg = ConfigLoader().config["extraction"]["triage"]
+        self.caracteres_min = triage_cfg["caracteres_min"]
+        self.couverture_image = triage_cfg["couverture_image"]
+        self.traits_tableau = triage_cfg["traits_tableau"]
+
+    @staticmethod
+    def _image_ratio(page) -> float:
+        """Part de la surface de la page couverte par des images (recouvrements ignorés)"""
+        area = 0.0
+        for info in page.get_image_info():
+            rect = pymupdf.Rect(info["bbox"]) & page.rect
+            if not rect.is_empty:
+                area += rect.width * rect.height
+        return min(1.0, area / max(page.rect.width * page.rect.height, 1.0))
+
+    def classify(self, page, textpage=None) -> dict:
+        """
+        Classe une page. La couche texte 'textpage' peut être fournie pour être réutilisée
+        par l'extraction qui suit.
+
+        Returns:
+            dict: {'page' (1..n), 'kind', 'chars', 'fonts', 'image_ratio', 'strokes', 'needs_ocr'}
+        """
+        if textpage is None:
+            textpage = page.get_textpage(flags=TRIAGE_FLAGS)
+        chars = len("".join(textpage.extractText().split()))
+        result = {"page": page.number + 1, "chars": chars, "fonts": len(page.get_fonts()),
+                  "image_ratio": 0.0, "strokes": 0, "needs_ocr": False}
+
+        # Images et traits ne sont inspectés que lorsqu'ils peuvent changer la décision. Une
+        # page avec assez de texte est du contenu même illustrée (photo et sa légende)
+        if chars < self.caracteres_min:
+            result["image_ratio"] = round(self._image_ratio(page), 3)
+            if result["image_ratio"] >= self.couverture_image:
+                result["kind"] = PAGE_IMAGE
+                result["needs_ocr"] = True
+            else:
+                # Page blanche, intercalaire ou simple logo
+                result["kind"] = PAGE_VIDE
+        else:
+            result["strokes"] = sum(1 for path in page.get_cdrawings() for item in path["items"]
+                                    if item[0] in TRAITS)
+            result["kind"] = PAGE_TABLEAU if result["strokes"] >= self.traits_tableau else PAGE_TEXTE
+        return result
+
+    def classify_document(self, doc) -> list:
+        """Classement de toutes les pages d'un document PyMuPDF ouvert"""
+        return [self.classify(page) for page in doc]
@@ -0,0 +1,213 @@
+import json
+import re
+import sqlite3
+import threading
+
+from utils.config_loader import ConfigLoader
+from utils.logger import get_logger
+from utils.text_normalization import fold_accents
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+-- Tableaux extraits des PDF : un par (bulletin, page, indice sur la page)
+CREATE TABLE IF NOT EXISTS extracted_tables (
+    bulletin_id INTEGER NOT NULL REFERENCES bulletins(id) ON DELETE CASCADE,
+    page INTEGER NOT NULL,
+    table_index INTEGER NOT NULL,
+    n_rows INTEGER NOT NULL,
+    n_cols INTEGER NOT NULL,
+    columns TEXT NOT NULL,
+    PRIMARY KEY (bulletin_id, page, table_index)
+);
+
+-- Cellules des lignes de données : texte brut et valeur numérique lue (NULL si non numérique)
+CREATE TABLE IF NOT EXISTS table_cells (
+    bulletin_id INTEGER NOT NULL,
+    page INTEGER NOT NULL,
+    table_index INTEGER NOT NULL,
+    row_index INTEGER NOT NULL,
+    column_name TEXT NOT NULL,
+    text TEXT,
+    value REAL,
+    unit TEXT,
+    PRIMARY KEY (bulletin_id, page, table_index, row_index, column_name),
+    FOREIGN KEY (bulletin_id, page, table_index)
+        REFERENCES extracted_tables(bulletin_id, page, table_index) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_table_cells_column ON table_cells(column_name, value);
+"""
+
+# "12", "12,5", "1 234,5", "-3.2", "45 %", "< 5"
+NUMBER_PATTERN = re.compile(
+    r'^[<>≤≥~]?\s*([+-]?(?:\d{1,3}(?:[ \u00a0\u202f]\d{3})+|\d+)(?:[.,]\d+)?)\s*(%)?$'
+)
+
+# Nombre maximal de lignes d'en-tête empilées en haut d'un tableau
+MAX_HEADER_ROWS = 2
+
+
+def parse_number(text: str) -> tuple:
+    """
+    Lit une cellule numérique (virgule décimale, espaces de milliers, pourcentage).
+
+    Returns:
+        tuple: (valeur ou None, unité '%' ou None)
+    """
+    if not text:
+        return None, None
+    match = NUMBER_PATTERN.match(text.strip())
+    if match is None:
+        return None, None
+    number = re.sub(r'[ \u00a0\u202f]', '', match.group(1)).replace(",", ".")
+    return float(number), match.group(2)
+
+
+def column_name(text: str) -> str:
+    """Nom de colonne normalisé : minuscules sans accents, '%' -> 'pct', séparateurs -> '_'"""
+    text = fold_accents(text or "").lower().replace("%", " pct ")
+    return "_".join(re.findall(r'[a-z0-9]+', text))
+
+
+def normalize_table(rows: list) -> tuple:
+    """
+    Sépare les lignes d'en-tête (lignes de tête sans valeur numérique, au plus
+    MAX_HEADER_ROWS) des lignes de données et construit des noms de colonnes uniques.
+    Les cellules fusionnées (None) d'un en-tête reprennent le libellé de gauche.
+
+    Returns:
+        tuple: (noms de colonnes, lignes de données)
+    """
+    # None = cellule couverte par une fusion (pdfplumber), "" = cellule vide
+    rows = [[cell.strip() if cell is not None else None for cell in row]
+            for row in rows if any(cell and cell.strip() for cell in row)]
+    if not rows:
+        return [], []
+    n_cols = max(len(row) for row in rows)
+    rows = [row + [None] * (n_cols - len(row)) for row in rows]
+
+    header_rows = []
+    while (len(header_rows) < MAX_HEADER_ROWS and len(rows) > 1
+           and all(parse_number(cell)[0] is None for cell in rows[0])):
+        header_rows.append(rows.pop(0))
+
+    labels = [[] for _ in range(n_cols)]
+    for row in header_rows:
+        previous = None
+        for j, cell in enumerate(row):
+            # Cellule fusionnée horizontalement : libellé de la cellule de gauche
+            if cell is None:
+                cell = previous
+            previous = cell
+            if cell and cell not in labels[j]:
+                labels[j].append(cell)
+
+    # Doublons suffixés _2, _3... en sautant les noms déjà pris ("note", "note", "note_2")
+    columns, used = [], set()
+    for j, parts in enumerate(labels):
+        base = column_name(" ".join(parts)) or f"colonne_{j + 1}"
+        name, suffix = base, 1
+        while name in used:
+            suffix += 1
+            name = f"{base}_{suffix}"
+        used.add(name)
+        columns.append(name)
+    return columns, [[cell or "" for cell in row] for row in rows]
+
+
+class TableStore:
+    """
+    Tableaux d'observation des BSV stockés cellule par cellule dans la base du catalogue,
+    avec une valeur numérique typée, afin que les requêtes de tendance parcourent des
+    nombres indexés par colonne sans relire les PDF.
+    """
+
+    def __init__(self, db_path: str = None):
+        config_loader = ConfigLoader()
+        if db_path is None:
+            db_path = config_loader.config["data"].get("catalog_path", "data/catalog.sqlite")
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(config_loader.get_path(db_path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        with self._lock, self.conn:
+            self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def replace_tables(self, bulletin_id: int, tables: list) -> int:
+        """
+        Remplace les tableaux d'un bulletin.
+
+        Args:
+            tables (list): (numéro de page, indice sur la page, lignes brutes pdfplumber)
+
+        Returns:
+            int: nombre de cellules de données enregistrées
+        """
+        cells = 0
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM extracted_tables WHERE bulletin_id = ?", (bulletin_id,))
+            for page, table_index, rows in tables:
+                columns, data = normalize_table(rows)
+                if not data:
+                    continue
+                self.conn.execute(
+                    "INSERT INTO extracted_tables (bulletin_id, page, table_index, n_rows, n_cols, columns) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (bulletin_id, page, table_index, len(data), len(columns), json.dumps(columns)))
+                values = [(bulletin_id, page, table_index, i, columns[j], text) + parse_number(text)
+                          for i, row in enumerate(data) for j, text in enumerate(row)]
+                self.conn.executemany(
+                    "INSERT INTO table_cells (bulletin_id, page, table_index, row_index, column_name, text, "
+                    "value, unit) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", values)
+                cells += len(values)
+        return cells
+
+    def tables(self, bulletin_id: int) -> list:
+        """Tableaux d'un bulletin : dicts {page, table_index, columns, rows} (textes des cellules)"""
+        with self._lock:
+            metas = self.conn.execute(
+                "SELECT * FROM extracted_tables WHERE bulletin_id = ? ORDER BY page, table_index",
+                (bulletin_id,)).fetchall()
+            cells = self.conn.execute(
+                "SELECT page, table_index, row_index, column_name, text FROM table_cells WHERE bulletin_id = ?",
+                (bulletin_id,)).fetchall()
+        result = {(m["page"], m["table_index"]): {
+            "page": m["page"], "table_index": m["table_index"], "columns": json.loads(m["columns"]),
+            "rows": [{} for _ in range(m["n_rows"])]} for m in metas}
+        for cell in cells:
+            result[(cell["page"], cell["table_index"])]["rows"][cell["row_index"]][cell["column_name"]] = cell["text"]
+        return list(result.values())
+
+    def columns(self, pattern: str = None) -> list:
+        """Noms de colonnes connus avec leur nombre de valeurs numériques (filtre LIKE optionnel)"""
+        query = "SELECT column_name, COUNT(value) AS n_values FROM table_cells"
+        params = []
+        if pattern:
+            query += " WHERE column_name LIKE ?"
+            params.append(pattern)
+        with self._lock:
+            return self.conn.execute(query + " GROUP BY column_name ORDER BY n_values DESC", params).fetchall()
+
+    def values(self, column: str, region: str = None, culture: str = None, start: str = None,
+               end: str = None) -> list:
+        """
+        Valeurs numériques d'une colonne normalisée, avec la date de parution du bulletin,
+        triées chronologiquement (bulletins sans date exclus si start/end sont fournis).
+        """
+        clauses, params = ["c.column_name = ?", "c.value IS NOT NULL"], [column]
+        for clause, value in (("b.region = ?", region), ("b.culture = ?", culture),
+                              ("b.issue_date >= ?", start), ("b.issue_date <= ?", end)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        with self._lock:
+            return self.conn.execute(
+                "SELECT b.issue_date, c.bulletin_id, c.page, c.table_index, c.row_index, c.value, c.unit "
+                "FROM table_cells c JOIN bulletins b ON b.id = c.bulletin_id "
+                f"WHERE {' AND '.join(clauses)} ORDER BY b.issue_date, c.bulletin_id, c.page, c.row_index",
+                params).fetchall()
@@ -0,0 +1,25 @@
+import re
+import unicodedata
+
+# Mots : suites de lettres ou chiffres, apostrophes, tirets et ponctuation séparent
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+
+def fold_accents(text: str) -> str:
+    """Supprime les accents (é -> e, ç -> c) en conservant les autres caractères"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list:
+    """Découpe un texte en mots minuscules sans accents ("l'Oïdium" -> ['l', 'oidium'])"""
+    return TOKEN_PATTERN.findall(fold_accents(text).lower())
+
+
+def load_term_list(file_path: str) -> list:
+    """Charge une liste de termes (un par ligne, lignes vides et commentaires '#' ignorés)"""
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    except FileNotFoundError:
+        return []